@@ -5,7 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from django.http import StreamingHttpResponse
 from .models import AIInferenceModel, DraftGenerationTask, ClauseAnchor
 from .serializers import AIInferenceSerializer, DraftGenerationTaskSerializer, ClauseAnchorSerializer
-from .tasks import generate_draft_async
+from .tasks import _get_genai, generate_draft_async
 from .pii_protection import PIIScrubber, ScrubberAuditLog
 from django.utils import timezone
 import uuid
@@ -13,16 +13,12 @@ import logging
 import json
 from repository.models import Document
 from repository.embeddings_service import VoyageEmbeddingsService
-import google.generativeai as genai
 from django.conf import settings
 import numpy as np
-from contracts.models import Clause
+from contracts.clause_embeddings import find_relevant_clauses
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-genai.configure(api_key=settings.GEMINI_API_KEY)
-
 
 class AIViewSet(viewsets.ViewSet):
     """
@@ -118,7 +114,7 @@ class AIViewSet(viewsets.ViewSet):
             if redactions:
                 logger.info(f"Scrubbed {sum(len(v) for v in redactions.values())} PII instances before metadata extraction")
 
-            model = genai.GenerativeModel('gemini-2.0-flash')
+            model = _get_genai().GenerativeModel('gemini-2.0-flash')
             
             prompt = f"""
             Extract the following metadata from this contract text.
@@ -268,53 +264,20 @@ class AIViewSet(viewsets.ViewSet):
         except Exception:
             task = None
 
-        # Retrieve relevant clauses using Voyage Law-2.
+        # Retrieve relevant clauses: embed only the prompt, then an ANN query
+        # over the precomputed clause embeddings.
         def _pick_relevant_clauses() -> list[dict]:
             try:
                 embeddings_service = VoyageEmbeddingsService()
                 query_embedding = embeddings_service.embed_query(prompt)
-                if not query_embedding:
+                if not query_embedding or embeddings_service.use_mock:
                     return []
 
-                qs = Clause.objects.filter(tenant_id=request.user.tenant_id, status='published')
-                if contract_type:
-                    qs = qs.filter(contract_type=contract_type)
-
-                items = list(qs.order_by('-updated_at')[:40])
-                if not items:
-                    return []
-
-                texts = [f"{c.name}\n\n{c.content}"[:8000] for c in items]
-                embeddings = embeddings_service.embed_batch(texts)
-
-                q = np.array(query_embedding, dtype=np.float32)
-                qn = float(np.linalg.norm(q))
-                if qn <= 0:
-                    return []
-
-                scored: list[tuple[float, Clause]] = []
-                for clause, emb in zip(items, embeddings):
-                    if not emb:
-                        continue
-                    v = np.array(emb, dtype=np.float32)
-                    vn = float(np.linalg.norm(v))
-                    if vn <= 0:
-                        continue
-                    sim = float(np.dot(q, v) / (qn * vn))
-                    scored.append((sim, clause))
-
-                scored.sort(key=lambda x: x[0], reverse=True)
-                out = []
-                for sim, clause in scored[:5]:
-                    out.append(
-                        {
-                            'clause_id': clause.clause_id,
-                            'name': clause.name,
-                            'similarity': round(sim, 4),
-                            'content': clause.content,
-                        }
-                    )
-                return out
+                return find_relevant_clauses(
+                    request.user.tenant_id,
+                    query_embedding,
+                    contract_type=contract_type,
+                )
             except Exception:
                 return []
 
@@ -461,7 +424,7 @@ Relevant clause library (optional):
                     return ''
 
             try:
-                model = genai.GenerativeModel(model_name)
+                model = _get_genai().GenerativeModel(model_name)
                 any_delta = False
                 last_chunk = None
 
@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-19 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approvalmodel',
+            index=models.Index(fields=['tenant_id', 'created_at', 'id'], name='approval_tenant_created_idx'),
+        ),
+    ]
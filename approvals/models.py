@@ -18,3 +18,6 @@ class ApprovalModel(models.Model):
     class Meta:
         db_table = 'approvals'
         app_label = 'approvals'
+        indexes = [
+            models.Index(fields=['tenant_id', 'created_at', 'id'], name='approval_tenant_created_idx'),
+        ]
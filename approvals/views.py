@@ -1,9 +1,10 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from clm_backend.pagination import PaginationModeMixin
 from .models import ApprovalModel
 from .serializers import ApprovalSerializer
 
-class ApprovalViewSet(viewsets.ModelViewSet):
+class ApprovalViewSet(PaginationModeMixin, viewsets.ModelViewSet):
     queryset = ApprovalModel.objects.all()
     serializer_class = ApprovalSerializer
     permission_classes = [IsAuthenticated]
@@ -1,8 +1,6 @@
 """
 Cloudflare R2 Storage Service
 """
-import boto3
-from botocore.config import Config
 from botocore.exceptions import ClientError
 from django.conf import settings
 import uuid
@@ -11,7 +9,10 @@ import re
 import hashlib
 import unicodedata
 from urllib.parse import quote
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bytes per chunk when streaming an object body.
+STREAM_CHUNK_SIZE = 256 * 1024
 
 
 class R2StorageService:
@@ -32,6 +33,10 @@ class R2StorageService:
                 'Cloudflare R2 is not configured. Missing: ' + ', '.join(missing)
             )
 
+        # boto3 takes ~0.1s and tens of MB to import; only pay for it on first use.
+        import boto3
+        from botocore.config import Config
+
         self.client = boto3.client(
             's3',
             endpoint_url=settings.R2_ENDPOINT_URL,
@@ -73,17 +78,20 @@ class R2StorageService:
             content_type = 'application/octet-stream'
         
         try:
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=r2_key,
-                Body=file_obj.read(),
-                ContentType=content_type,
-                Metadata=self._sanitize_metadata(
-                    {
-                        'tenant_id': str(tenant_id),
-                        'original_filename': filename,
-                    }
-                ),
+            # upload_fileobj streams in parts instead of buffering the whole file.
+            self.client.upload_fileobj(
+                file_obj,
+                self.bucket_name,
+                r2_key,
+                ExtraArgs={
+                    'ContentType': content_type,
+                    'Metadata': self._sanitize_metadata(
+                        {
+                            'tenant_id': str(tenant_id),
+                            'original_filename': filename,
+                        }
+                    ),
+                },
             )
             return r2_key
         except ClientError as e:
@@ -251,8 +259,17 @@ class R2StorageService:
 
     def list_objects(self, prefix: str, max_keys: int = 200) -> List[Dict[str, Any]]:
         """List objects under a prefix."""
+        return self.list_objects_page(prefix, max_keys)[0]
+
+    def list_objects_page(
+        self, prefix: str, max_keys: int = 1000, start_after: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """One page of objects under a prefix (keys after `start_after`), and whether more follow."""
+        params = {'Bucket': self.bucket_name, 'Prefix': prefix, 'MaxKeys': max_keys}
+        if start_after:
+            params['StartAfter'] = start_after
         try:
-            resp = self.client.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix, MaxKeys=max_keys)
+            resp = self.client.list_objects_v2(**params)
             contents = resp.get('Contents') or []
             results: List[Dict[str, Any]] = []
             for obj in contents:
@@ -263,34 +280,130 @@ class R2StorageService:
                         'last_modified': obj.get('LastModified').isoformat() if obj.get('LastModified') else None,
                     }
                 )
-            return results
+            return results, bool(resp.get('IsTruncated'))
         except ClientError as e:
             raise Exception(f"Failed to list objects: {str(e)}")
     
-    def generate_presigned_url(self, r2_key, expiration=3600):
+    def generate_presigned_url(self, r2_key, expiration=3600, *, content_disposition=None, content_type=None):
         """
         Generate a presigned URL for secure file access
         
         Args:
             r2_key: The R2 key (path) of the file
             expiration: URL expiration time in seconds (default: 1 hour)
+            content_disposition / content_type: Optional response header overrides
         
         Returns:
             str: Presigned URL
         """
+        params = {
+            'Bucket': self.bucket_name,
+            'Key': r2_key
+        }
+        if content_disposition:
+            params['ResponseContentDisposition'] = content_disposition
+        if content_type:
+            params['ResponseContentType'] = content_type
         try:
             url = self.client.generate_presigned_url(
                 'get_object',
-                Params={
-                    'Bucket': self.bucket_name,
-                    'Key': r2_key
-                },
+                Params=params,
                 ExpiresIn=expiration
             )
             return url
         except ClientError as e:
             raise Exception(f"Failed to generate presigned URL: {str(e)}")
 
+    # ---- Multipart uploads (client uploads parts directly via presigned URLs) ----
+
+    def create_multipart_upload(
+        self,
+        key: str,
+        *,
+        content_type: str = 'application/octet-stream',
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Start a multipart upload and return its UploadId."""
+        try:
+            resp = self.client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=str(key),
+                ContentType=content_type or 'application/octet-stream',
+                Metadata=self._sanitize_metadata(metadata),
+            )
+            return resp['UploadId']
+        except ClientError as e:
+            raise Exception(f"Failed to start multipart upload: {str(e)}")
+
+    def generate_presigned_part_url(self, key: str, upload_id: str, part_number: int, expiration: int = 3600) -> str:
+        """Presigned PUT URL for a single part of a multipart upload."""
+        try:
+            return self.client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': str(key),
+                    'UploadId': upload_id,
+                    'PartNumber': int(part_number),
+                },
+                ExpiresIn=expiration,
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to generate presigned part URL: {str(e)}")
+
+    def list_multipart_parts(self, key: str, upload_id: str) -> List[Dict[str, Any]]:
+        """Parts already received by R2 for an in-progress multipart upload."""
+        parts: List[Dict[str, Any]] = []
+        marker = 0
+        try:
+            while True:
+                resp = self.client.list_parts(
+                    Bucket=self.bucket_name,
+                    Key=str(key),
+                    UploadId=upload_id,
+                    PartNumberMarker=marker,
+                )
+                for part in resp.get('Parts') or []:
+                    parts.append(
+                        {
+                            'part_number': int(part['PartNumber']),
+                            'etag': part.get('ETag'),
+                            'size': int(part.get('Size') or 0),
+                        }
+                    )
+                if not resp.get('IsTruncated'):
+                    break
+                marker = int(resp.get('NextPartNumberMarker') or 0)
+            return parts
+        except ClientError as e:
+            raise Exception(f"Failed to list multipart parts: {str(e)}")
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: List[Dict[str, Any]]) -> Optional[str]:
+        """Finalize a multipart upload from `[{'part_number', 'etag'}]`; returns the object ETag."""
+        try:
+            resp = self.client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=str(key),
+                UploadId=upload_id,
+                MultipartUpload={
+                    'Parts': [
+                        {'PartNumber': int(p['part_number']), 'ETag': p['etag']}
+                        for p in sorted(parts, key=lambda p: int(p['part_number']))
+                    ]
+                },
+            )
+            return resp.get('ETag')
+        except ClientError as e:
+            raise Exception(f"Failed to complete multipart upload: {str(e)}")
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> bool:
+        """Abort a multipart upload so R2 discards any stored parts."""
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=str(key), UploadId=upload_id)
+            return True
+        except ClientError as e:
+            raise Exception(f"Failed to abort multipart upload: {str(e)}")
+
     def get_file_bytes(self, r2_key: str) -> bytes:
         """Download an object from R2 and return its bytes."""
         try:
@@ -300,6 +413,52 @@ class R2StorageService:
         except ClientError as e:
             raise Exception(f"Failed to download file from R2: {str(e)}")
     
+    def stat_file(self, r2_key: str) -> Optional[Dict[str, Any]]:
+        """{'size', 'etag', 'content_type'} of an object (one HEAD request), or None if it doesn't exist."""
+        try:
+            resp = self.client.head_object(Bucket=self.bucket_name, Key=r2_key)
+        except ClientError as e:
+            if str(e.response.get('Error', {}).get('Code')) in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise Exception(f"Failed to stat file in R2: {str(e)}")
+        return {
+            'size': int(resp.get('ContentLength') or 0),
+            'etag': str(resp.get('ETag') or '').strip('"'),
+            'content_type': resp.get('ContentType') or '',
+        }
+
+    def iter_file(
+        self,
+        r2_key: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """
+        An object's bytes (or the inclusive range start..end) as an iterator
+        of chunks, so memory stays constant whatever the object size. The GET
+        is sent before this returns; errors are raised here, not mid-stream.
+        """
+        params = {'Bucket': self.bucket_name, 'Key': r2_key}
+        if start is not None or end is not None:
+            params['Range'] = f"bytes={start or 0}-{'' if end is None else end}"
+        try:
+            body = self.client.get_object(**params).get('Body')
+        except ClientError as e:
+            raise Exception(f"Failed to download file from R2: {str(e)}")
+        return self._iter_body(body, chunk_size)
+
+    @staticmethod
+    def _iter_body(body, chunk_size: int) -> Iterator[bytes]:
+        if body is None:
+            return
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            body.close()
+    
     def delete_file(self, r2_key):
         """
         Delete a file from R2
@@ -319,6 +478,31 @@ class R2StorageService:
         except ClientError as e:
             raise Exception(f"Failed to delete file from R2: {str(e)}")
     
+    def delete_objects(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Delete up to 1000 objects in one DeleteObjects request.
+
+        Returns {key: error message} for keys R2 could not delete. Missing
+        keys count as deleted.
+        """
+        keys = [str(k) for k in keys if k]
+        if not keys:
+            return {}
+        if len(keys) > 1000:
+            raise ValueError('DeleteObjects accepts at most 1000 keys')
+        try:
+            resp = self.client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': k} for k in keys], 'Quiet': True},
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to delete objects from R2: {str(e)}")
+        return {
+            err.get('Key'): f"{err.get('Code')}: {err.get('Message')}"
+            for err in (resp.get('Errors') or [])
+            if err.get('Key')
+        }
+
     def file_exists(self, r2_key):
         """
         Check if a file exists in R2
@@ -0,0 +1,305 @@
+"""
+Conditional GET (ETag / If-None-Match) for read-mostly DRF viewsets, and
+ranged (206) responses for binary downloads such as PDFs. Large downloads
+are streamed (`streaming_range_response`, `r2_file_response`) so a worker
+holds one chunk per download rather than the whole file.
+
+The ETag is derived from a cheap per-object version source (a few small
+columns, or a hash computed in SQL) that is read after authentication and
+permission checks but before the action handler runs. A matching
+If-None-Match short-circuits to 304 without serializing the object or
+touching large columns / R2.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Clients must revalidate every time; responses are per-user (tenant scoped).
+CONDITIONAL_CACHE_CONTROL = 'private, no-cache'
+
+
+class NotModified(Exception):
+    """Raised from `initial()` when the client's cached representation is current."""
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag (quoted) from arbitrary version parts."""
+    raw = '\x1f'.join('' if p is None else str(p) for p in parts)
+    return '"' + hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires for GET)."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    wanted = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified_response(request, etag: str):
+    """304 response if If-None-Match matches `etag`, else None."""
+    if not etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+        return None
+    resp = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    resp['ETag'] = etag
+    resp['Cache-Control'] = CONDITIONAL_CACHE_CONTROL
+    return resp
+
+
+_UNSATISFIABLE = object()
+
+
+def _parse_byte_range(header: str | None, size: int):
+    """
+    Single `bytes=` range -> (start, end) inclusive; None to serve the whole
+    body (absent, malformed or multi-range headers); _UNSATISFIABLE for 416.
+    """
+    if not header or not header.strip().lower().startswith('bytes='):
+        return None
+    specs = header.strip()[6:].split(',')
+    if len(specs) != 1:
+        # multipart/byteranges isn't worth it here; a full 200 is a valid answer.
+        return None
+    start_s, sep, end_s = specs[0].strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not start_s:
+            suffix = int(end_s)
+            if suffix <= 0 or size == 0:
+                return _UNSATISFIABLE
+            return max(0, size - suffix), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start < 0 or start > end:
+        return None
+    if start >= size:
+        return _UNSATISFIABLE
+    return start, min(end, size - 1)
+
+
+def _ranged_response(request, size: int, etag: str, body_for, filename, as_attachment):
+    """
+    Shared 200/206/304/416 handling. `body_for(start, end)` builds the
+    response for the inclusive range (None, None meaning the whole body).
+    """
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    byte_range = _parse_byte_range(request.META.get('HTTP_RANGE'), size)
+    if_range = (request.META.get('HTTP_IF_RANGE') or '').strip()
+    if if_range and if_range != etag:
+        # Client's partial copy is of another version: send the whole thing.
+        byte_range = None
+
+    if byte_range is _UNSATISFIABLE:
+        resp = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        resp['Content-Range'] = f'bytes */{size}'
+    elif byte_range is not None:
+        start, end = byte_range
+        resp = body_for(start, end)
+        resp.status_code = status.HTTP_206_PARTIAL_CONTENT
+        resp['Content-Range'] = f'bytes {start}-{end}/{size}'
+        resp['Content-Length'] = str(end - start + 1)
+    else:
+        resp = body_for(None, None)
+        resp['Content-Length'] = str(size)
+
+    resp['ETag'] = etag
+    resp['Accept-Ranges'] = 'bytes'
+    resp['Cache-Control'] = CONDITIONAL_CACHE_CONTROL
+    if filename:
+        resp['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return resp
+
+
+def byte_range_response(
+    request,
+    data: bytes,
+    *,
+    etag: str,
+    content_type: str,
+    filename: str | None = None,
+    as_attachment: bool = False,
+):
+    """
+    Serve `data` with ETag, Accept-Ranges and Range/If-Range support
+    (200, 206, 304 or 416).
+    """
+    def body_for(start, end):
+        if start is None:
+            return HttpResponse(data, content_type=content_type)
+        return HttpResponse(data[start:end + 1], content_type=content_type)
+
+    return _ranged_response(request, len(data), etag, body_for, filename, as_attachment)
+
+
+def streaming_range_response(
+    request,
+    *,
+    size: int,
+    chunks: Callable[[Optional[int], Optional[int]], Iterable[bytes]],
+    etag: str,
+    content_type: str,
+    filename: str | None = None,
+    as_attachment: bool = False,
+):
+    """
+    Like byte_range_response, but the body is streamed. `chunks(start, end)`
+    returns an iterable of bytes for the inclusive range (None, None for
+    all of it); it is only called when a body is actually sent.
+    """
+    def body_for(start, end):
+        return StreamingHttpResponse(chunks(start, end), content_type=content_type)
+
+    return _ranged_response(request, size, etag, body_for, filename, as_attachment)
+
+
+def file_range_chunks(path: str, chunk_size: int = 256 * 1024):
+    """`chunks` callable for streaming_range_response that reads a local file."""
+    def chunks(start, end):
+        start = start or 0
+
+        def read():
+            with open(path, 'rb') as f:
+                f.seek(start)
+                remaining = None if end is None else end - start + 1
+                while remaining is None or remaining > 0:
+                    block = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                    if not block:
+                        break
+                    if remaining is not None:
+                        remaining -= len(block)
+                    yield block
+
+        return read()
+
+    return chunks
+
+
+def r2_file_response(
+    request,
+    r2,
+    key: str,
+    *,
+    content_type: str = 'application/octet-stream',
+    filename: str | None = None,
+    as_attachment: bool = True,
+    allow_redirect: bool = True,
+):
+    """
+    Download response for an R2 object, or None if it doesn't exist (or is
+    empty). With R2_DOWNLOAD_REDIRECT on and `allow_redirect`, clients are
+    sent to a short-lived presigned URL; otherwise the object is streamed
+    with ETag and Range support.
+    """
+    # Checked before redirecting too, so callers can fall back instead of
+    # sending the client to a presigned URL that 404s.
+    stat = r2.stat_file(key)
+    if not stat or not stat['size']:
+        return None
+
+    if allow_redirect and getattr(settings, 'R2_DOWNLOAD_REDIRECT', False):
+        url = r2.generate_presigned_url(
+            key,
+            expiration=int(getattr(settings, 'R2_DOWNLOAD_REDIRECT_EXPIRY_SECONDS', 300)),
+            content_disposition=content_disposition_header(as_attachment, filename) if filename else None,
+            content_type=content_type,
+        )
+        resp = HttpResponseRedirect(url)
+        resp['Cache-Control'] = 'private, no-store'
+        return resp
+
+    return streaming_range_response(
+        request,
+        size=stat['size'],
+        chunks=lambda start, end: r2.iter_file(key, start, end),
+        etag=make_etag(key, stat['etag'], stat['size']),
+        content_type=content_type,
+        filename=filename,
+        as_attachment=as_attachment,
+    )
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag / 304 handling to detail GETs of a viewset.
+
+    `etag_actions` lists the actions to handle; by default the version source
+    is `etag_fields` read from `get_queryset()` for the looked-up object.
+    Override `get_etag_source()` for anything more involved; return None to
+    skip conditional handling (e.g. object not visible -> handler 404s).
+
+    The source is read before the handler, so a concurrent write can only
+    make the ETag older than the body (a spurious 200 later), never newer.
+    """
+
+    etag_actions = ('retrieve',)
+    etag_fields = ('updated_at',)
+
+    def get_etag_source(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        value = self.kwargs.get(lookup_url_kwarg)
+        if value is None:
+            return None
+        return (
+            self.get_queryset()
+            .filter(**{self.lookup_field: value})
+            .values_list(*self.etag_fields)
+            .first()
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = None
+        if request.method not in ('GET', 'HEAD') or getattr(self, 'action', None) not in self.etag_actions:
+            return
+        try:
+            source = self.get_etag_source()
+        except Exception as e:
+            # Bad lookup values etc.: let the handler produce its normal error.
+            logger.debug(f"ETag source lookup failed for {self.__class__.__name__}.{self.action}: {e}")
+            return
+        if source is None:
+            return
+        self._etag = make_etag(self.__class__.__name__, self.action, source)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), self._etag):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': self._etag, 'Cache-Control': CONDITIONAL_CACHE_CONTROL},
+            )
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag and response.status_code == status.HTTP_200_OK and not response.has_header('ETag'):
+            response['ETag'] = etag
+            if not response.has_header('Cache-Control'):
+                response['Cache-Control'] = CONDITIONAL_CACHE_CONTROL
+        return response
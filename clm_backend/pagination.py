@@ -0,0 +1,155 @@
+"""
+Opt-in list pagination modes for large tenants.
+
+The default stays `PageNumberPagination` (exact COUNT(*), page numbers).
+Viewsets using `PaginationModeMixin` also accept:
+
+- `?pagination=cursor`: cursor pagination on created_at. There is no COUNT,
+  and the only OFFSET skips rows sharing the boundary timestamp, so each
+  page costs about the same however deep the client scrolls. The response
+  is `{next, previous, results}`.
+- `?pagination=estimated`: page numbers, but `count` comes from the Postgres
+  planner's row estimate once it exceeds `PAGINATION_ESTIMATE_MIN_ROWS`.
+  Smaller result sets still get an exact count. The response adds
+  `count_estimated`.
+"""
+from __future__ import annotations
+
+import json
+import logging
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+PAGINATION_MODE_PARAM = 'pagination'
+CURSOR_MODE = 'cursor'
+ESTIMATED_MODE = 'estimated'
+
+# Below this many (estimated) rows an exact COUNT is cheap enough to run.
+DEFAULT_ESTIMATE_MIN_ROWS = 10000
+
+
+def estimated_count(queryset) -> tuple[int, bool]:
+    """
+    (row count, is_estimate) for `queryset`.
+
+    Uses the planner's row estimate for the filtered query (EXPLAIN only, the
+    query isn't executed) and falls back to an exact COUNT for small results,
+    non-Postgres databases, or if EXPLAIN fails.
+    """
+    min_rows = int(getattr(settings, 'PAGINATION_ESTIMATE_MIN_ROWS', DEFAULT_ESTIMATE_MIN_ROWS))
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        rows = int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.debug(f"Planner row estimate failed, counting instead: {e}")
+        return queryset.count(), False
+    if rows < min_rows:
+        return queryset.count(), False
+    return rows, True
+
+
+class EstimatedCountPaginator(Paginator):
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        n, self.count_is_estimate = estimated_count(self.object_list)
+        return n
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Page-number pagination with a planner-estimated `count`.
+
+    With an estimate the last page number is approximate. A page past the
+    real end returns 404 like any out-of-range page, and `next` may link to a
+    short final page.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_estimated': self.page.paginator.count_is_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_estimated'] = {'type': 'boolean', 'example': False}
+        return response_schema
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Cursor pagination, newest first. DRF keys the cursor on the first
+    ordering field only (created_at) and steps over rows that share the
+    boundary timestamp with a small OFFSET; id only makes the order stable.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class PaginationModeMixin:
+    """
+    Lets clients choose a pagination mode with `?pagination=cursor|estimated`.
+
+    Without the parameter the viewset's regular `pagination_class` is used, so
+    existing clients are unaffected. Set `cursor_pagination_class` to change
+    the cursor ordering for a viewset.
+    """
+
+    cursor_pagination_class = CreatedAtCursorPagination
+    estimated_pagination_class = EstimatedCountPagination
+
+    def pagination_mode(self):
+        request = getattr(self, 'request', None)
+        if request is None:
+            return None
+        mode = (request.query_params.get(PAGINATION_MODE_PARAM) or '').strip().lower()
+        return mode if mode in (CURSOR_MODE, ESTIMATED_MODE) else None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            mode = self.pagination_mode()
+            if mode == CURSOR_MODE:
+                self._paginator = self.cursor_pagination_class()
+            elif mode == ESTIMATED_MODE:
+                self._paginator = self.estimated_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def paginate_opt_in(self, queryset):
+        """
+        Paginate only if a mode was requested. This is for actions that have
+        always returned a bare list (e.g. contract versions).
+        """
+        if self.pagination_mode() is None:
+            return None
+        return self.paginate_queryset(queryset)
@@ -577,3 +577,56 @@ CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes max
 CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60  # 25 minutes soft limit
+CELERY_BEAT_SCHEDULE = {
+    # Repairs drift in the dashboard's per-tenant contract status counters.
+    'reconcile-contract-status-counters': {
+        'task': 'contracts.tasks.reconcile_contract_status_counters',
+        'schedule': int(os.getenv('CONTRACT_COUNTER_RECONCILE_SECONDS', '3600')),
+    },
+    # Removes deduplicated version blobs (and their R2 objects) left unreferenced.
+    'delete-unreferenced-version-blobs': {
+        'task': 'contracts.tasks.delete_unreferenced_version_blobs',
+        'schedule': int(os.getenv('VERSION_BLOB_GC_SECONDS', '86400')),
+    },
+    # Removes content snapshots left behind by cloned contracts that were edited or deleted.
+    'delete-unreferenced-content-snapshots': {
+        'task': 'contracts.tasks.delete_unreferenced_content_snapshots',
+        'schedule': int(os.getenv('CONTENT_SNAPSHOT_GC_SECONDS', '86400')),
+    },
+    # Retries R2 deletions that failed or were never queued (contracts.r2_cleanup).
+    'purge-r2-tombstones': {
+        'task': 'contracts.tasks.purge_r2_tombstones_task',
+        'schedule': int(os.getenv('R2_TOMBSTONE_PURGE_SECONDS', '600')),
+    },
+    'reconcile-r2-tombstones': {
+        'task': 'contracts.tasks.reconcile_r2_tombstones',
+        'schedule': int(os.getenv('R2_TOMBSTONE_RECONCILE_SECONDS', '86400')),
+    },
+    # Re-queues (or fails) bulk generation chunks whose task was lost.
+    'recover-stalled-bulk-generation-jobs': {
+        'task': 'contracts.tasks.recover_stalled_bulk_generation_jobs',
+        'schedule': int(os.getenv('BULK_GENERATION_WATCHDOG_SECONDS', '600')),
+    },
+}
+
+# Bulk contract generation (contracts.bulk_generation): rows per job,
+# chunk tasks in flight per job, and seconds without progress before the
+# watchdog treats in-flight chunks as lost (keep above CELERY_TASK_TIME_LIMIT).
+BULK_GENERATION_MAX_ROWS = int(os.getenv('BULK_GENERATION_MAX_ROWS', '5000'))
+BULK_GENERATION_MAX_CONCURRENCY = int(os.getenv('BULK_GENERATION_MAX_CONCURRENCY', '4'))
+BULK_GENERATION_STALL_SECONDS = int(os.getenv('BULK_GENERATION_STALL_SECONDS', '3600'))
+
+# Version diff (contracts.version_diff): seconds before falling back from
+# line- to paragraph-level granularity.
+VERSION_DIFF_TIME_BUDGET_SECONDS = float(os.getenv('VERSION_DIFF_TIME_BUDGET_SECONDS', '2.0'))
+
+# Startup budgets checked by `manage.py startup_benchmark`: import time and
+# RSS per app, and import time for everything a worker loads (0 disables).
+STARTUP_APP_IMPORT_BUDGET_MS = float(os.getenv('STARTUP_APP_IMPORT_BUDGET_MS', '750'))
+STARTUP_APP_RSS_BUDGET_MB = float(os.getenv('STARTUP_APP_RSS_BUDGET_MB', '48'))
+STARTUP_WORKER_IMPORT_BUDGET_MS = float(os.getenv('STARTUP_WORKER_IMPORT_BUDGET_MS', '2000'))
+
+# R2 downloads (clm_backend.conditional.r2_file_response): redirect clients
+# to a presigned URL instead of streaming through the worker.
+R2_DOWNLOAD_REDIRECT = os.getenv('R2_DOWNLOAD_REDIRECT', 'False').strip().lower() in ('1', 'true', 'yes', 'y', 'on')
+R2_DOWNLOAD_REDIRECT_EXPIRY_SECONDS = int(os.getenv('R2_DOWNLOAD_REDIRECT_EXPIRY_SECONDS', '300'))
@@ -0,0 +1,483 @@
+"""
+Bulk contract generation from tabular input (CSV or JSON rows).
+
+A `BulkGenerationJob` splits its rows into chunks. Celery workers claim
+chunks one at a time; at most `BULK_GENERATION_MAX_CONCURRENCY` chunk tasks
+are in flight per job, because every finished chunk enqueues at most one
+successor. Each chunk does the following:
+
+- generates its contracts, versions, clause provenance and workflow logs
+  with bulk_create, in one transaction;
+- writes its DOCX files to a chunk ZIP in R2.
+
+The last chunk to finish queues `finalize_job`. It merges the chunk ZIPs
+and a manifest.csv into the downloadable result.
+
+A chunk whose task is lost (worker killed, message dropped) is never
+recorded, so `recover_stalled_jobs` (beat) re-queues the missing chunks of
+jobs that have made no progress for `BULK_GENERATION_STALL_SECONDS`, and
+fails them after `MAX_STALL_REQUEUES` attempts.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import re
+import tempfile
+import zipfile
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from authentication.r2_service import R2StorageService
+
+from .models import (
+    BulkGenerationJob,
+    Clause,
+    Contract,
+    ContractClause,
+    ContractTemplate,
+    ContractVersion,
+    WorkflowLog,
+)
+from .r2_cleanup import tombstone_keys
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 50
+MAX_RECORDED_ERRORS = 500
+MAX_STALL_REQUEUES = 2
+
+
+class BulkInputError(Exception):
+    """The submitted rows can't be turned into a job."""
+
+
+class ChunkAlreadyRecorded(Exception):
+    """The chunk's results are already counted (a re-queued duplicate ran)."""
+
+
+def max_rows() -> int:
+    return int(getattr(settings, 'BULK_GENERATION_MAX_ROWS', 5000))
+
+
+def max_concurrency() -> int:
+    return max(1, int(getattr(settings, 'BULK_GENERATION_MAX_CONCURRENCY', 4)))
+
+
+def stall_seconds() -> int:
+    return int(getattr(settings, 'BULK_GENERATION_STALL_SECONDS', 3600))
+
+
+def parse_rows(rows=None, csv_text: Optional[str] = None) -> list[dict]:
+    """Rows from a JSON list of objects or CSV text with a header line."""
+    if csv_text is not None:
+        reader = csv.DictReader(io.StringIO(csv_text.lstrip('\ufeff')))
+        parsed = [
+            {(k or '').strip(): (v or '').strip() for k, v in r.items() if k}
+            for r in reader
+        ]
+    elif isinstance(rows, list):
+        if not all(isinstance(r, dict) for r in rows):
+            raise BulkInputError('rows must be a list of objects')
+        parsed = rows
+    else:
+        raise BulkInputError('Provide rows (JSON list) or a CSV file')
+
+    parsed = [r for r in parsed if any(v not in (None, '') for v in r.values())]
+    if not parsed:
+        raise BulkInputError('No rows to generate')
+    if len(parsed) > max_rows():
+        raise BulkInputError(f'Maximum {max_rows()} rows per job')
+    return parsed
+
+
+def create_job(*, tenant_id, user_id, template: ContractTemplate, rows: list[dict], user_instructions=None) -> BulkGenerationJob:
+    job = BulkGenerationJob.objects.create(
+        tenant_id=tenant_id,
+        created_by=user_id,
+        template=template,
+        rows=rows,
+        user_instructions=user_instructions,
+        total_rows=len(rows),
+        chunk_size=BULK_CHUNK_SIZE,
+        total_chunks=(len(rows) + BULK_CHUNK_SIZE - 1) // BULK_CHUNK_SIZE,
+    )
+    transaction.on_commit(lambda: start_job(job.id, job.total_chunks))
+    return job
+
+
+def start_job(job_id, total_chunks: int) -> None:
+    from .tasks import bulk_generation_chunk_task
+
+    for _ in range(min(max_concurrency(), total_chunks)):
+        bulk_generation_chunk_task.delay(str(job_id))
+
+
+def claim_next_chunk(job_id) -> Optional[int]:
+    """Hand out the next unprocessed chunk index, or None when all are taken."""
+    with transaction.atomic():
+        job = (
+            BulkGenerationJob.objects.select_for_update()
+            .only('id', 'status', 'next_chunk', 'total_chunks')
+            .filter(id=job_id)
+            .first()
+        )
+        if job is None or job.status in ('completed', 'failed') or job.next_chunk >= job.total_chunks:
+            return None
+        index = job.next_chunk
+        BulkGenerationJob.objects.filter(id=job_id).update(
+            next_chunk=F('next_chunk') + 1,
+            status='processing',
+            updated_at=timezone.now(),
+        )
+    return index
+
+
+def chunk_r2_key(tenant_id, job_id, index: int) -> str:
+    return f"{tenant_id}/bulk-generation/{job_id}/chunks/{index:05d}.zip"
+
+
+def result_r2_key(tenant_id, job_id) -> str:
+    return f"{tenant_id}/bulk-generation/{job_id}/contracts.zip"
+
+
+class _RowError(Exception):
+    pass
+
+
+def _decimal(value) -> Optional[Decimal]:
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value).replace(',', '').replace('$', '').strip())
+    except InvalidOperation:
+        raise _RowError(f'Invalid value: {value!r}')
+
+
+def _date(value, field: str):
+    if value in (None, ''):
+        return None
+    try:
+        parsed = parse_date(str(value).strip())
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise _RowError(f'Invalid {field} (expected YYYY-MM-DD): {value!r}')
+    return parsed
+
+
+def _safe_filename(text: str) -> str:
+    base = re.sub(r'[^A-Za-z0-9 _.-]+', '', text or '').strip()
+    return re.sub(r'\s+', '_', base)[:80] or 'contract'
+
+
+def _build_contract(job: BulkGenerationJob, template: ContractTemplate, row: dict) -> Contract:
+    """Unsaved Contract for one row; same field mapping as ContractGenerator.generate_from_template."""
+    inputs = {k: v for k, v in row.items() if k != 'title'}
+    title = (row.get('title') or f"{template.contract_type} - {inputs.get('counterparty') or 'Draft'}")
+    return Contract(
+        tenant_id=job.tenant_id,
+        template=template,
+        title=str(title)[:255],
+        contract_type=template.contract_type,
+        counterparty=(str(inputs['counterparty'])[:255] if inputs.get('counterparty') else None),
+        value=_decimal(inputs.get('value')),
+        start_date=_date(inputs.get('start_date'), 'start_date'),
+        end_date=_date(inputs.get('end_date'), 'end_date'),
+        form_inputs=inputs,
+        user_instructions=job.user_instructions,
+        created_by=job.created_by,
+        status='draft',
+        # Version 1 is created below, as ContractGenerator.create_version would.
+        current_version=2,
+    )
+
+
+def process_chunk(job_id, index: int) -> tuple[int, int]:
+    """
+    Generate one chunk's contracts and upload its ZIP. Returns
+    (succeeded, failed). Row-level problems are recorded as failures;
+    anything else raises so the task can retry the whole chunk.
+    """
+    from .services import ContractGenerator
+    from .status_counters import record_status_change
+
+    job = BulkGenerationJob.objects.select_related('template').get(id=job_id)
+    if index in (job.recorded_chunks or []):
+        raise ChunkAlreadyRecorded(f'Chunk {index} of {job_id} is already recorded')
+    template = job.template
+    if template is None:
+        raise BulkInputError('Template no longer exists')
+
+    start = index * job.chunk_size
+    rows = job.rows[start:start + job.chunk_size]
+    generator = ContractGenerator(job.created_by, job.tenant_id)
+
+    prepared = []
+    errors = []
+    for offset, row in enumerate(rows):
+        row_number = start + offset + 1
+        try:
+            contract = _build_contract(job, template, row)
+            context = generator.build_context(contract)
+            clause_ids = generator.default_clauses(template, contract.contract_type, context)
+            is_valid, messages = generator.rule_engine.validate_contract(
+                job.tenant_id, contract.contract_type, context, clause_ids
+            )
+            if not is_valid:
+                raise _RowError('; '.join(messages))
+        except Exception as e:
+            # Bad cell values, failed rules (e.g. comparing text to a number).
+            errors.append({'row': row_number, 'error': str(e)})
+            continue
+        prepared.append((row_number, contract, context, clause_ids))
+
+    all_clause_ids = {cid for _, _, _, ids in prepared for cid in ids}
+    clauses_by_id = {
+        c.clause_id: c
+        for c in Clause.objects.filter(
+            tenant_id=job.tenant_id, clause_id__in=all_clause_ids, status='published'
+        ).order_by('clause_id')
+    }
+
+    manifest = []
+    buffer = io.BytesIO()
+    with transaction.atomic():
+        contracts = Contract.objects.bulk_create([c for _, c, _, _ in prepared])
+        record_status_change(job.tenant_id, None, 'draft', count=len(contracts))
+
+        versions, provenance, logs = [], [], []
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for row_number, contract, context, clause_ids in prepared:
+                clauses = [clauses_by_id[cid] for cid in sorted(set(clause_ids)) if cid in clauses_by_id]
+                doc = generator._create_document(contract, clause_ids, context, clauses=clauses)
+                doc_bytes = io.BytesIO()
+                doc.save(doc_bytes)
+                content = doc_bytes.getvalue()
+
+                filename = f"{row_number:05d}_{_safe_filename(contract.title)}.docx"
+                zf.writestr(filename, content)
+                manifest.append({'row': row_number, 'contract_id': str(contract.id), 'title': contract.title, 'file': filename})
+
+                version = ContractVersion(
+                    contract=contract,
+                    version_number=1,
+                    template_id=template.id,
+                    template_version=template.version,
+                    change_summary='Initial draft (bulk generation)',
+                    created_by=job.created_by,
+                    file_size=len(content),
+                    file_hash=hashlib.sha256(content).hexdigest(),
+                    r2_key=f'contracts/{contract.id}/v1.docx',
+                )
+                versions.append(version)
+                provenance.extend(generator.clause_provenance(version, clauses, context))
+                logs.append(WorkflowLog(
+                    contract=contract,
+                    action='created',
+                    performed_by=job.created_by,
+                    comment=f'Generated from template: {template.name} v{template.version} (bulk job {job.id})',
+                ))
+                logs.append(WorkflowLog(
+                    contract=contract,
+                    action='version_created',
+                    performed_by=job.created_by,
+                    comment='Version 1 created',
+                    metadata={'clause_count': len(clause_ids)},
+                ))
+            zf.writestr('_manifest.json', json.dumps({'generated': manifest, 'errors': errors}))
+
+        ContractVersion.objects.bulk_create(versions)
+        ContractClause.objects.bulk_create(provenance)
+        WorkflowLog.objects.bulk_create(logs)
+
+        # Recorded first so a duplicate run stops before uploading. The upload
+        # is still inside the transaction: if it fails nothing is committed and
+        # the retried chunk starts clean (the key is deterministic).
+        _record_chunk(job.id, index, len(contracts), errors)
+        R2StorageService().put_bytes(
+            chunk_r2_key(job.tenant_id, job.id, index),
+            buffer.getvalue(),
+            content_type='application/zip',
+            metadata={'tenant_id': str(job.tenant_id), 'purpose': 'bulk_generation_chunk'},
+        )
+
+    return len(contracts), len(errors)
+
+
+def fail_chunk(job_id, index: int, error: str) -> None:
+    """Count every row of a chunk that could not be processed at all as failed."""
+    try:
+        with transaction.atomic():
+            job = BulkGenerationJob.objects.only('id', 'chunk_size', 'total_rows').get(id=job_id)
+            start = index * job.chunk_size
+            count = max(0, min(job.chunk_size, job.total_rows - start))
+            errors = [{'row': start + i + 1, 'error': error} for i in range(count)]
+            _record_chunk(job_id, index, 0, errors)
+    except ChunkAlreadyRecorded:
+        pass
+
+
+def _record_chunk(job_id, index: int, succeeded: int, errors: list) -> None:
+    """Add one chunk's results to the job and queue finalization after the last one."""
+    job = BulkGenerationJob.objects.select_for_update().only(
+        'id', 'errors', 'chunks_done', 'total_chunks', 'recorded_chunks'
+    ).get(id=job_id)
+    chunks = list(job.recorded_chunks or [])
+    if index in chunks:
+        raise ChunkAlreadyRecorded(f'Chunk {index} of {job_id} is already recorded')
+    recorded = list(job.errors or [])
+    recorded.extend(errors[: max(0, MAX_RECORDED_ERRORS - len(recorded))])
+    BulkGenerationJob.objects.filter(id=job_id).update(
+        chunks_done=F('chunks_done') + 1,
+        recorded_chunks=chunks + [index],
+        succeeded=F('succeeded') + succeeded,
+        failed=F('failed') + len(errors),
+        errors=recorded,
+        updated_at=timezone.now(),
+    )
+    if job.chunks_done + 1 >= job.total_chunks:
+        from .tasks import finalize_bulk_generation_task
+
+        transaction.on_commit(lambda: finalize_bulk_generation_task.delay(str(job_id)))
+
+
+def recover_stalled_jobs() -> int:
+    """
+    Restart jobs with no progress for `stall_seconds()`. Returns how many
+    were acted on.
+
+    Claimed chunks that were never recorded are re-queued, up to
+    MAX_STALL_REQUEUES times per job; after that they are failed. A job with
+    every chunk recorded gets its finalization queued again.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stall_seconds())
+    stalled = BulkGenerationJob.objects.filter(
+        status__in=('pending', 'processing'), updated_at__lt=cutoff
+    ).values_list('id', flat=True)
+    return sum(1 for job_id in stalled if _recover_job(job_id, cutoff))
+
+
+def _recover_job(job_id, cutoff) -> bool:
+    from .tasks import bulk_generation_chunk_task, finalize_bulk_generation_task
+
+    with transaction.atomic():
+        job = (
+            BulkGenerationJob.objects.select_for_update()
+            .only('id', 'status', 'next_chunk', 'total_chunks', 'chunks_done', 'recorded_chunks', 'stall_requeues')
+            .filter(id=job_id, status__in=('pending', 'processing'), updated_at__lt=cutoff)
+            .first()
+        )
+        if job is None:
+            return False
+        recorded = set(job.recorded_chunks or [])
+        if job.chunks_done >= job.total_chunks:
+            # Only finalization was lost.
+            BulkGenerationJob.objects.filter(id=job_id).update(updated_at=timezone.now())
+            transaction.on_commit(lambda: finalize_bulk_generation_task.delay(str(job_id)))
+            return True
+        if len(recorded) != job.chunks_done:
+            # Started before chunks were tracked; the lost ones can't be told apart.
+            BulkGenerationJob.objects.filter(id=job_id).update(
+                status='failed', error_message='Job stalled', updated_at=timezone.now()
+            )
+            return True
+
+        lost = [i for i in range(job.next_chunk) if i not in recorded]
+        if lost and job.stall_requeues >= MAX_STALL_REQUEUES:
+            logger.error(f"Bulk generation job {job_id}: failing lost chunk(s) {lost}")
+            for index in lost:
+                fail_chunk(job_id, index, 'Chunk was lost by the worker')
+            return True
+
+        BulkGenerationJob.objects.filter(id=job_id).update(
+            stall_requeues=F('stall_requeues') + 1, updated_at=timezone.now()
+        )
+        logger.warning(f"Bulk generation job {job_id} stalled; re-queueing chunk(s) {lost}")
+        # Re-queued chunks each hand off to a successor; with none lost, the
+        # hand-off itself was dropped and unclaimed chunks are started again.
+        restarts = 0 if lost else min(max_concurrency(), job.total_chunks - job.next_chunk)
+
+        def requeue():
+            for index in lost:
+                bulk_generation_chunk_task.delay(str(job_id), index=index)
+            for _ in range(restarts):
+                bulk_generation_chunk_task.delay(str(job_id))
+
+        transaction.on_commit(requeue)
+    return True
+
+
+def finalize_job(job_id) -> Optional[str]:
+    """Merge chunk ZIPs and a manifest.csv into the result ZIP. Returns its R2 key."""
+    job = BulkGenerationJob.objects.defer('rows').get(id=job_id)
+    if job.status in ('completed', 'failed'):
+        return job.result_r2_key
+
+    r2 = R2StorageService()
+    manifest_rows = []
+    chunk_keys = [chunk_r2_key(job.tenant_id, job.id, i) for i in range(job.total_chunks)]
+
+    with tempfile.TemporaryFile() as out:
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as result:
+            for key in chunk_keys:
+                try:
+                    data = r2.get_file_bytes(key)
+                except Exception as e:
+                    # Chunk failed before uploading; its rows are already counted as failed.
+                    logger.warning(f"Bulk generation chunk {key} unavailable: {e}")
+                    continue
+                with zipfile.ZipFile(io.BytesIO(data)) as chunk:
+                    for name in chunk.namelist():
+                        if name == '_manifest.json':
+                            part = json.loads(chunk.read(name))
+                            manifest_rows.extend({**m, 'status': 'generated', 'error': ''} for m in part.get('generated', []))
+                            manifest_rows.extend(
+                                {'row': e['row'], 'contract_id': '', 'title': '', 'file': '', 'status': 'failed', 'error': e['error']}
+                                for e in part.get('errors', [])
+                            )
+                        else:
+                            result.writestr(name, chunk.read(name))
+
+            listed = {m['row'] for m in manifest_rows}
+            manifest_rows.extend(
+                {'row': e['row'], 'contract_id': '', 'title': '', 'file': '', 'status': 'failed', 'error': e['error']}
+                for e in (job.errors or [])
+                if e.get('row') not in listed
+            )
+
+            manifest = io.StringIO()
+            writer = csv.DictWriter(manifest, fieldnames=['row', 'status', 'contract_id', 'title', 'file', 'error'])
+            writer.writeheader()
+            writer.writerows(sorted(manifest_rows, key=lambda m: m['row']))
+            result.writestr('manifest.csv', manifest.getvalue())
+
+        out.seek(0)
+        key = result_r2_key(job.tenant_id, job.id)
+        r2.put_bytes(
+            key,
+            out,
+            content_type='application/zip',
+            metadata={'tenant_id': str(job.tenant_id), 'purpose': 'bulk_generation_result'},
+        )
+
+    BulkGenerationJob.objects.filter(id=job.id).update(
+        status='completed',
+        result_r2_key=key,
+        rows=[],
+        completed_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    tombstone_keys(chunk_keys, reason='bulk_generation_chunk')
+    return key
@@ -0,0 +1,124 @@
+"""
+Precomputed clause embeddings for AI drafting retrieval.
+
+Published clauses are embedded once (when created/updated) and stored in
+`Clause.embedding` behind an HNSW cosine index, so generation endpoints only
+embed the user's prompt and run a single ANN query.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from pgvector.django import CosineDistance
+
+from .models import Clause
+
+logger = logging.getLogger(__name__)
+
+# Same bound the per-request retrieval used.
+MAX_EMBED_CHARS = 8000
+EMBED_BATCH_SIZE = 64
+
+
+def clause_embedding_text(clause: Clause) -> str:
+    return f"{clause.name}\n\n{clause.content}"[:MAX_EMBED_CHARS]
+
+
+def clause_embedding_sha256(clause: Clause) -> str:
+    return hashlib.sha256(clause_embedding_text(clause).encode('utf-8')).hexdigest()
+
+
+def needs_embedding(clause: Clause) -> bool:
+    return clause.status == 'published' and (
+        clause.embedding is None or clause.embedding_sha256 != clause_embedding_sha256(clause)
+    )
+
+
+def refresh_clause_embeddings(clause_ids: Iterable) -> int:
+    """Embed the given clauses if their text changed. Returns how many were stored."""
+    from repository.embeddings_service import VoyageEmbeddingsService
+
+    clauses = [c for c in Clause.objects.filter(id__in=list(clause_ids)) if needs_embedding(c)]
+    if not clauses:
+        return 0
+
+    svc = VoyageEmbeddingsService()
+    stored = 0
+    for start in range(0, len(clauses), EMBED_BATCH_SIZE):
+        batch = clauses[start:start + EMBED_BATCH_SIZE]
+        embeddings = svc.embed_batch([clause_embedding_text(c) for c in batch])
+        if svc.use_mock:
+            # Mock vectors are not comparable with real query embeddings; don't persist them.
+            logger.warning('Voyage AI unavailable; skipping clause embedding refresh')
+            return stored
+        for clause, emb in zip(batch, embeddings):
+            if not emb:
+                continue
+            # update() avoids touching updated_at and re-triggering post_save.
+            Clause.objects.filter(id=clause.id).update(
+                embedding=emb,
+                embedding_sha256=clause_embedding_sha256(clause),
+            )
+            stored += 1
+    logger.info(f"Stored embeddings for {stored} clause(s)")
+    return stored
+
+
+def schedule_clause_embedding(clause_ids: Iterable) -> None:
+    """Queue an embedding refresh after the current transaction commits."""
+    ids = [str(i) for i in clause_ids]
+    if not ids:
+        return
+
+    def _enqueue():
+        try:
+            from .tasks import embed_clauses
+            embed_clauses.delay(ids)
+        except Exception as e:
+            # No broker (e.g. local dev): the backfill command or next retrieval will catch up.
+            logger.warning(f"Could not enqueue clause embedding for {len(ids)} clause(s): {e}")
+
+    transaction.on_commit(_enqueue)
+
+
+def find_relevant_clauses(
+    tenant_id,
+    query_embedding: Optional[List[float]],
+    contract_type: Optional[str] = None,
+    limit: int = 5,
+) -> List[dict]:
+    """
+    Nearest published clauses to `query_embedding` by cosine distance.
+
+    Published clauses that have no embedding yet (e.g. bulk-seeded) are
+    queued for embedding so later requests can retrieve them.
+    """
+    if not query_embedding:
+        return []
+
+    qs = Clause.objects.filter(tenant_id=tenant_id, status='published')
+    if contract_type:
+        qs = qs.filter(contract_type=contract_type)
+
+    missing = list(qs.filter(embedding__isnull=True).values_list('id', flat=True)[:EMBED_BATCH_SIZE])
+    if missing:
+        schedule_clause_embedding(missing)
+
+    rows = (
+        qs.filter(embedding__isnull=False)
+        .annotate(distance=CosineDistance('embedding', query_embedding))
+        .order_by('distance')
+        .only('clause_id', 'name', 'content')[:limit]
+    )
+    return [
+        {
+            'clause_id': c.clause_id,
+            'name': c.name,
+            'similarity': round(1.0 - float(c.distance), 4),
+            'content': c.content,
+        }
+        for c in rows
+    ]
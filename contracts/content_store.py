@@ -0,0 +1,336 @@
+"""
+Large contract content kept off the hot `contracts` row.
+
+Editor content (rendered_text / rendered_html / raw_text) lives in
+`ContractContent`, one row per contract, and signed PDFs live in R2, so
+list/filter queries and metadata updates on `Contract` never rewrite or
+de-TOAST them.
+
+Rows written before the table existed still carry content in
+`Contract.metadata` (in full while an autosave was pending, otherwise as a
+bounded excerpt next to an R2 editor snapshot). Readers fall back to those
+until `migrate_contract_content` has moved the row.
+
+Clones share content copy-on-write: `share_content` points both rows at
+one immutable `ContractContentSnapshot`, and `store_content` gives a row
+its own copy on its first content write.
+
+Every content write also stores `plain_text` (rendered_text, or the
+stripped rendered_html when there is no text) and its sha256. Exports,
+signing PDFs and AI context read that instead of stripping HTML again.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.utils import timezone
+
+from authentication.r2_service import R2StorageService
+
+from .models import Contract, ContractContent, ContractContentSnapshot
+
+logger = logging.getLogger(__name__)
+
+CONTENT_KEYS = ('rendered_text', 'rendered_html', 'raw_text')
+# Derived from CONTENT_KEYS on write; stored and shared alongside them.
+PLAIN_TEXT_KEYS = ('plain_text', 'plain_text_sha256')
+_ROW_KEYS = CONTENT_KEYS + PLAIN_TEXT_KEYS
+# Describes the legacy in-row excerpt only; meaningless once content is moved.
+_LEGACY_MARKERS = ('rendered_text_truncated',)
+
+MIGRATION_BATCH_SIZE = 200
+
+
+class ContentUnavailable(Exception):
+    """Legacy content only exists in R2 and could not be read."""
+
+
+def strip_html(html: str) -> str:
+    """Best-effort HTML -> plain text (keeps line breaks for common block tags)."""
+    if not html:
+        return ''
+    text = re.sub(r'(?i)<\s*br\s*/?>', '\n', html)
+    text = re.sub(r'(?i)</\s*(p|div|h\d|li)\s*>', '\n', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = text.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def plain_text_of(rendered_text, rendered_html) -> str:
+    """The canonical plain text of editor content."""
+    if isinstance(rendered_text, str) and rendered_text.strip():
+        return rendered_text
+    return strip_html(rendered_html if isinstance(rendered_html, str) else '')
+
+
+def _plain_text_fields(plain_text: str) -> dict:
+    return {
+        'plain_text': plain_text,
+        'plain_text_sha256': hashlib.sha256(plain_text.encode('utf-8', errors='replace')).hexdigest(),
+    }
+
+
+def split_content(md) -> tuple[dict, dict]:
+    """Return (metadata without content keys, the content keys that were present)."""
+    md = dict(md) if isinstance(md, dict) else {}
+    content = {k: md.pop(k) for k in CONTENT_KEYS if k in md}
+    for k in _LEGACY_MARKERS:
+        md.pop(k, None)
+    return md, {k: (v if isinstance(v, str) else '') for k, v in content.items()}
+
+
+def store_content(contract_id, tenant_id, **fields) -> None:
+    """Upsert the given ContractContent fields (others are left untouched)."""
+    with transaction.atomic():
+        # Locked whether or not it is shared, so a concurrent share_content
+        # can't move the content into a snapshot under this write.
+        row = (
+            ContractContent.objects.select_for_update()
+            .filter(contract_id=contract_id)
+            .values('snapshot_id')
+            .first()
+        )
+        if 'rendered_text' in fields or 'rendered_html' in fields:
+            fields = {**fields, **_plain_text_fields(_derive_plain_text(contract_id, fields))}
+        if row is not None and row['snapshot_id'] and any(k in fields for k in CONTENT_KEYS):
+            _detach_snapshot(contract_id, row['snapshot_id'], fields)
+            return
+        ContractContent.objects.update_or_create(
+            contract_id=contract_id,
+            defaults={'tenant_id': tenant_id, **fields},
+        )
+
+
+def _derive_plain_text(contract_id, fields: dict) -> str:
+    text, html = fields.get('rendered_text'), fields.get('rendered_html')
+    if 'rendered_html' not in fields and not (isinstance(text, str) and text.strip()):
+        # Text-only write that is blank: the stored html decides.
+        html = (get_stored_content(contract_id) or {}).get('rendered_html')
+    elif 'rendered_text' not in fields:
+        text = (get_stored_content(contract_id) or {}).get('rendered_text')
+    return plain_text_of(text, html)
+
+
+def _detach_snapshot(contract_id, snapshot_id, fields: dict) -> None:
+    """First write to a shared row: copy the untouched content keys (in SQL) and apply `fields`."""
+    copied = {
+        k: Subquery(ContractContentSnapshot.objects.filter(id=snapshot_id).values(k)[:1])
+        for k in _ROW_KEYS
+        if k not in fields
+    }
+    ContractContent.objects.filter(contract_id=contract_id).update(
+        snapshot=None, updated_at=timezone.now(), **copied, **fields,
+    )
+    ContractContentSnapshot.objects.filter(id=snapshot_id, contents__isnull=True).delete()
+
+
+def share_content(source_contract_id, contract_id, tenant_id) -> bool:
+    """
+    Give `contract_id` the content of `source_contract_id` without copying
+    it. Returns False if the source has no ContractContent row.
+
+    The first clone moves the source's content into a snapshot (in SQL,
+    once). Later clones only insert a row pointing at it.
+    """
+    with transaction.atomic():
+        source = (
+            ContractContent.objects.select_for_update()
+            .filter(contract_id=source_contract_id)
+            .values('snapshot_id')
+            .first()
+        )
+        if source is None:
+            return False
+        snapshot_id = source['snapshot_id']
+        if snapshot_id is None:
+            snapshot = ContractContentSnapshot.objects.create(tenant_id=tenant_id)
+            snapshot_id = snapshot.id
+            ContractContentSnapshot.objects.filter(id=snapshot_id).update(**{
+                k: Subquery(ContractContent.objects.filter(contract_id=source_contract_id).values(k)[:1])
+                for k in _ROW_KEYS
+            })
+            # Content is unchanged, so updated_at is left alone.
+            ContractContent.objects.filter(contract_id=source_contract_id).update(
+                snapshot_id=snapshot_id, **{k: '' for k in _ROW_KEYS},
+            )
+        ContractContent.objects.update_or_create(
+            contract_id=contract_id,
+            defaults={'tenant_id': tenant_id, 'snapshot_id': snapshot_id, **{k: '' for k in _ROW_KEYS}},
+        )
+    return True
+
+
+def delete_unreferenced_snapshots(limit: int = 500) -> int:
+    """Delete content snapshots whose contracts have all been edited or deleted."""
+    ids = list(
+        ContractContentSnapshot.objects.filter(contents__isnull=True).values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return 0
+    deleted, _ = ContractContentSnapshot.objects.filter(id__in=ids, contents__isnull=True).delete()
+    return deleted
+
+
+def get_stored_content(contract_id) -> Optional[dict]:
+    """Content from ContractContent, or None if the row hasn't been created/migrated."""
+    row = (
+        ContractContent.objects.filter(contract_id=contract_id)
+        .values('snapshot_id', *CONTENT_KEYS, *(f'snapshot__{k}' for k in CONTENT_KEYS))
+        .first()
+    )
+    if row is None:
+        return None
+    prefix = 'snapshot__' if row['snapshot_id'] else ''
+    return {k: row[prefix + k] for k in CONTENT_KEYS}
+
+
+def get_stored_plain_text(contract_id) -> Optional[dict]:
+    """
+    {'text', 'sha256'} of the stored content, or None if the contract has
+    no ContractContent row. Rows written before plain_text existed derive
+    and save it on first read.
+    """
+    row = (
+        ContractContent.objects.filter(contract_id=contract_id)
+        .values('snapshot_id', *PLAIN_TEXT_KEYS, *(f'snapshot__{k}' for k in PLAIN_TEXT_KEYS))
+        .first()
+    )
+    if row is None:
+        return None
+    prefix = 'snapshot__' if row['snapshot_id'] else ''
+    if row[prefix + 'plain_text_sha256']:
+        return {'text': row[prefix + 'plain_text'], 'sha256': row[prefix + 'plain_text_sha256']}
+
+    stored = get_stored_content(contract_id) or {}
+    derived = _plain_text_fields(plain_text_of(stored.get('rendered_text'), stored.get('rendered_html')))
+    try:
+        if row['snapshot_id']:
+            ContractContentSnapshot.objects.filter(id=row['snapshot_id'], plain_text_sha256='').update(**derived)
+        else:
+            # Content is unchanged, so updated_at is left alone; a concurrent write derives its own.
+            ContractContent.objects.filter(
+                contract_id=contract_id, snapshot__isnull=True, plain_text_sha256='',
+            ).update(**derived)
+    except Exception as e:
+        logger.warning(f"Could not backfill plain text for {contract_id}: {e}")
+    return {'text': derived['plain_text'], 'sha256': derived['plain_text_sha256']}
+
+
+def legacy_content(contract_id, md: dict) -> dict:
+    """
+    Full content of a row that predates ContractContent.
+
+    Compacted rows only kept an excerpt in metadata; their full content is
+    read back from the R2 editor snapshot.
+    """
+    md = md or {}
+    content = {k: (md.get(k) if isinstance(md.get(k), str) else '') for k in CONTENT_KEYS}
+    r2_key = md.get('editor_r2_key')
+    if md.get('editor_pending_flush') or not (isinstance(r2_key, str) and r2_key.strip()):
+        return content
+
+    try:
+        raw = R2StorageService().get_file_bytes(r2_key.strip())
+        snap = json.loads(raw.decode('utf-8', errors='replace')) if raw else None
+    except Exception as e:
+        raise ContentUnavailable(f'editor snapshot {r2_key} could not be read: {e}')
+    if isinstance(snap, dict):
+        content['rendered_text'] = snap.get('rendered_text') or ''
+        content['rendered_html'] = snap.get('rendered_html') or ''
+    return content
+
+
+def signed_pdf_r2_key(tenant_id, contract_id) -> str:
+    """Deterministic R2 key for a contract's signed PDF (under the contract prefix)."""
+    return f"{tenant_id}/contracts/{contract_id}/signed/signed.pdf"
+
+
+def store_signed_pdf(contract_id, tenant_id, data: bytes) -> str:
+    """Upload a signed PDF to R2 and record it on ContractContent. Returns the R2 key."""
+    key = signed_pdf_r2_key(tenant_id, contract_id)
+    R2StorageService().put_bytes(
+        key,
+        data,
+        content_type='application/pdf',
+        metadata={'tenant_id': str(tenant_id), 'contract_id': str(contract_id), 'purpose': 'signed_pdf'},
+    )
+    store_content(
+        contract_id,
+        tenant_id,
+        signed_pdf_r2_key=key,
+        signed_pdf_sha256=hashlib.sha256(data).hexdigest(),
+        signed_pdf_size=len(data),
+    )
+    return key
+
+
+def _needs_migration_q() -> Q:
+    return Q(metadata__has_any_keys=list(CONTENT_KEYS)) | Q(signed_pdf__isnull=False)
+
+
+def migrate_contract_row(contract_id) -> bool:
+    """
+    Move one contract's in-row content to ContractContent and its signed PDF
+    to R2, then shrink the row. Returns True if the row was changed.
+
+    The metadata update deliberately leaves updated_at alone: the contract
+    itself did not change.
+    """
+    with transaction.atomic():
+        contract = (
+            Contract.objects.select_for_update()
+            .filter(id=contract_id)
+            .only('id', 'tenant_id', 'metadata', 'signed_pdf')
+            .first()
+        )
+        if contract is None:
+            return False
+
+        md = contract.metadata if isinstance(contract.metadata, dict) else {}
+        has_content = any(k in md for k in CONTENT_KEYS)
+        pdf = bytes(contract.signed_pdf) if contract.signed_pdf is not None else None
+        if not has_content and pdf is None:
+            return False
+
+        updates = {}
+        if has_content:
+            # An existing ContractContent row is always newer than leftovers in metadata.
+            if not ContractContent.objects.filter(contract_id=contract.id).exists():
+                store_content(contract.id, contract.tenant_id, **legacy_content(contract.id, md))
+            updates['metadata'], _ = split_content(md)
+        if pdf is not None:
+            store_signed_pdf(contract.id, contract.tenant_id, pdf)
+            updates['signed_pdf'] = None
+
+        Contract.objects.filter(id=contract.id).update(**updates)
+    return True
+
+
+def migrate_contract_content(after=None, batch_size: int = MIGRATION_BATCH_SIZE) -> tuple[int, Optional[str]]:
+    """
+    Migrate one batch of contracts (keyset-paginated by id).
+
+    Returns (rows migrated, id to resume after or None when done). Rows that
+    fail (e.g. R2 unavailable) are logged and skipped; a later run retries them.
+    """
+    qs = Contract.objects.filter(_needs_migration_q()).order_by('id')
+    if after:
+        qs = qs.filter(id__gt=after)
+    ids = list(qs.values_list('id', flat=True)[:batch_size])
+
+    migrated = 0
+    for contract_id in ids:
+        try:
+            if migrate_contract_row(contract_id):
+                migrated += 1
+        except Exception as e:
+            logger.warning(f"Contract content migration failed for {contract_id}: {e}")
+
+    next_after = str(ids[-1]) if len(ids) == batch_size else None
+    return migrated, next_after
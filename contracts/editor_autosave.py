@@ -0,0 +1,348 @@
+"""
+Write-behind persistence for contract editor content.
+
+Autosaves commit the full editor content into `ContractContent` together
+with a revision-checked UPDATE of `Contract.metadata` and return
+immediately. A background flush then writes the R2 `latest.json` snapshot
+and refreshes the search index. Rapid successive saves for the same
+contract are coalesced into one flush of the newest revision.
+
+The flush does its R2 and index I/O outside any transaction and applies
+the result with an UPDATE guarded by the revision it read. A flush that
+loses that race may have overwritten a newer snapshot in R2, so it marks
+the contract pending and queues another flush.
+
+Delta saves (contracts.editor_deltas) append to the op log instead; the
+same flush folds them into a checkpoint.
+
+Metadata keys:
+  editor_revision          revision of the content checkpointed in ContractContent
+  editor_pending_flush     True while that revision is not yet in R2
+  editor_flushed_revision  last revision written to R2
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from authentication.r2_service import R2StorageService
+
+from .content_store import ContentUnavailable, get_stored_content, legacy_content, split_content, store_content
+from .editor_deltas import DeltaError, has_pending_deltas, load_editor_content
+from .models import Contract, ContractEditorOp
+
+try:
+    from prometheus_client import Counter, Histogram
+except Exception:  # pragma: no cover
+    Counter = None
+    Histogram = None
+
+logger = logging.getLogger(__name__)
+
+# How long saves are allowed to pile up before a flush runs.
+FLUSH_DELAY_SECONDS = 2
+# Delta saves are cheap to keep in the op log, so checkpoint them less often.
+DELTA_CHECKPOINT_DELAY_SECONDS = 30
+DELTA_CHECKPOINT_EVERY_OPS = 50
+# Guard key lifetime; a lost task can't block flushes for longer than this.
+FLUSH_LOCK_TTL_SECONDS = 60
+if Counter is not None and Histogram is not None:
+    EDITOR_FLUSH_LAG = Histogram(
+        'clm_editor_flush_lag_seconds',
+        'Time from an editor save being accepted to its snapshot reaching R2 (seconds)',
+        buckets=(0.5, 1, 2, 3, 5, 10, 30, 60, 120, 300),
+    )
+    EDITOR_FLUSH_TOTAL = Counter(
+        'clm_editor_flush_total',
+        'Editor snapshot flushes',
+        ['result'],
+    )
+    EDITOR_SAVES_COALESCED = Counter(
+        'clm_editor_saves_coalesced_total',
+        'Editor saves superseded by a newer revision before being flushed',
+    )
+else:
+    EDITOR_FLUSH_LAG = None
+    EDITOR_FLUSH_TOTAL = None
+    EDITOR_SAVES_COALESCED = None
+
+
+class EditorFlushError(Exception):
+    """R2 write failed; content stays pending in the DB row and the flush should be retried."""
+
+
+def editor_snapshot_r2_key(tenant_id, contract_id) -> str:
+    """Deterministic R2 key for the latest editor snapshot."""
+    return f"{tenant_id}/contracts/{contract_id}/editor/latest.json"
+
+
+def _flush_lock_key(contract_id) -> str:
+    return f"contracts:editor-flush:{contract_id}"
+
+
+def schedule_editor_flush(contract_id, delay: int = FLUSH_DELAY_SECONDS) -> None:
+    """
+    Queue a flush unless one is already pending for this contract.
+
+    The flush reads whatever revision is current when it runs, so saves
+    arriving while a flush is queued ride along with it.
+    """
+    if not cache.add(_flush_lock_key(contract_id), 1, timeout=FLUSH_LOCK_TTL_SECONDS):
+        return
+    try:
+        from .tasks import flush_editor_snapshot_task
+        flush_editor_snapshot_task.apply_async(args=[str(contract_id)], countdown=delay)
+    except Exception as e:
+        # No broker available: flush inline so R2 doesn't fall behind.
+        logger.warning(f"Could not enqueue editor flush for {contract_id}, flushing inline: {e}")
+        cache.delete(_flush_lock_key(contract_id))
+        try:
+            flush_editor_snapshot(contract_id)
+        except Exception as flush_error:
+            logger.error(f"Inline editor flush failed for {contract_id}: {flush_error}")
+
+
+def flush_editor_snapshot(contract_id) -> bool:
+    """
+    Write the pending editor content for a contract to R2 (checkpointing any
+    delta ops into ContractContent).
+
+    Safe to call repeatedly; returns True when nothing is left pending.
+    Raises if the R2 write fails so the caller can retry.
+    """
+    # Release the coalescing guard first: saves landing after this point
+    # schedule their own flush, saves before it are read below.
+    cache.delete(_flush_lock_key(contract_id))
+
+    # The state is read under a short per-contract lock; the R2 write and
+    # re-index run after it commits, so no transaction (or connection)
+    # is held across network calls. The checkpoint is then applied under
+    # the lock again (_commit_checkpoint).
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [f'editor-flush:{contract_id}'])
+        state = _read_flush_state(contract_id)
+
+    if state is True:
+        return True
+    if isinstance(state, Exception):
+        raise EditorFlushError(str(state)) from state
+    result = _write_flush(state)
+    if isinstance(result, Exception):
+        raise EditorFlushError(str(result)) from result
+    return result
+
+
+def _revision_row(contract_id, revision):
+    """The contract row, only while its editor revision is still `revision`."""
+    if revision is None:
+        return Contract.objects.filter(id=contract_id, metadata__editor_revision__isnull=True)
+    return Contract.objects.filter(id=contract_id, metadata__editor_revision=revision)
+
+
+def _read_flush_state(contract_id):
+    """What a flush should write: True if nothing is pending, an Exception, or a dict."""
+    contract = (
+        Contract.objects.filter(id=contract_id)
+        .only('id', 'tenant_id', 'title', 'contract_type', 'status', 'metadata')
+        .first()
+    )
+    if contract is None:
+        return True
+
+    md = dict(contract.metadata or {})
+    row_revision = md.get('editor_revision')
+    deltas_pending = has_pending_deltas(contract.id, md)
+    if not md.get('editor_pending_flush') and not deltas_pending:
+        return True
+
+    # Only applied to the row once the snapshot is in R2.
+    checkpoint_md = {}
+    # ContractContent fields to write along with the row, if any.
+    checkpoint_content = None
+    if deltas_pending:
+        # Checkpoint: fold the delta op log into a full snapshot.
+        try:
+            content = load_editor_content(contract.id, md)
+        except DeltaError as e:
+            return e
+        revision = content['revision']
+        rendered_text = content['rendered_text']
+        rendered_html = content['rendered_html']
+        checkpoint_content = {'rendered_text': rendered_text, 'rendered_html': rendered_html}
+        if isinstance(md.get('raw_text'), str):
+            # Legacy row: keep its template text when moving content out of metadata.
+            checkpoint_content['raw_text'] = md['raw_text']
+        checkpoint_md = {
+            'editor_content_sha256': content['sha256'],
+            'editor_text_len': len(rendered_text),
+            'editor_html_len': len(rendered_html),
+            'editor_preview_text': rendered_text.strip()[:2000],
+            'editor_has_content': bool(rendered_text.strip()),
+        }
+        last_op_at = (
+            ContractEditorOp.objects.filter(contract_id=contract.id, revision=revision)
+            .values_list('created_at', flat=True)
+            .first()
+        )
+        if last_op_at is not None:
+            checkpoint_md['editor_server_updated_at_ms'] = int(last_op_at.timestamp() * 1000)
+    else:
+        revision = row_revision
+        stored = get_stored_content(contract.id)
+        if stored is None:
+            # Autosave written before ContractContent existed: move it over.
+            try:
+                stored = legacy_content(contract.id, md)
+            except ContentUnavailable as e:
+                return e
+            checkpoint_content = stored
+        rendered_text = stored['rendered_text']
+        rendered_html = stored['rendered_html']
+
+    return {
+        'contract': contract,
+        'md': md,
+        'row_revision': row_revision,
+        'revision': revision,
+        'flushed_revision': md.get('editor_flushed_revision') or 0,
+        'rendered_text': rendered_text,
+        'rendered_html': rendered_html,
+        'checkpoint_md': checkpoint_md,
+        'checkpoint_content': checkpoint_content,
+    }
+
+
+def _request_reflush(contract_id) -> None:
+    """
+    Mark the contract pending again and queue a flush. Used when a flush
+    lost the revision race: its (older) snapshot may have landed in R2
+    after the newer one, which must therefore be written again.
+    """
+    contract = Contract.objects.filter(id=contract_id).only('id', 'metadata').first()
+    if contract is None:
+        return
+    md = dict(contract.metadata or {})
+    if not md.get('editor_pending_flush'):
+        md['editor_pending_flush'] = True
+        # A miss means a newer save landed, which marks and schedules itself.
+        _revision_row(contract_id, md.get('editor_revision')).update(metadata=md)
+    schedule_editor_flush(contract_id)
+
+
+def _commit_checkpoint(state: dict, md: dict) -> bool:
+    """
+    Apply a flushed checkpoint to the database in one transaction: the row
+    metadata, the ContractContent snapshot and the op-log trim. Only done if
+    no newer save (or flush) landed meanwhile; the row stays locked until
+    commit so a full save can't interleave with the content write.
+    """
+    contract = state['contract']
+    flushed_revision = state['flushed_revision']
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [f'editor-flush:{contract.id}'])
+        row = _revision_row(contract.id, state['row_revision'])
+        if row.select_for_update().values_list('id', flat=True).first() is None:
+            return False
+        row.update(metadata=md)
+        if state['checkpoint_content'] is not None:
+            store_content(contract.id, contract.tenant_id, **state['checkpoint_content'])
+        if isinstance(flushed_revision, int) and flushed_revision > 0:
+            # Ops up to the previous checkpoint are no longer needed for replay.
+            ContractEditorOp.objects.filter(contract_id=contract.id, revision__lte=flushed_revision).delete()
+    return True
+
+
+def _write_flush(state: dict):
+    contract = state['contract']
+    md = state['md']
+    revision = state['revision']
+    flushed_revision = state['flushed_revision']
+    rendered_text = state['rendered_text']
+    rendered_html = state['rendered_html']
+    checkpoint_md = state['checkpoint_md']
+
+    key = editor_snapshot_r2_key(contract.tenant_id, contract.id)
+    row = _revision_row(contract.id, state['row_revision'])
+
+    try:
+        R2StorageService().put_text(
+            key,
+            json.dumps(
+                {
+                    'schema': 'clm.editor_snapshot.v1',
+                    'contract_id': str(contract.id),
+                    'tenant_id': str(contract.tenant_id),
+                    'updated_at': timezone.now().isoformat(),
+                    'revision': revision,
+                    'client_updated_at_ms': md.get('editor_client_updated_at_ms'),
+                    'server_updated_at_ms': checkpoint_md.get(
+                        'editor_server_updated_at_ms', md.get('editor_server_updated_at_ms')
+                    ),
+                    'rendered_text': rendered_text,
+                    'rendered_html': rendered_html,
+                },
+                ensure_ascii=False,
+            ),
+            content_type='application/json; charset=utf-8',
+            metadata={
+                'tenant_id': str(contract.tenant_id),
+                'contract_id': str(contract.id),
+                'purpose': 'editor_snapshot',
+            },
+        )
+    except Exception as e:
+        md['editor_r2_sync_ok'] = False
+        md['editor_r2_sync_error'] = str(e)[:400]
+        row.update(metadata=md)
+        if EDITOR_FLUSH_TOTAL is not None:
+            EDITOR_FLUSH_TOTAL.labels(result='error').inc()
+        return e
+
+    # Best-effort: keep search index in sync for hybrid/semantic search.
+    try:
+        from search.services import SearchIndexingService
+
+        content_for_index = str(rendered_text or '').strip()
+        if content_for_index:
+            SearchIndexingService.create_index(
+                entity_type='contract',
+                entity_id=str(contract.id),
+                title=(contract.title or 'Contract'),
+                content=content_for_index,
+                tenant_id=str(contract.tenant_id),
+                keywords=[x for x in [contract.contract_type, contract.status] if x],
+            )
+    except Exception:
+        pass
+
+    md, _ = split_content(md)
+    md.update(checkpoint_md)
+    md['editor_pending_flush'] = False
+    md['editor_revision'] = revision
+    md['editor_flushed_revision'] = revision
+    md['editor_r2_key'] = key
+    md['editor_r2_synced_at'] = timezone.now().isoformat()
+    md['editor_r2_sync_ok'] = True
+    md.pop('editor_r2_sync_error', None)
+
+    compacted = _commit_checkpoint(state, md)
+    if not compacted:
+        _request_reflush(contract.id)
+
+    if EDITOR_FLUSH_TOTAL is not None:
+        EDITOR_FLUSH_TOTAL.labels(result='ok' if compacted else 'superseded').inc()
+    if EDITOR_SAVES_COALESCED is not None and isinstance(revision, int) and revision - flushed_revision > 1:
+        EDITOR_SAVES_COALESCED.inc(revision - flushed_revision - 1)
+    if EDITOR_FLUSH_LAG is not None:
+        saved_ms = md.get('editor_server_updated_at_ms')
+        if isinstance(saved_ms, (int, float)):
+            EDITOR_FLUSH_LAG.observe(max(0.0, time.time() - saved_ms / 1000.0))
+
+    return bool(compacted)
@@ -0,0 +1,221 @@
+"""
+Delta saves for contract editor content.
+
+Instead of resending the whole document, the editor submits ordered splice
+operations against the revision (and content hash) it last saw:
+
+    {"field": "html" | "text", "pos": 120, "delete": 5, "insert": "Buyer"}
+
+Positions and lengths are UTF-16 code units (JavaScript string indices) and
+each op applies to the result of the previous one. Ops are appended to
+`ContractEditorOp`; full content is only checkpointed (ContractContent + R2
+latest.json) by the write-behind flush in `contracts.editor_autosave`.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+
+from django.core.cache import cache
+
+from .content_store import (
+    ContentUnavailable,
+    get_stored_content,
+    get_stored_plain_text,
+    legacy_content,
+    plain_text_of,
+    strip_html,
+)
+from .models import ContractContent, ContractEditorOp
+
+logger = logging.getLogger(__name__)
+
+MAX_OPS_PER_SAVE = 1000
+MAX_INSERT_CHARS_PER_SAVE = 1_000_000
+# Keep the reconstructed document hot so consecutive deltas skip R2 + replay.
+CONTENT_CACHE_TTL_SECONDS = 15 * 60
+
+_FIELDS = {'html': 'rendered_html', 'text': 'rendered_text'}
+
+
+class DeltaError(ValueError):
+    """Ops are malformed or don't apply to the base content."""
+
+
+def editor_content_sha256(rendered_text: str, rendered_html: str) -> str:
+    """Content hash shared by full and delta saves (editor_content_sha256)."""
+    h = hashlib.sha256()
+    h.update((rendered_text or '').encode('utf-8', errors='replace'))
+    h.update(b"\n---\n")
+    h.update((rendered_html or '').encode('utf-8', errors='replace'))
+    return h.hexdigest()
+
+
+def _content_cache_key(contract_id) -> str:
+    return f"contracts:editor-content:{contract_id}"
+
+
+def cache_editor_content(contract_id, revision: int, rendered_text: str, rendered_html: str, sha256: str) -> None:
+    try:
+        cache.set(
+            _content_cache_key(contract_id),
+            {'revision': revision, 'sha256': sha256, 'rendered_text': rendered_text, 'rendered_html': rendered_html},
+            timeout=CONTENT_CACHE_TTL_SECONDS,
+        )
+    except Exception:
+        pass
+
+
+def _splice_utf16(value: str, pos: int, delete: int, insert: str) -> str:
+    units = value.encode('utf-16-le')
+    start, end = pos * 2, (pos + delete) * 2
+    if pos < 0 or delete < 0 or end > len(units):
+        raise DeltaError(f'op range {pos}+{delete} is outside content of length {len(units) // 2}')
+    out = units[:start] + insert.encode('utf-16-le') + units[end:]
+    try:
+        return out.decode('utf-16-le')
+    except UnicodeDecodeError:
+        raise DeltaError(f'op at {pos} splits a surrogate pair')
+
+
+def apply_ops(rendered_text: str, rendered_html: str, ops: list) -> tuple[str, str]:
+    """
+    Apply ordered splice ops. If ops only touch html, text is re-derived
+    from the new html (matching full saves that omit rendered_text).
+    """
+    if not isinstance(ops, list) or not ops:
+        raise DeltaError('ops must be a non-empty list')
+    if len(ops) > MAX_OPS_PER_SAVE:
+        raise DeltaError(f'at most {MAX_OPS_PER_SAVE} ops per save')
+
+    values = {'rendered_text': rendered_text or '', 'rendered_html': rendered_html or ''}
+    touched = set()
+    inserted = 0
+    for i, op in enumerate(ops):
+        if not isinstance(op, dict):
+            raise DeltaError(f'op {i} must be an object')
+        attr = _FIELDS.get(op.get('field'))
+        if attr is None:
+            raise DeltaError(f"op {i}: field must be 'html' or 'text'")
+        pos, delete, insert = op.get('pos'), op.get('delete', 0), op.get('insert', '')
+        if not isinstance(pos, int) or isinstance(pos, bool) or not isinstance(delete, int) or isinstance(delete, bool):
+            raise DeltaError(f'op {i}: pos and delete must be integers')
+        if not isinstance(insert, str):
+            raise DeltaError(f'op {i}: insert must be a string')
+        inserted += len(insert)
+        if inserted > MAX_INSERT_CHARS_PER_SAVE:
+            raise DeltaError('inserted text too large for a delta save; send full content instead')
+        values[attr] = _splice_utf16(values[attr], pos, delete, insert)
+        touched.add(attr)
+
+    if 'rendered_html' in touched and 'rendered_text' not in touched:
+        values['rendered_text'] = strip_html(values['rendered_html'])
+    return values['rendered_text'], values['rendered_html']
+
+
+def _checkpoint_content(contract_id, md: dict) -> tuple[str, str]:
+    """Full content as of metadata.editor_revision (ContractContent, else the legacy row/R2 snapshot)."""
+    stored = get_stored_content(contract_id)
+    if stored is not None:
+        return stored['rendered_text'], stored['rendered_html']
+
+    try:
+        content = legacy_content(contract_id, md)
+    except ContentUnavailable as e:
+        logger.warning(f"Editor checkpoint read failed for {contract_id}: {e}")
+        raise DeltaError('Stored editor checkpoint is unavailable; retry or send full content')
+    return content['rendered_text'], content['rendered_html']
+
+
+def has_pending_deltas(contract_id, md: dict) -> bool:
+    return ContractEditorOp.objects.filter(
+        contract_id=contract_id,
+        kind='delta',
+        revision__gt=int(md.get('editor_revision') or 0),
+    ).exists()
+
+
+def current_editor_content(contract_id, md: dict):
+    """
+    Current content from ContractContent plus the op log.
+
+    Returns None for rows that predate ContractContent and have nothing
+    pending; callers then fall back to the R2 snapshot / metadata.
+    """
+    md = md or {}
+    if not (
+        md.get('editor_pending_flush')
+        or ContractContent.objects.filter(contract_id=contract_id).exists()
+        or has_pending_deltas(contract_id, md)
+    ):
+        return None
+    try:
+        return load_editor_content(contract_id, md)
+    except DeltaError:
+        return None
+
+
+def _plain_text_result(content: dict) -> dict:
+    text = plain_text_of(content.get('rendered_text'), content.get('rendered_html'))
+    return {'text': text, 'sha256': hashlib.sha256(text.encode('utf-8', errors='replace')).hexdigest()}
+
+
+def editor_plain_text(contract_id, md: dict):
+    """
+    Canonical plain text of the current content as {'text', 'sha256'}.
+
+    Read from ContractContent.plain_text (derived at save time) unless delta
+    ops are waiting for a checkpoint. Returns None for rows that predate
+    ContractContent; callers then fall back to the R2 snapshot / metadata.
+    """
+    md = md or {}
+    if has_pending_deltas(contract_id, md):
+        try:
+            content = load_editor_content(contract_id, md)
+        except DeltaError:
+            return None
+        return _plain_text_result(content)
+    stored = get_stored_plain_text(contract_id)
+    if stored is None and md.get('editor_pending_flush'):
+        # Autosave from before ContractContent existed, still in metadata.
+        current = current_editor_content(contract_id, md)
+        if current:
+            return _plain_text_result(current)
+    return stored
+
+
+def load_editor_content(contract_id, md: dict) -> dict:
+    """
+    Current editor content: last checkpoint plus any delta ops after it.
+
+    Returns {'revision', 'sha256', 'rendered_text', 'rendered_html'}.
+    """
+    md = md or {}
+    checkpoint_rev = int(md.get('editor_revision') or 0)
+    latest = (
+        ContractEditorOp.objects.filter(contract_id=contract_id)
+        .order_by('-revision')
+        .values('revision', 'result_sha256')
+        .first()
+    )
+    latest_rev = max(checkpoint_rev, latest['revision'] if latest else 0)
+
+    cached = cache.get(_content_cache_key(contract_id))
+    if isinstance(cached, dict) and cached.get('revision') == latest_rev:
+        return cached
+
+    text, html = _checkpoint_content(contract_id, md)
+    revision = checkpoint_rev
+    sha = editor_content_sha256(text, html)
+    for op in ContractEditorOp.objects.filter(
+        contract_id=contract_id, kind='delta', revision__gt=checkpoint_rev
+    ).order_by('revision'):
+        if op.base_sha256 and op.base_sha256 != sha:
+            raise DeltaError(f'op log does not replay cleanly at revision {op.revision}')
+        text, html = apply_ops(text, html, op.ops)
+        sha = editor_content_sha256(text, html)
+        revision = op.revision
+
+    content = {'revision': revision, 'sha256': sha, 'rendered_text': text, 'rendered_html': html}
+    cache_editor_content(contract_id, revision, text, html, sha)
+    return content
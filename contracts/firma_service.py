@@ -2,9 +2,10 @@ import logging
 import os
 import uuid
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import requests
+if TYPE_CHECKING:
+    import requests
 
 logger = logging.getLogger(__name__)
 
@@ -121,7 +122,9 @@ class FirmaAPIService:
     def _url(self, path: str) -> str:
         return f"{self.config.base_url}{path if path.startswith('/') else '/' + path}"
 
-    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+    def _request(self, method: str, url: str, **kwargs) -> 'requests.Response':
+        import requests
+
         headers = dict(kwargs.pop('headers', {}) or {})
         headers.update(self._headers())
         
@@ -470,6 +473,8 @@ class FirmaAPIService:
         if not presigned_url:
             raise FirmaApiError('Missing pre-signed download URL')
 
+        import requests
+
         try:
             resp = requests.get(presigned_url, timeout=self.config.timeout_seconds, allow_redirects=True)
         except requests.RequestException as e:
@@ -10,8 +10,6 @@ from queue import Empty, Queue
 from threading import Lock
 
 
-import re
-import textwrap
 
 
 from django.core.files.base import ContentFile
@@ -26,11 +24,15 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 
+from contracts.content_store import strip_html
+from contracts.editor_deltas import editor_plain_text
 from contracts.firma_service import FirmaAPIService, FirmaApiError
 from contracts.models import Contract, ContractVersion, FirmaSignatureContract, FirmaSigner, FirmaSigningAuditLog
 from contracts.models import TemplateFile
+from contracts.pdf_render_cache import get_or_render_pdf
 from contracts.utils.template_files_db import get_or_import_template_from_filesystem
 from authentication.r2_service import R2StorageService
+from clm_backend.conditional import r2_file_response
 
 from django.conf import settings
 
@@ -100,75 +102,31 @@ def _read_template_file_signature_config(*, template_filename: str, tenant_id: u
 
 
 
-def _strip_html(html: str) -> str:
-   if not html:
-       return ''
-   text = re.sub(r'(?i)<\s*br\s*/?>', '\n', html)
-   text = re.sub(r'(?i)</\s*(p|div|h\d|li)\s*>', '\n', text)
-   text = re.sub(r'<[^>]+>', '', text)
-   text = text.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
-   return re.sub(r'\n{3,}', '\n\n', text).strip()
-
-
-
-
 def _contract_export_text(contract: Contract) -> str:
    md = contract.metadata or {}
+   try:
+       # Plain text derived at save time (plus pending deltas).
+       current = editor_plain_text(contract.id, md)
+   except Exception:
+       current = None
+   if current is not None:
+       return current['text']
    txt = md.get('rendered_text')
    if isinstance(txt, str) and txt.strip():
        return txt
    html = md.get('rendered_html')
    if isinstance(html, str) and html.strip():
-       return _strip_html(html)
+       return strip_html(html)
    return ''
 
 
 
 
 def _generate_contract_pdf_bytes(contract: Contract) -> bytes:
-   from reportlab.pdfgen import canvas
-   from reportlab.lib.pagesizes import LETTER
-   from reportlab.lib.units import inch
-
-
    text = _contract_export_text(contract)
    if not text:
        text = (contract.title or 'Contract').strip() or 'Contract'
-
-
-   buffer = BytesIO()
-   c = canvas.Canvas(buffer, pagesize=LETTER)
-   width, height = LETTER
-   left = 0.75 * inch
-   top = height - 0.75 * inch
-   bottom = 0.75 * inch
-
-
-   text_obj = c.beginText(left, top)
-   text_obj.setFont('Times-Roman', 11)
-
-
-   max_chars = 110
-   for line in (text or '').splitlines():
-       wrapped_lines = textwrap.wrap(
-           line,
-           width=max_chars,
-           replace_whitespace=False,
-           drop_whitespace=False,
-       ) or ['']
-       for wl in wrapped_lines:
-           if text_obj.getY() <= bottom:
-               c.drawText(text_obj)
-               c.showPage()
-               text_obj = c.beginText(left, top)
-               text_obj.setFont('Times-Roman', 11)
-           text_obj.textLine(wl)
-
-
-   c.drawText(text_obj)
-   c.save()
-   buffer.seek(0)
-   return buffer.read()
+   return get_or_render_pdf(text, contract.tenant_id, contract.id)[0]
 
 
 
@@ -1686,15 +1644,18 @@ def firma_get_executed_document(request, contract_id: str):
 
    r2 = R2StorageService()
 
-   # Prefer cached executed copy.
+   # Prefer cached executed copy, streamed (or redirected to) from R2.
    if record.executed_r2_key:
        try:
-           cached = r2.get_file_bytes(record.executed_r2_key)
-           if cached:
-               pdf_file = BytesIO(cached)
-               pdf_file.seek(0)
-               filename = f"signed_contract_{contract_id}.pdf"
-               return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+           resp = r2_file_response(
+               request,
+               r2,
+               record.executed_r2_key,
+               content_type='application/pdf',
+               filename=f"signed_contract_{contract_id}.pdf",
+           )
+           if resp is not None:
+               return resp
        except Exception:
            pass
 
@@ -1727,7 +1688,12 @@ def firma_get_executed_document(request, contract_id: str):
    # Guardrail: if executed bytes match original bytes in real mode, refuse.
    if pdf_bytes and not mock_mode:
        try:
-           original_bytes = r2.get_file_bytes(record.original_r2_key) if record.original_r2_key else b''
+           # Compare sizes first so the original is only read when it could match.
+           original = r2.stat_file(record.original_r2_key) if record.original_r2_key else None
+           original_bytes = (
+               r2.get_file_bytes(record.original_r2_key)
+               if original and original['size'] == len(pdf_bytes) else b''
+           )
            if original_bytes and original_bytes == pdf_bytes:
                return Response(
                    {
@@ -9,7 +9,6 @@ import base64
 import hashlib
 import json
 import os
-import re
 from dataclasses import dataclass
 from datetime import timedelta
 from io import BytesIO
@@ -30,20 +29,19 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import LETTER
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-
-from PIL import Image
-from pypdf import PdfReader, PdfWriter
+# reportlab, PIL and pypdf are imported inside the PDF helpers below so
+# processes that never sign anything don't load them.
 
 from authentication.r2_service import R2StorageService
+from clm_backend.conditional import byte_range_response, not_modified_response
 
 from notifications.email_service import EmailService
 
 from .models import Contract, TemplateFile
 from .models import InhouseSignatureContract, InhouseSigner, InhouseSigningAuditLog
+from .content_store import strip_html
+from .editor_deltas import editor_plain_text
+from .pdf_render_cache import get_or_render_pdf, pdf_cache_key, pdf_etag, pdf_file_response
 
 
 def _clamp_number(val: Any, min_v: float, max_v: float) -> float:
@@ -136,16 +134,6 @@ def _log_event(
     )
 
 
-def _strip_html(html: str) -> str:
-    if not html:
-        return ''
-    text = re.sub(r'(?i)<\s*br\s*/?>', '\n', html)
-    text = re.sub(r'(?i)</\s*(p|div|h\d|li)\s*>', '\n', text)
-    text = re.sub(r'<[^>]+>', '', text)
-    text = text.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
-    return re.sub(r'\n{3,}', '\n\n', text).strip()
-
-
 def _get_editor_snapshot_from_r2(r2_key: str) -> dict | None:
     try:
         if not r2_key:
@@ -163,6 +151,14 @@ def _get_editor_snapshot_from_r2(r2_key: str) -> dict | None:
 def _contract_export_text(contract: Contract) -> str:
     md = contract.metadata or {}
 
+    try:
+        # Plain text derived at save time (plus pending deltas); R2/metadata are for legacy rows.
+        current = editor_plain_text(contract.id, md)
+        if current is not None:
+            return current['text']
+    except Exception:
+        pass
+
     try:
         r2_key = md.get('editor_r2_key')
         if isinstance(r2_key, str) and r2_key.strip():
@@ -173,7 +169,7 @@ def _contract_export_text(contract: Contract) -> str:
                     return txt
                 html = snap.get('rendered_html')
                 if isinstance(html, str) and html.strip():
-                    return _strip_html(html)
+                    return strip_html(html)
     except Exception:
         pass
 
@@ -182,48 +178,12 @@ def _contract_export_text(contract: Contract) -> str:
         return txt
     html = md.get('rendered_html')
     if isinstance(html, str) and html.strip():
-        return _strip_html(html)
+        return strip_html(html)
     return ''
 
 
 def _generate_contract_pdf_bytes(contract: Contract) -> bytes:
-    text = _contract_export_text(contract)
-
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=LETTER)
-    width, height = LETTER
-    left = 0.75 * inch
-    top = height - 0.75 * inch
-    bottom = 0.75 * inch
-
-    text_obj = c.beginText(left, top)
-    text_obj.setFont('Times-Roman', 11)
-
-    import textwrap
-
-    max_chars = 110
-    for line in (text or '').splitlines():
-        wrapped_lines = (
-            textwrap.wrap(
-                line,
-                width=max_chars,
-                replace_whitespace=False,
-                drop_whitespace=False,
-            )
-            or ['']
-        )
-        for wl in wrapped_lines:
-            if text_obj.getY() <= bottom:
-                c.drawText(text_obj)
-                c.showPage()
-                text_obj = c.beginText(left, top)
-                text_obj.setFont('Times-Roman', 11)
-            text_obj.textLine(wl)
-
-    c.drawText(text_obj)
-    c.save()
-    buffer.seek(0)
-    return buffer.read()
+    return get_or_render_pdf(_contract_export_text(contract), contract.tenant_id, contract.id)[0]
 
 
 @dataclass
@@ -267,6 +227,8 @@ def _resolve_signature_placement(contract: Contract, recipient_index: int, *, pd
     page_number = 1
     try:
         if pdf_bytes:
+            from pypdf import PdfReader
+
             reader = PdfReader(BytesIO(pdf_bytes))
             if reader.pages:
                 page_number = max(1, len(reader.pages))
@@ -287,6 +249,8 @@ def _parse_data_url_png(data_url: str) -> bytes:
     if 'base64' not in header.lower():
         raise ValueError('Expected base64 data URL')
     payload = base64.b64decode(b64)
+    from PIL import Image
+
     # Normalize to PNG bytes
     img = Image.open(BytesIO(payload))
     out = BytesIO()
@@ -295,6 +259,11 @@ def _parse_data_url_png(data_url: str) -> bytes:
 
 
 def _stamp_signature_on_pdf(base_pdf: bytes, *, signature_png: bytes, placement: Placement) -> bytes:
+    from PIL import Image
+    from pypdf import PdfReader, PdfWriter
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
     reader = PdfReader(BytesIO(base_pdf))
     writer = PdfWriter()
 
@@ -403,6 +372,11 @@ def _generate_certificate_pdf_bytes(
     executed_pdf_bytes: bytes,
 ) -> bytes:
     """Generate a structured, professional completion certificate PDF."""
+    from PIL import Image
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib.units import inch
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
 
     contract = signing_contract.contract
     title = (getattr(contract, 'title', '') or 'Contract').strip() or 'Contract'
@@ -1152,7 +1126,7 @@ def inhouse_pdf(request, token: UUID):
         resp['Access-Control-Allow-Origin'] = cors_origin
         resp['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
         # pdf.js uses Range requests, which trigger preflight.
-        resp['Access-Control-Allow-Headers'] = 'Range'
+        resp['Access-Control-Allow-Headers'] = 'Range, If-Range, If-None-Match'
         resp['Access-Control-Max-Age'] = '86400'
         return resp
 
@@ -1163,18 +1137,27 @@ def inhouse_pdf(request, token: UUID):
         return Response({'error': 'Signing link expired'}, status=status.HTTP_410_GONE)
 
     contract = sc.contract
-    pdf_bytes = sc.executed_pdf or _generate_contract_pdf_bytes(contract)
-
-    resp = FileResponse(
-        BytesIO(pdf_bytes),
-        as_attachment=False,
-        filename=f"{(contract.title or 'contract').strip().replace(' ', '_')}.pdf",
-        content_type='application/pdf',
-    )
-
-    # Avoid stale iframe renders (especially after signing) by disabling caching.
-    resp['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    resp['Pragma'] = 'no-cache'
+    executed_pdf = bytes(sc.executed_pdf) if sc.executed_pdf else None
+    if executed_pdf:
+        etag = pdf_etag(hashlib.sha256(executed_pdf).hexdigest())
+        resp = not_modified_response(request, etag)
+    else:
+        # The ETag is the render-cache key, so revalidation never renders.
+        text = _contract_export_text(contract)
+        etag = pdf_etag(pdf_cache_key(text))
+        resp = not_modified_response(request, etag)
+
+    if resp is None:
+        # ETag + `private, no-cache` keeps iframes fresh after signing while
+        # letting pdf.js revalidate and fetch byte ranges cheaply.
+        filename = f"{(contract.title or 'contract').strip().replace(' ', '_')}.pdf"
+        if executed_pdf:
+            resp = byte_range_response(
+                request, executed_pdf, etag=etag, content_type='application/pdf', filename=filename,
+            )
+        else:
+            # Streamed from the render cache file rather than read into memory.
+            resp = pdf_file_response(request, text, contract.tenant_id, contract.id, filename=filename)
 
     # Allow the signer frontend (often on a different origin in dev/prod)
     # to embed the PDF in an iframe.
@@ -1182,7 +1165,7 @@ def inhouse_pdf(request, token: UUID):
 
     # Allow cross-origin fetch (pdf.js) from the frontend.
     resp['Access-Control-Allow-Origin'] = cors_origin
-    resp['Access-Control-Expose-Headers'] = 'Accept-Ranges, Content-Encoding, Content-Length, Content-Range'
+    resp['Access-Control-Expose-Headers'] = 'Accept-Ranges, Content-Encoding, Content-Length, Content-Range, ETag'
     return resp
 
 
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from contracts.clause_embeddings import EMBED_BATCH_SIZE, refresh_clause_embeddings
+from contracts.models import Clause
+
+
+class Command(BaseCommand):
+    help = 'Backfill/refresh embeddings for published clauses (e.g. after bulk seeding)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Only clauses for this tenant_id')
+        parser.add_argument('--force', action='store_true', help='Re-embed clauses that already have an embedding')
+
+    def handle(self, *args, **options):
+        qs = Clause.objects.filter(status='published')
+        if options.get('tenant'):
+            qs = qs.filter(tenant_id=options['tenant'])
+        if options.get('force'):
+            qs.update(embedding=None, embedding_sha256=None)
+
+        ids = list(qs.values_list('id', flat=True))
+        stored = 0
+        for start in range(0, len(ids), EMBED_BATCH_SIZE):
+            stored += refresh_clause_embeddings(ids[start:start + EMBED_BATCH_SIZE])
+
+        self.stdout.write(self.style.SUCCESS(f'Embedded {stored} of {len(ids)} published clause(s)'))
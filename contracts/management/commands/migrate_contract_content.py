@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from contracts.content_store import MIGRATION_BATCH_SIZE, migrate_contract_content
+
+
+class Command(BaseCommand):
+    help = 'Move editor content out of Contract.metadata into contract_contents and signed PDFs into R2'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE)
+        parser.add_argument('--async', dest='run_async', action='store_true', help='Queue the migration as Celery tasks instead')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, int(options.get('batch_size') or MIGRATION_BATCH_SIZE))
+        if options.get('run_async'):
+            from contracts.tasks import migrate_contract_content_task
+
+            migrate_contract_content_task.delay(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS('Queued contract content migration'))
+            return
+
+        total = 0
+        after = None
+        while True:
+            migrated, after = migrate_contract_content(after=after, batch_size=batch_size)
+            total += migrated
+            if not after:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'Migrated content for {total} contract(s)'))
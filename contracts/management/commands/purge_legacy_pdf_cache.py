@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from contracts.models import Contract
+from contracts.pdf_render_cache import legacy_pdf_cache_prefix
+from contracts.r2_cleanup import tombstone_keys
+
+
+class Command(BaseCommand):
+    help = (
+        'Tombstone rendered PDFs stored under the old tenant-wide {tenant}/pdf-cache/ prefix. '
+        'Renders are now kept per contract and deleted with it; the old copies are only a cache.'
+    )
+
+    def handle(self, *args, **options):
+        tenant_ids = Contract.objects.order_by().values_list('tenant_id', flat=True).distinct()
+        prefixes = [legacy_pdf_cache_prefix(t) for t in tenant_ids if t]
+        with transaction.atomic():
+            tombstone_keys(prefixes=prefixes, reason='legacy_pdf_cache')
+        self.stdout.write(self.style.SUCCESS(f'Queued {len(prefixes)} legacy PDF cache prefix(es) for deletion'))
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Submodules a worker imports for an app (URL routing, Celery autodiscovery, signals).
+APP_MODULES = ('urls', 'views', 'tasks', 'signals')
+
+# Loaded on first use only; importing any of these at startup is a regression.
+# A module counts as loaded if the probe pulled it in beyond what django.setup()
+# already loads, or if project code imports it at module scope. The latter
+# covers `requests`, which DRF imports during setup anyway.
+LAZY_MODULES = ('reportlab', 'pypdf', 'PyPDF2', 'docx', 'boto3', 'google.generativeai', 'voyageai', 'requests')
+
+# Runs in a fresh interpreter per measurement so apps don't share import cost.
+_PROBE = r'''
+import builtins, importlib, importlib.util, json, os, resource, sys, time
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+modules, lazy, project = json.loads(sys.argv[1]), json.loads(sys.argv[2]), set(json.loads(sys.argv[3]))
+module_scope = set()
+_import = builtins.__import__
+
+def tracking_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Absolute imports executed directly in a project module's body.
+    if level == 0 and globals and str(globals.get('__name__', '')).split('.')[0] in project:
+        hit = next((m for m in lazy if name == m or name.startswith(m + '.')), None)
+        if hit and sys._getframe(1).f_code.co_name == '<module>':
+            module_scope.add(f"{hit} ({globals['__name__']})")
+    return _import(name, globals, locals, fromlist, level)
+
+builtins.__import__ = tracking_import
+start_rss = rss_mb()
+t = time.perf_counter()
+import django
+django.setup()
+setup_ms, setup_rss = (time.perf_counter() - t) * 1000, rss_mb()
+preloaded = {m for m in lazy if m in sys.modules}
+
+t = time.perf_counter()
+imported = []
+for name in modules:
+    try:
+        if importlib.util.find_spec(name) is None:
+            continue
+    except ModuleNotFoundError:
+        continue
+    importlib.import_module(name)
+    imported.append(name)
+print(json.dumps({
+    'setup_ms': setup_ms,
+    'setup_rss_mb': setup_rss - start_rss,
+    'import_ms': (time.perf_counter() - t) * 1000,
+    'rss_mb': rss_mb() - setup_rss,
+    'imported': imported,
+    'lazy_loaded': sorted({m for m in lazy if m in sys.modules and m not in preloaded} | module_scope),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure import time and RSS per app in fresh interpreters, as a gunicorn or Celery '
+        'worker pays them on boot. Fails when a budget is exceeded or a lazily imported '
+        'dependency is loaded at startup.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--app', action='append', dest='app_labels', help='Only measure this app (repeatable)')
+        parser.add_argument('--runs', type=int, default=3, help='Measurements per target; the fastest is reported')
+        parser.add_argument('--budget-ms', type=float, default=None, help='Per-app import time budget')
+        parser.add_argument('--budget-rss-mb', type=float, default=None, help='Per-app RSS budget')
+        parser.add_argument('--worker-budget-ms', type=float, default=None, help='Import time budget for all apps together')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def _measure(self, modules: list[str], runs: int) -> dict:
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'clm_backend.settings')}
+        best = None
+        for _ in range(max(1, runs)):
+            proc = subprocess.run(
+                [sys.executable, '-c', _PROBE, json.dumps(modules), json.dumps(LAZY_MODULES), json.dumps(self._packages)],
+                capture_output=True, text=True, env=env, cwd=str(settings.BASE_DIR),
+            )
+            if proc.returncode != 0:
+                raise CommandError(f'Importing {modules} failed:\n{proc.stderr.strip()[-2000:]}')
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            if best is None or result['import_ms'] < best['import_ms']:
+                best = result
+        return best
+
+    def handle(self, *args, **options):
+        budget_ms = options['budget_ms'] if options['budget_ms'] is not None else settings.STARTUP_APP_IMPORT_BUDGET_MS
+        budget_rss = options['budget_rss_mb'] if options['budget_rss_mb'] is not None else settings.STARTUP_APP_RSS_BUDGET_MB
+        worker_budget = (
+            options['worker_budget_ms'] if options['worker_budget_ms'] is not None
+            else settings.STARTUP_WORKER_IMPORT_BUDGET_MS
+        )
+        runs = options['runs']
+
+        configs = [c for c in apps.get_app_configs() if c.path.startswith(str(settings.BASE_DIR))]
+        self._packages = sorted({c.name.split('.')[0] for c in configs} | {settings.ROOT_URLCONF.split('.')[0]})
+        if options['app_labels']:
+            configs = [c for c in configs if c.label in options['app_labels']]
+            if not configs:
+                raise CommandError('No matching project apps')
+
+        results = {}
+        for config in configs:
+            results[config.label] = self._measure([f'{config.name}.{m}' for m in APP_MODULES], runs)
+        worker_modules = [settings.ROOT_URLCONF, 'clm_backend.celery'] + [
+            f'{c.name}.{m}' for c in configs for m in APP_MODULES
+        ]
+        worker = self._measure(worker_modules, runs)
+
+        failures = []
+        for label, r in results.items():
+            if budget_ms and r['import_ms'] > budget_ms:
+                failures.append(f"{label}: import {r['import_ms']:.0f} ms > {budget_ms:.0f} ms")
+            if budget_rss and r['rss_mb'] > budget_rss:
+                failures.append(f"{label}: RSS +{r['rss_mb']:.1f} MB > {budget_rss:.1f} MB")
+        if worker_budget and worker['import_ms'] > worker_budget:
+            failures.append(f"worker: import {worker['import_ms']:.0f} ms > {worker_budget:.0f} ms")
+        if worker['lazy_loaded']:
+            failures.append(f"worker: loaded at startup: {', '.join(worker['lazy_loaded'])}")
+
+        if options['json']:
+            self.stdout.write(json.dumps({'apps': results, 'worker': worker, 'failures': failures}, indent=2))
+        else:
+            self.stdout.write(
+                f"django.setup(): {worker['setup_ms']:.0f} ms, +{worker['setup_rss_mb']:.1f} MB RSS"
+            )
+            self.stdout.write(f"{'app':<20}{'import ms':>12}{'RSS MB':>10}  lazy deps loaded")
+            for label, r in sorted(results.items(), key=lambda kv: -kv[1]['import_ms']):
+                self.stdout.write(
+                    f"{label:<20}{r['import_ms']:>12.0f}{r['rss_mb']:>+10.1f}  {', '.join(r['lazy_loaded']) or '-'}"
+                )
+            self.stdout.write(
+                f"{'(worker total)':<20}{worker['import_ms']:>12.0f}{worker['rss_mb']:>+10.1f}  "
+                f"{', '.join(worker['lazy_loaded']) or '-'}"
+            )
+
+        if failures:
+            raise CommandError('Startup budget exceeded:\n  ' + '\n  '.join(failures))
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS('Startup within budget'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-19 08:20
+
+import pgvector.django.indexes
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0016_inhousesignaturecontract_certificate_generated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE EXTENSION IF NOT EXISTS vector;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='clause',
+            name='embedding',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=1024, null=True),
+        ),
+        migrations.AddField(
+            model_name='clause',
+            name='embedding_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='clause',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='clauses_embedding_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+    ]
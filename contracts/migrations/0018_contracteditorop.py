@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-19 08:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0017_clause_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractEditorOp',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tenant_id', models.UUIDField(db_index=True)),
+                ('revision', models.IntegerField()),
+                ('kind', models.CharField(choices=[('delta', 'Delta'), ('full', 'Full')], default='delta', max_length=10)),
+                ('base_sha256', models.CharField(blank=True, default='', max_length=64)),
+                ('result_sha256', models.CharField(max_length=64)),
+                ('ops', models.JSONField(blank=True, default=list)),
+                ('created_by', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contract', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='editor_ops', to='contracts.contract')),
+            ],
+            options={
+                'db_table': 'contract_editor_ops',
+                'ordering': ['contract', 'revision'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contracteditorop',
+            constraint=models.UniqueConstraint(fields=('contract', 'revision'), name='contract_editor_op_revision_uniq'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-19 08:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0018_contracteditorop'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractContent',
+            fields=[
+                ('contract', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content_store', serialize=False, to='contracts.contract')),
+                ('tenant_id', models.UUIDField(db_index=True, help_text='Tenant ID for RLS')),
+                ('rendered_text', models.TextField(blank=True, default='')),
+                ('rendered_html', models.TextField(blank=True, default='')),
+                ('raw_text', models.TextField(blank=True, default='', help_text='Unrendered template text')),
+                ('signed_pdf_r2_key', models.CharField(blank=True, help_text='R2 key of the signed PDF', max_length=500, null=True)),
+                ('signed_pdf_sha256', models.CharField(blank=True, default='', max_length=64)),
+                ('signed_pdf_size', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'contract_contents',
+            },
+        ),
+        migrations.AlterField(
+            model_name='contract',
+            name='signed_pdf',
+            field=models.BinaryField(blank=True, help_text='Legacy: signed PDFs now live in R2 (ContractContent.signed_pdf_r2_key)', null=True),
+        ),
+    ]
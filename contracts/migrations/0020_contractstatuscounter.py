@@ -0,0 +1,30 @@
+# Generated by Django 5.0 on 2026-10-19 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0019_contractcontent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tenant_id', models.UUIDField(help_text='Tenant ID for RLS')),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'contract_status_counters',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contractstatuscounter',
+            constraint=models.UniqueConstraint(fields=('tenant_id', 'status'), name='contract_status_counter_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-19 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0020_contractstatuscounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clause',
+            index=models.Index(fields=['tenant_id', 'created_at', 'id'], name='clause_tenant_created_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0 on 2026-10-19 08:42
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0021_clause_tenant_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkGenerationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tenant_id', models.UUIDField(db_index=True)),
+                ('created_by', models.UUIDField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('rows', models.JSONField(default=list, help_text='Input rows; cleared once the job finishes')),
+                ('user_instructions', models.TextField(blank=True, null=True)),
+                ('total_rows', models.IntegerField(default=0)),
+                ('chunk_size', models.IntegerField(default=50)),
+                ('total_chunks', models.IntegerField(default=0)),
+                ('next_chunk', models.IntegerField(default=0, help_text='Next chunk index to hand to a worker')),
+                ('chunks_done', models.IntegerField(default=0)),
+                ('succeeded', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('errors', models.JSONField(default=list, help_text='[{row, error}] for failed rows (capped)')),
+                ('result_r2_key', models.CharField(blank=True, help_text='R2 key of the result ZIP', max_length=500, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bulk_generation_jobs', to='contracts.contracttemplate')),
+            ],
+            options={
+                'db_table': 'bulk_generation_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['tenant_id', 'created_at'], name='bulk_gen_tenant_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0 on 2026-10-19 08:45
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0022_bulkgenerationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionBlob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tenant_id', models.UUIDField(db_index=True)),
+                ('sha256', models.CharField(help_text='SHA-256 of the materialized content', max_length=64)),
+                ('kind', models.CharField(choices=[('file', 'File'), ('text', 'Text keyframe'), ('text_delta', 'Text delta')], max_length=20)),
+                ('size', models.BigIntegerField(default=0, help_text='Materialized size in bytes')),
+                ('content_type', models.CharField(blank=True, default='', max_length=255)),
+                ('r2_key', models.CharField(blank=True, help_text='R2 key (file / text keyframe)', max_length=500, null=True)),
+                ('delta', models.JSONField(blank=True, help_text='Line ops against `base` (text deltas)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('base', models.ForeignKey(blank=True, help_text='Keyframe a text delta applies to', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='deltas', to='contracts.versionblob')),
+            ],
+            options={
+                'db_table': 'contract_version_blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='contractversion',
+            name='blob',
+            field=models.ForeignKey(blank=True, help_text='Deduplicated document file (r2_key mirrors blob.r2_key)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='file_versions', to='contracts.versionblob'),
+        ),
+        migrations.AddField(
+            model_name='contractversion',
+            name='text_blob',
+            field=models.ForeignKey(blank=True, help_text='Contract text at this version', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='text_versions', to='contracts.versionblob'),
+        ),
+        migrations.AddConstraint(
+            model_name='versionblob',
+            constraint=models.UniqueConstraint(fields=('tenant_id', 'sha256'), name='version_blob_tenant_sha_uniq'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0 on 2026-10-19 08:51
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0023_version_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractContentSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tenant_id', models.UUIDField(db_index=True, help_text='Tenant ID for RLS')),
+                ('rendered_text', models.TextField(blank=True, default='')),
+                ('rendered_html', models.TextField(blank=True, default='')),
+                ('raw_text', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'contract_content_snapshots',
+            },
+        ),
+        migrations.AddField(
+            model_name='contractcontent',
+            name='snapshot',
+            field=models.ForeignKey(blank=True, help_text='Shared content (copy-on-write clone); the text columns above are unused while set', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='contents', to='contracts.contractcontentsnapshot'),
+        ),
+    ]
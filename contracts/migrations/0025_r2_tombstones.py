@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-19 08:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0024_contract_content_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='R2Tombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=1024, unique=True)),
+                ('is_prefix', models.BooleanField(default=False, help_text='Delete every object under `key`')),
+                ('reason', models.CharField(blank=True, default='', max_length=100)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'r2_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contractversion',
+            index=models.Index(fields=['r2_key'], name='contract_version_r2_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='r2tombstone',
+            index=models.Index(fields=['next_attempt_at'], name='r2_tombstone_due_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0025_r2_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractpreview',
+            name='render_key',
+            field=models.CharField(blank=True, default='', help_text='preview_cache key of the inputs this preview was rendered from', max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0026_contract_preview_render_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractcontent',
+            name='plain_text',
+            field=models.TextField(blank=True, default='', help_text='Canonical plain text (rendered_text, else stripped rendered_html) for exports and signing'),
+        ),
+        migrations.AddField(
+            model_name='contractcontent',
+            name='plain_text_sha256',
+            field=models.CharField(blank=True, default='', help_text='sha256 of plain_text; empty until derived', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='contractcontentsnapshot',
+            name='plain_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='contractcontentsnapshot',
+            name='plain_text_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0027_contract_content_plain_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='r2tombstone',
+            name='list_after',
+            field=models.CharField(blank=True, default='', max_length=1024),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-19 09:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0028_r2tombstone_list_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versionblob',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-19 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0029_versionblob_last_used_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkgenerationjob',
+            name='recorded_chunks',
+            field=models.JSONField(blank=True, default=list, help_text='Indices of the chunks counted in chunks_done'),
+        ),
+        migrations.AddField(
+            model_name='bulkgenerationjob',
+            name='stall_requeues',
+            field=models.IntegerField(default=0, help_text='Times the watchdog re-queued lost chunks'),
+        ),
+    ]
@@ -2,6 +2,8 @@
 Contract and Workflow models with tenant isolation
 """
 from django.db import models
+from django.utils import timezone
+from pgvector.django import HnswIndex, VectorField
 import uuid
 
 
@@ -107,6 +109,11 @@ class Clause(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Voyage embedding of name + content, refreshed when a published clause changes
+    # (see contracts.clause_embeddings). embedding_sha256 is the hash of the embedded text.
+    embedding = VectorField(dimensions=1024, null=True, blank=True)
+    embedding_sha256 = models.CharField(max_length=64, null=True, blank=True)
+    
     class Meta:
         db_table = 'clauses'
         ordering = ['-created_at']
@@ -114,6 +121,15 @@ class Clause(models.Model):
         indexes = [
             models.Index(fields=['tenant_id', 'contract_type']),
             models.Index(fields=['clause_id']),
+            # Keyset (cursor) pagination: ?pagination=cursor orders by (created_at, id).
+            models.Index(fields=['tenant_id', 'created_at', 'id'], name='clause_tenant_created_idx'),
+            HnswIndex(
+                name='clauses_embedding_hnsw',
+                fields=['embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_cosine_ops'],
+            ),
         ]
     
     def __str__(self):
@@ -174,7 +190,7 @@ class Contract(models.Model):
     metadata = models.JSONField(default=dict, help_text='Additional metadata')
     clauses = models.JSONField(default=list, help_text='List of contract clauses and constraints')
     signed = models.JSONField(default=dict, help_text='Signature information from SignNow with signer names')
-    signed_pdf = models.BinaryField(null=True, blank=True, help_text='Signed PDF from SignNow with user signature')
+    signed_pdf = models.BinaryField(null=True, blank=True, help_text='Legacy: signed PDFs now live in R2 (ContractContent.signed_pdf_r2_key)')
     signnow_document_id = models.CharField(max_length=255, null=True, blank=True, help_text='SignNow document ID')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -192,6 +208,50 @@ class Contract(models.Model):
         return f"{self.title} ({self.status})"
 
 
+class VersionBlob(models.Model):
+    """
+    Content-addressed version payload (see contracts.version_store).
+
+    One row per distinct content per tenant, shared by every version (of any
+    contract) with identical bytes. Files and text keyframes live in R2 under
+    `r2_key`; text deltas are stored inline against a keyframe `base`.
+    """
+    KIND_CHOICES = [
+        ('file', 'File'),
+        ('text', 'Text keyframe'),
+        ('text_delta', 'Text delta'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant_id = models.UUIDField(db_index=True)
+    sha256 = models.CharField(max_length=64, help_text='SHA-256 of the materialized content')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    size = models.BigIntegerField(default=0, help_text='Materialized size in bytes')
+    content_type = models.CharField(max_length=255, blank=True, default='')
+    r2_key = models.CharField(max_length=500, null=True, blank=True, help_text='R2 key (file / text keyframe)')
+    base = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='deltas',
+        help_text='Keyframe a text delta applies to',
+    )
+    delta = models.JSONField(null=True, blank=True, help_text='Line ops against `base` (text deltas)')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Touched whenever a writer reuses the blob; GC only collects blobs idle for a while.
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'contract_version_blobs'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant_id', 'sha256'], name='version_blob_tenant_sha_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.sha256[:12]}"
+
+
 class ContractVersion(models.Model):
     """
     Immutable contract version with document and provenance tracking
@@ -212,6 +272,22 @@ class ContractVersion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     file_size = models.IntegerField(null=True, blank=True, help_text='File size in bytes')
     file_hash = models.CharField(max_length=64, null=True, blank=True, help_text='SHA-256 hash')
+    blob = models.ForeignKey(
+        VersionBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='file_versions',
+        help_text='Deduplicated document file (r2_key mirrors blob.r2_key)',
+    )
+    text_blob = models.ForeignKey(
+        VersionBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='text_versions',
+        help_text='Contract text at this version',
+    )
     
     class Meta:
         db_table = 'contract_versions'
@@ -219,12 +295,138 @@ class ContractVersion(models.Model):
         unique_together = [('contract', 'version_number')]
         indexes = [
             models.Index(fields=['contract', 'version_number']),
+            # R2 cleanup checks tombstoned keys against live versions.
+            models.Index(fields=['r2_key'], name='contract_version_r2_key_idx'),
         ]
     
     def __str__(self):
         return f"{self.contract.title} v{self.version_number}"
 
 
+class ContractEditorOp(models.Model):
+    """
+    Editor save log: one row per content revision.
+
+    `delta` rows carry ordered splice ops applied to the previous revision;
+    `full` rows mark a whole-content save (content lives in ContractContent
+    / the R2 snapshot). The unique (contract, revision) pair serializes
+    concurrent saves.
+    """
+    KIND_CHOICES = [
+        ('delta', 'Delta'),
+        ('full', 'Full'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    contract = models.ForeignKey(
+        Contract,
+        on_delete=models.CASCADE,
+        related_name='editor_ops',
+    )
+    tenant_id = models.UUIDField(db_index=True)
+    revision = models.IntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='delta')
+    base_sha256 = models.CharField(max_length=64, blank=True, default='')
+    result_sha256 = models.CharField(max_length=64)
+    ops = models.JSONField(default=list, blank=True)
+    created_by = models.UUIDField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'contract_editor_ops'
+        ordering = ['contract', 'revision']
+        constraints = [
+            models.UniqueConstraint(fields=['contract', 'revision'], name='contract_editor_op_revision_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.contract_id} r{self.revision} ({self.kind})"
+
+
+class ContractContentSnapshot(models.Model):
+    """
+    Immutable editor content shared copy-on-write between a contract and
+    its clones. A ContractContent row with `snapshot` set reads its content
+    from here until its first content write.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant_id = models.UUIDField(db_index=True, help_text='Tenant ID for RLS')
+    rendered_text = models.TextField(blank=True, default='')
+    rendered_html = models.TextField(blank=True, default='')
+    raw_text = models.TextField(blank=True, default='')
+    plain_text = models.TextField(blank=True, default='')
+    plain_text_sha256 = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'contract_content_snapshots'
+    
+    def __str__(self):
+        return f"Content snapshot {self.id}"
+
+
+class ContractContent(models.Model):
+    """
+    Large editor content and artifacts for a contract, kept off the hot
+    `contracts` row so list/filter queries and metadata updates never
+    rewrite or de-TOAST them. Binary PDFs are stored in R2.
+    """
+    contract = models.OneToOneField(
+        Contract,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='content_store',
+    )
+    tenant_id = models.UUIDField(db_index=True, help_text='Tenant ID for RLS')
+    rendered_text = models.TextField(blank=True, default='')
+    rendered_html = models.TextField(blank=True, default='')
+    raw_text = models.TextField(blank=True, default='', help_text='Unrendered template text')
+    plain_text = models.TextField(
+        blank=True, default='',
+        help_text='Canonical plain text (rendered_text, else stripped rendered_html) for exports and signing'
+    )
+    plain_text_sha256 = models.CharField(max_length=64, blank=True, default='', help_text='sha256 of plain_text; empty until derived')
+    signed_pdf_r2_key = models.CharField(max_length=500, blank=True, null=True, help_text='R2 key of the signed PDF')
+    signed_pdf_sha256 = models.CharField(max_length=64, blank=True, default='')
+    signed_pdf_size = models.BigIntegerField(null=True, blank=True)
+    snapshot = models.ForeignKey(
+        ContractContentSnapshot,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='contents',
+        help_text='Shared content (copy-on-write clone); the text columns above are unused while set',
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'contract_contents'
+    
+    def __str__(self):
+        return f"Content for {self.contract_id}"
+
+
+class ContractStatusCounter(models.Model):
+    """
+    Per-tenant contract count by status, kept current by contract signals
+    and periodically reconciled against the contracts table.
+    """
+    id = models.BigAutoField(primary_key=True)
+    tenant_id = models.UUIDField(help_text='Tenant ID for RLS')
+    status = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'contract_status_counters'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant_id', 'status'], name='contract_status_counter_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tenant_id} {self.status}={self.count}"
+
+
 class ContractClause(models.Model):
     """
     Junction table for contract-clause relationship with provenance
@@ -290,6 +492,93 @@ class GenerationJob(models.Model):
         return f"Job {self.id}: {self.status}"
 
 
+class BulkGenerationJob(models.Model):
+    """
+    Bulk contract generation from tabular rows (see contracts.bulk_generation).
+
+    Rows are processed in chunks by Celery; the generated documents are
+    collected into one ZIP in R2.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant_id = models.UUIDField(db_index=True)
+    created_by = models.UUIDField()
+    template = models.ForeignKey(
+        ContractTemplate,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bulk_generation_jobs',
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows = models.JSONField(default=list, help_text='Input rows; cleared once the job finishes')
+    user_instructions = models.TextField(null=True, blank=True)
+    total_rows = models.IntegerField(default=0)
+    chunk_size = models.IntegerField(default=50)
+    total_chunks = models.IntegerField(default=0)
+    next_chunk = models.IntegerField(default=0, help_text='Next chunk index to hand to a worker')
+    chunks_done = models.IntegerField(default=0)
+    recorded_chunks = models.JSONField(default=list, blank=True, help_text='Indices of the chunks counted in chunks_done')
+    stall_requeues = models.IntegerField(default=0, help_text='Times the watchdog re-queued lost chunks')
+    succeeded = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, help_text='[{row, error}] for failed rows (capped)')
+    result_r2_key = models.CharField(max_length=500, null=True, blank=True, help_text='R2 key of the result ZIP')
+    error_message = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'bulk_generation_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant_id', 'created_at'], name='bulk_gen_tenant_created_idx'),
+        ]
+
+    @property
+    def progress(self) -> int:
+        if not self.total_rows:
+            return 100 if self.status == 'completed' else 0
+        return int(100 * (self.succeeded + self.failed) / self.total_rows)
+
+    def __str__(self):
+        return f"Bulk job {self.id}: {self.status}"
+
+
+class R2Tombstone(models.Model):
+    """
+    An R2 object (or key prefix) whose owning row has been deleted. Written
+    in the deleting transaction and removed from R2 in DeleteObjects batches
+    by contracts.r2_cleanup, so requests never wait on storage.
+    """
+    id = models.BigAutoField(primary_key=True)
+    key = models.CharField(max_length=1024, unique=True)
+    is_prefix = models.BooleanField(default=False, help_text='Delete every object under `key`')
+    # Prefix rows: the listing resumes after this key, so live objects are never re-listed.
+    list_after = models.CharField(max_length=1024, blank=True, default='')
+    reason = models.CharField(max_length=100, blank=True, default='')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'r2_tombstones'
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='r2_tombstone_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tombstone {self.key}{'*' if self.is_prefix else ''}"
+
+
 class BusinessRule(models.Model):
     """
     Business rules for contract validation and clause suggestions
@@ -1131,6 +1420,10 @@ class ContractPreview(models.Model):
     form_data_snapshot = models.JSONField(help_text='Snapshot of form data used for preview')
     clauses_snapshot = models.JSONField(help_text='Snapshot of selected clauses')
     constraints_snapshot = models.JSONField(help_text='Snapshot of constraints used')
+    render_key = models.CharField(
+        max_length=64, blank=True, default='',
+        help_text='preview_cache key of the inputs this preview was rendered from'
+    )
     
     class Meta:
         db_table = 'contract_previews'
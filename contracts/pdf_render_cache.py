@@ -0,0 +1,277 @@
+"""
+Content-addressed cache for contract PDFs rendered from plain text.
+
+Rendering is deterministic for a given (text, renderer version), so PDFs
+are stored under sha256(PDF_RENDERER_VERSION + text): on local disk first,
+then in R2 so other workers can reuse them. R2 copies live under the
+contract's `{tenant}/contracts/{id}/` prefix, so deleting the contract
+tombstones them with the rest of its objects. The same hash doubles as the
+HTTP ETag, so PDF viewers can revalidate and fetch byte ranges without
+triggering a reportlab render per request. Downloads are streamed from the
+local file (`pdf_file_response`), and R2 hits are copied to disk chunk by
+chunk, so serving a cached PDF never holds the whole file in memory.
+
+Bump PDF_RENDERER_VERSION whenever `render_text_pdf` output changes.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import textwrap
+from io import BytesIO
+
+from django.conf import settings
+
+from authentication.r2_service import R2StorageService
+from clm_backend.conditional import byte_range_response, file_range_chunks, streaming_range_response
+
+try:
+    from prometheus_client import Counter
+except Exception:  # pragma: no cover
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDERER_VERSION = 'text-letter-v1'
+LOCAL_CACHE_MAX_FILES = 500
+
+if Counter is not None:
+    PDF_RENDER_CACHE_TOTAL = Counter(
+        'clm_pdf_render_cache_total',
+        'Contract PDF render cache lookups',
+        ['result'],
+    )
+else:
+    PDF_RENDER_CACHE_TOTAL = None
+
+
+def _count(result: str) -> None:
+    if PDF_RENDER_CACHE_TOTAL is not None:
+        PDF_RENDER_CACHE_TOTAL.labels(result=result).inc()
+
+
+def pdf_cache_key(text: str) -> str:
+    """sha256 of the renderer version plus source text; also used as the ETag."""
+    h = hashlib.sha256()
+    h.update(PDF_RENDERER_VERSION.encode('utf-8'))
+    h.update(b"\n")
+    h.update((text or '').encode('utf-8', errors='replace'))
+    return h.hexdigest()
+
+
+def pdf_etag(cache_key: str) -> str:
+    return f'"{cache_key}"'
+
+
+def render_text_pdf(text: str) -> bytes:
+    """Letter-size, Times 11pt, 110-char wrapped rendering of `text`."""
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib.units import inch
+
+    buffer = BytesIO()
+    # invariant=1 fixes the creation date and document ID, so identical text
+    # renders identical bytes on every worker (byte ranges stay consistent).
+    c = canvas.Canvas(buffer, pagesize=LETTER, invariant=1)
+    width, height = LETTER
+    left = 0.75 * inch
+    top = height - 0.75 * inch
+    bottom = 0.75 * inch
+
+    text_obj = c.beginText(left, top)
+    text_obj.setFont('Times-Roman', 11)
+
+    max_chars = 110
+    for line in (text or '').splitlines():
+        wrapped_lines = textwrap.wrap(
+            line,
+            width=max_chars,
+            replace_whitespace=False,
+            drop_whitespace=False,
+        ) or ['']
+        for wl in wrapped_lines:
+            if text_obj.getY() <= bottom:
+                c.drawText(text_obj)
+                c.showPage()
+                text_obj = c.beginText(left, top)
+                text_obj.setFont('Times-Roman', 11)
+            text_obj.textLine(wl)
+
+    c.drawText(text_obj)
+    c.save()
+    buffer.seek(0)
+    return buffer.read()
+
+
+def _local_cache_dir() -> str:
+    return getattr(settings, 'PDF_RENDER_CACHE_DIR', '') or os.path.join(
+        tempfile.gettempdir(), 'clm_pdf_render_cache'
+    )
+
+
+def _local_path(cache_key: str) -> str:
+    return os.path.join(_local_cache_dir(), f'{cache_key}.pdf')
+
+
+def _local_hit(cache_key: str) -> str | None:
+    """Path of the cached file, marked recently used (eviction is by mtime)."""
+    path = _local_path(cache_key)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def _read_local(cache_key: str) -> bytes | None:
+    try:
+        with open(_local_path(cache_key), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _evict_local(directory: str) -> None:
+    entries = [e for e in os.scandir(directory) if e.name.endswith('.pdf')]
+    if len(entries) > LOCAL_CACHE_MAX_FILES:
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[: len(entries) - LOCAL_CACHE_MAX_FILES]:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+
+def _write_local(cache_key: str, chunks) -> str | None:
+    """Write `chunks` (bytes, or an iterable of bytes) atomically; returns the path or None."""
+    if isinstance(chunks, (bytes, bytearray)):
+        chunks = (chunks,)
+    tmp = None
+    try:
+        directory = _local_cache_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = _local_path(cache_key)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+        tmp = None
+        _evict_local(directory)
+        return path
+    except OSError as e:
+        logger.debug(f"PDF render cache write failed: {e}")
+        return None
+    finally:
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+def pdf_cache_r2_key(tenant_id, contract_id, cache_key: str) -> str:
+    return f"{tenant_id}/contracts/{contract_id}/pdf-cache/{PDF_RENDERER_VERSION}/{cache_key}.pdf"
+
+
+def legacy_pdf_cache_prefix(tenant_id) -> str:
+    """Where renders were stored before they were scoped to a contract."""
+    return f"{tenant_id}/pdf-cache/"
+
+
+def _ensure_pdf(text: str, tenant_id=None, contract_id=None) -> tuple[str | None, bytes | None, str]:
+    """
+    Make the PDF for `text` available: (local path or None, bytes if they
+    were rendered in this call, cache key). R2 hits are streamed to disk.
+    """
+    cache_key = pdf_cache_key(text)
+    path = _local_hit(cache_key)
+    if path:
+        _count('hit_local')
+        return path, None, cache_key
+
+    r2 = None
+    if tenant_id and contract_id:
+        try:
+            r2 = R2StorageService()
+        except Exception:
+            r2 = None
+    if r2 is not None:
+        try:
+            path = _write_local(cache_key, r2.iter_file(pdf_cache_r2_key(tenant_id, contract_id, cache_key)))
+        except Exception:
+            path = None
+        if path and os.path.getsize(path) > 0:
+            _count('hit_r2')
+            return path, None, cache_key
+
+    _count('miss')
+    data = render_text_pdf(text)
+    path = _write_local(cache_key, data)
+    if r2 is not None:
+        try:
+            r2.put_bytes(
+                pdf_cache_r2_key(tenant_id, contract_id, cache_key),
+                data,
+                content_type='application/pdf',
+                metadata={'tenant_id': str(tenant_id), 'contract_id': str(contract_id), 'purpose': 'pdf_render_cache'},
+            )
+        except Exception as e:
+            logger.warning(f"PDF render cache upload failed: {e}")
+    return path, data, cache_key
+
+
+def get_or_render_pdf(text: str, tenant_id=None, contract_id=None) -> tuple[bytes, str]:
+    """
+    PDF bytes for `text`, rendering only on a cache miss.
+
+    Returns (pdf_bytes, cache_key). R2 is used when configured and a tenant
+    and contract are given; everything is best-effort and falls back to
+    rendering.
+    """
+    path, data, cache_key = _ensure_pdf(text, tenant_id, contract_id)
+    if data is None:
+        data = _read_local(cache_key)
+    if not data:
+        data = render_text_pdf(text)
+    return data, cache_key
+
+
+def pdf_file_response(
+    request,
+    text: str,
+    tenant_id=None,
+    contract_id=None,
+    *,
+    filename: str | None = None,
+    as_attachment: bool = False,
+):
+    """
+    Ranged PDF response for `text`, streamed from the local cache file.
+    Falls back to an in-memory response when the disk cache is unusable.
+    """
+    path, data, cache_key = _ensure_pdf(text, tenant_id, contract_id)
+    etag = pdf_etag(cache_key)
+    size = None
+    if path:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+    if size:
+        return streaming_range_response(
+            request,
+            size=size,
+            chunks=file_range_chunks(path),
+            etag=etag,
+            content_type='application/pdf',
+            filename=filename,
+            as_attachment=as_attachment,
+        )
+    if data is None:
+        data = render_text_pdf(text)
+    return byte_range_response(
+        request, data, etag=etag, content_type='application/pdf', filename=filename, as_attachment=as_attachment,
+    )
@@ -0,0 +1,122 @@
+"""
+Rendered previews for contract editing sessions.
+
+A preview is a pure function of the template version, the form inputs,
+the constraints, the selected clauses (and their published content) and
+the date printed in the header. `preview_key` hashes those into one key:
+
+- Form data and constraints are compared as canonical JSON, so key
+  order and whitespace don't matter.
+- Clause IDs are de-duplicated and sorted. The render orders clauses
+  itself, so their order in the request doesn't matter either.
+- The published clauses are fingerprinted with one aggregate query
+  (count and latest `updated_at`). Editing a clause therefore changes
+  the key.
+
+Rendered (html, text) pairs are kept in a bounded in-process LRU, capped
+by entry count and by total characters. The session's `ContractPreview`
+row remembers the key it was rendered for, so an unchanged preview is
+also served from any other process without re-rendering.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, Mapping, Optional
+
+from django.db.models import Count, Max
+
+from .models import Clause
+
+PREVIEW_KEY_VERSION = 'v1'
+PREVIEW_CACHE_SIZE = 256
+# Upper bound on the characters (html + text) held by the cache.
+PREVIEW_CACHE_MAX_CHARS = 32 * 1024 * 1024
+
+
+def _canonical(value) -> str:
+    return json.dumps(value or {}, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def normalize_clause_ids(clause_ids: Optional[Iterable]) -> list[str]:
+    return sorted({str(c) for c in clause_ids or () if c is not None and str(c) != ''})
+
+
+def clause_fingerprint(tenant_id, clause_ids: Iterable[str]) -> str:
+    """Count and latest update of the published clauses a preview would include."""
+    if not clause_ids:
+        return '0'
+    agg = Clause.objects.filter(
+        clause_id__in=list(clause_ids), tenant_id=tenant_id, status='published'
+    ).aggregate(n=Count('id'), latest=Max('updated_at'))
+    latest = agg['latest'].isoformat() if agg['latest'] else ''
+    return f"{agg['n']}:{latest}"
+
+
+def preview_key(template, form_data: Optional[Mapping], clause_ids, constraints: Optional[Mapping],
+                tenant_id, *, clauses_fingerprint: Optional[str] = None, day: Optional[str] = None) -> str:
+    """Cache key for the preview of these inputs."""
+    ids = normalize_clause_ids(clause_ids)
+    if clauses_fingerprint is None:
+        clauses_fingerprint = clause_fingerprint(tenant_id, ids)
+    if day is None:
+        # Same clock as the date printed in the preview header.
+        day = date.today().isoformat()
+    updated = getattr(template, 'updated_at', None)
+    parts = [
+        PREVIEW_KEY_VERSION,
+        str(tenant_id),
+        str(template.id),
+        updated.isoformat() if updated else '',
+        _canonical(form_data),
+        _canonical(constraints),
+        ','.join(ids),
+        clauses_fingerprint,
+        day,
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+_cache: OrderedDict[str, tuple[str, str]] = OrderedDict()
+_cache_chars = 0
+_cache_lock = threading.Lock()
+
+
+def _size(entry: tuple[str, str]) -> int:
+    return len(entry[0]) + len(entry[1])
+
+
+def get_preview(key: str) -> Optional[tuple[str, str]]:
+    """Cached (html, text) for `key`, or None."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+        return entry
+
+
+def put_preview(key: str, html: str, text: str) -> None:
+    global _cache_chars
+    entry = (html or '', text or '')
+    size = _size(entry)
+    if size > PREVIEW_CACHE_MAX_CHARS:
+        return
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_chars -= _size(old)
+        _cache[key] = entry
+        _cache_chars += size
+        while _cache and (len(_cache) > PREVIEW_CACHE_SIZE or _cache_chars > PREVIEW_CACHE_MAX_CHARS):
+            _, evicted = _cache.popitem(last=False)
+            _cache_chars -= _size(evicted)
+
+
+def clear_previews() -> None:
+    global _cache_chars
+    with _cache_lock:
+        _cache.clear()
+        _cache_chars = 0
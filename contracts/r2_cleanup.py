@@ -0,0 +1,198 @@
+"""
+Deferred, batched R2 deletion.
+
+Deleting a contract, document or blob records its R2 keys as
+`R2Tombstone` rows in the same transaction (`tombstone_keys`). Nothing is
+deleted from R2 inside the request. `purge_tombstones` claims due rows and
+removes them with S3 DeleteObjects, up to 1000 keys per call.
+
+- Prefix tombstones (a contract's `{tenant}/contracts/{id}/` folder) are
+  listed and deleted one page at a time. The row remembers where the
+  listing got to, so pages of live objects are skipped rather than
+  re-listed.
+- Keys that failed are retried with exponential backoff, up to MAX_ATTEMPTS.
+- Keys that a live ContractVersion or VersionBlob points at again are
+  dropped without being deleted.
+- `reconcile_tombstones` revisits rows that ran out of attempts. It drops
+  those whose objects are gone and re-queues the rest.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from authentication.r2_service import R2StorageService
+
+from .models import ContractVersion, R2Tombstone, VersionBlob
+
+logger = logging.getLogger(__name__)
+
+# S3 DeleteObjects limit.
+BATCH_SIZE = 1000
+MAX_ATTEMPTS = 8
+# Claimed rows are skipped by other workers for this long.
+CLAIM_LEASE = timedelta(minutes=10)
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+MAX_KEY_LENGTH = 1024
+
+
+def _clean(keys: Iterable[str]) -> list[str]:
+    out = []
+    for k in keys or ():
+        k = str(k or '').strip()
+        if k and len(k) <= MAX_KEY_LENGTH:
+            out.append(k)
+    return list(dict.fromkeys(out))
+
+
+def _queue_purge() -> None:
+    try:
+        from .tasks import purge_r2_tombstones_task
+
+        purge_r2_tombstones_task.delay()
+    except Exception as e:
+        # The periodic purge picks the rows up.
+        logger.warning(f"Could not queue R2 tombstone purge: {e}")
+
+
+def tombstone_keys(keys: Iterable[str] = (), *, prefixes: Iterable[str] = (), reason: str = '') -> int:
+    """
+    Record R2 keys (and whole prefixes) for deletion. Call it inside the
+    transaction that deletes their owner; a purge is queued on commit.
+    """
+    rows = [R2Tombstone(key=k, reason=reason) for k in _clean(keys)]
+    rows += [R2Tombstone(key=p, is_prefix=True, reason=reason) for p in _clean(prefixes)]
+    if not rows:
+        return 0
+    R2Tombstone.objects.bulk_create(rows, ignore_conflicts=True)
+    transaction.on_commit(_queue_purge)
+    return len(rows)
+
+
+def _live_keys(keys: list[str]) -> set[str]:
+    """Keys that rows still reference (e.g. a shared version file)."""
+    if not keys:
+        return set()
+    live = set(ContractVersion.objects.filter(r2_key__in=keys).values_list('r2_key', flat=True))
+    live.update(VersionBlob.objects.filter(r2_key__in=keys).values_list('r2_key', flat=True))
+    return live
+
+
+def _claim(limit: int) -> list[R2Tombstone]:
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            R2Tombstone.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+            .order_by('next_attempt_at')[:limit]
+        )
+        if rows:
+            R2Tombstone.objects.filter(id__in=[r.id for r in rows]).update(
+                next_attempt_at=now + CLAIM_LEASE,
+                attempts=F('attempts') + 1,
+            )
+    return rows
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def purge_tombstones(limit: int = BATCH_SIZE) -> dict:
+    """
+    Delete one batch of due tombstones from R2.
+
+    Returns {'deleted', 'failed', 'more'}. `more` is True when another batch
+    is probably due right away.
+    """
+    r2 = R2StorageService()
+    rows = _claim(limit)
+    if not rows:
+        return {'deleted': 0, 'failed': 0, 'more': False}
+
+    done: list[int] = []
+    requeue: dict[int, str] = {}
+    failed: dict[int, str] = {}
+    by_id = {r.id: r for r in rows}
+
+    key_rows = [r for r in rows if not r.is_prefix]
+    live = _live_keys([r.key for r in key_rows])
+    to_delete = {r.key: r.id for r in key_rows if r.key not in live}
+    done.extend(r.id for r in key_rows if r.key in live)
+    if to_delete:
+        try:
+            errors = r2.delete_objects(list(to_delete))
+        except Exception as e:
+            errors = {k: str(e) for k in to_delete}
+        for key, row_id in to_delete.items():
+            if key in errors:
+                failed[row_id] = errors[key]
+            else:
+                done.append(row_id)
+
+    for row in (r for r in rows if r.is_prefix):
+        try:
+            page, truncated = r2.list_objects_page(row.key, BATCH_SIZE, start_after=row.list_after or None)
+            listed = [o['key'] for o in page if o.get('key')]
+            live = _live_keys(listed)
+            keys = [k for k in listed if k not in live]
+            errors = r2.delete_objects(keys) if keys else {}
+        except Exception as e:
+            failed[row.id] = str(e)
+            continue
+        if errors:
+            # The page is listed again on retry.
+            failed[row.id] = next(iter(errors.values()))
+        elif truncated and listed:
+            requeue[row.id] = listed[-1]
+        else:
+            done.append(row.id)
+
+    now = timezone.now()
+    if done:
+        R2Tombstone.objects.filter(id__in=done).delete()
+    for row_id, list_after in requeue.items():
+        # The page was handled; the rest of the prefix doesn't count as a failure.
+        R2Tombstone.objects.filter(id=row_id).update(next_attempt_at=now, attempts=0, list_after=list_after)
+    for row_id, error in failed.items():
+        attempts = by_id[row_id].attempts + 1
+        R2Tombstone.objects.filter(id=row_id).update(
+            last_error=str(error)[:2000],
+            next_attempt_at=now + _retry_delay(attempts),
+        )
+        if attempts >= MAX_ATTEMPTS:
+            logger.error(f"R2 delete of {by_id[row_id].key} failed {attempts} times: {error}")
+
+    return {'deleted': len(done), 'failed': len(failed), 'more': len(rows) == limit or bool(requeue)}
+
+
+def reconcile_tombstones(limit: int = BATCH_SIZE) -> dict:
+    """
+    Settle tombstones that ran out of attempts: drop those whose objects
+    are gone (or referenced again) and give the rest a fresh set of retries.
+    """
+    rows = list(R2Tombstone.objects.filter(attempts__gte=MAX_ATTEMPTS).order_by('id')[:limit])
+    if not rows:
+        return {'dropped': 0, 'requeued': 0}
+
+    r2 = R2StorageService()
+    live = _live_keys([r.key for r in rows if not r.is_prefix])
+    dropped, requeued = [], []
+    for row in rows:
+        if row.is_prefix:
+            gone = not r2.list_objects(prefix=row.key, max_keys=1)
+        else:
+            gone = row.key in live or not r2.file_exists(row.key)
+        (dropped if gone else requeued).append(row.id)
+
+    if dropped:
+        R2Tombstone.objects.filter(id__in=dropped).delete()
+    if requeued:
+        R2Tombstone.objects.filter(id__in=requeued).update(attempts=0, next_attempt_at=timezone.now())
+    return {'dropped': len(dropped), 'requeued': len(requeued)}
@@ -0,0 +1,186 @@
+"""
+Compiled business rules.
+
+Rule condition JSON (`{"contract_value__gte": 100000, "contract_type": "MSA"}`)
+is compiled once into a predicate closure. A tenant's active rules are
+loaded with one query and kept in-process per (tenant, contract_type).
+
+Invalidation: BusinessRule saves/deletes bump a per-tenant generation in
+the shared cache (see contracts.signals), and every lookup compares
+against it. Queryset `.update()` sends no signal, so entries also expire
+after RULE_CACHE_TTL seconds.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Mapping, Optional, Sequence
+
+from django.core.cache import cache
+
+from .models import BusinessRule
+
+RULE_CACHE_TTL = 300
+RULE_CACHE_SIZE = 512
+
+Predicate = Callable[[Mapping], bool]
+
+
+def _always(context: Mapping) -> bool:
+    return True
+
+
+def _compile_check(key: str, expected) -> Predicate:
+    if '__' not in key:
+        return lambda ctx: ctx.get(key) == expected
+
+    field, operator = key.rsplit('__', 1)
+    if operator == 'gte':
+        test = lambda actual: actual >= expected
+    elif operator == 'lte':
+        test = lambda actual: actual <= expected
+    elif operator == 'gt':
+        test = lambda actual: actual > expected
+    elif operator == 'lt':
+        test = lambda actual: actual < expected
+    elif operator == 'in':
+        test = lambda actual: actual in expected
+    elif operator == 'contains':
+        test = lambda actual: expected in actual
+    else:
+        # Unknown operators only require the field to be present.
+        test = None
+
+    def check(ctx: Mapping) -> bool:
+        actual = ctx.get(field)
+        if actual is None:
+            return False
+        return True if test is None else test(actual)
+
+    return check
+
+
+def compile_condition(condition: Optional[Mapping]) -> Predicate:
+    """Predicate equivalent to RuleEngine.evaluate_condition(condition, context)."""
+    if not condition:
+        return _always
+    checks = tuple(_compile_check(key, expected) for key, expected in condition.items())
+    if len(checks) == 1:
+        return checks[0]
+    return lambda ctx: all(check(ctx) for check in checks)
+
+
+class CompiledRule:
+    __slots__ = ('id', 'name', 'description', 'rule_type', 'contract_types', 'action', 'predicate')
+
+    def __init__(self, rule: BusinessRule):
+        self.id = rule.id
+        self.name = rule.name
+        self.description = rule.description
+        self.rule_type = rule.rule_type
+        self.contract_types = rule.contract_types
+        self.action = rule.action if isinstance(rule.action, dict) else {}
+        self.predicate = compile_condition(rule.conditions)
+
+    def applies_to(self, contract_type) -> bool:
+        types = self.contract_types
+        return not types or (isinstance(types, list) and contract_type in types)
+
+
+class RuleSet:
+    """A tenant's active rules for one contract type, by rule type (highest priority first)."""
+
+    def __init__(self, rules: Iterable[CompiledRule], contract_type):
+        self.by_type: dict[str, list[CompiledRule]] = {}
+        self.suggestions_by_target: dict[str, list[CompiledRule]] = {}
+        for rule in rules:
+            if rule.rule_type == 'clause_suggestion':
+                # Suggestion rules apply to every contract type.
+                target = rule.action.get('target_clause_id')
+                if target is not None:
+                    self.suggestions_by_target.setdefault(target, []).append(rule)
+            elif rule.applies_to(contract_type):
+                self.by_type.setdefault(rule.rule_type, []).append(rule)
+
+    def matching(self, rule_type: str, context: Mapping) -> list[CompiledRule]:
+        return [r for r in self.by_type.get(rule_type, ()) if r.predicate(context)]
+
+    def matching_suggestions(self, target_clause_id: str, context: Mapping) -> list[CompiledRule]:
+        return [r for r in self.suggestions_by_target.get(target_clause_id, ()) if r.predicate(context)]
+
+
+# (tenant_id, contract_type) -> (generation, expires, RuleSet). contract_type may be None.
+_cache: OrderedDict = OrderedDict()
+# tenant_id -> (generation, expires, [CompiledRule]), shared by that tenant's rule sets.
+_compiled: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _generation_key(tenant_id) -> str:
+    return f"business-rules-generation:{tenant_id}"
+
+
+def invalidate_rules(tenant_id) -> None:
+    """Drop compiled rules for a tenant in every process."""
+    key = _generation_key(tenant_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+    with _cache_lock:
+        for k in [k for k in _cache if k[0] == str(tenant_id)]:
+            del _cache[k]
+        _compiled.pop(str(tenant_id), None)
+
+
+def _load_rules(tenant_id) -> list[CompiledRule]:
+    qs = BusinessRule.objects.filter(tenant_id=tenant_id, is_active=True).order_by('-priority', '-created_at')
+    return [CompiledRule(rule) for rule in qs]
+
+
+def get_rule_set(tenant_id, contract_type) -> RuleSet:
+    """Compiled rules for (tenant, contract_type); one query per tenant per generation."""
+    generation = cache.get(_generation_key(tenant_id)) or 0
+    now = time.monotonic()
+    tenant_key = str(tenant_id)
+    key = (tenant_key, contract_type)
+
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == generation and hit[1] > now:
+            _cache.move_to_end(key)
+            return hit[2]
+        compiled = _compiled.get(tenant_key)
+        if compiled is not None and not (compiled[0] == generation and compiled[1] > now):
+            compiled = None
+
+    if compiled is None:
+        compiled = (generation, now + RULE_CACHE_TTL, _load_rules(tenant_id))
+    rule_set = RuleSet(compiled[2], contract_type)
+
+    with _cache_lock:
+        _compiled[tenant_key] = compiled
+        _compiled.move_to_end(tenant_key)
+        while len(_compiled) > RULE_CACHE_SIZE:
+            _compiled.popitem(last=False)
+        _cache[key] = (compiled[0], compiled[1], rule_set)
+        _cache.move_to_end(key)
+        while len(_cache) > RULE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rule_set
+
+
+def evaluate_many(tenant_id, rule_type: str, items: Sequence[tuple]) -> list[list[CompiledRule]]:
+    """
+    Matching rules of `rule_type` for many contracts in one pass.
+    `items` are (contract_type, context) pairs; rules are loaded once.
+    """
+    sets: dict = {}
+    out = []
+    for contract_type, context in items:
+        rule_set = sets.get(contract_type)
+        if rule_set is None:
+            rule_set = sets[contract_type] = get_rule_set(tenant_id, contract_type)
+        out.append(rule_set.matching(rule_type, context))
+    return out
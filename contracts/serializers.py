@@ -1,7 +1,9 @@
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
 from .models import (
     Contract, ContractVersion, ContractTemplate, Clause,
-    GenerationJob, BusinessRule, ContractClause, WorkflowLog,
+    GenerationJob, BulkGenerationJob, BusinessRule, ContractClause, WorkflowLog,
     ESignatureContract, Signer, SigningAuditLog,
     ContractEditingSession, ContractEditingTemplate, ContractPreview,
     ContractEditingStep, ContractEdits, ContractFieldValidationRule
@@ -44,7 +46,8 @@ class ContractTemplateListSerializer(serializers.ModelSerializer):
 class ClauseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Clause
-        fields = '__all__'
+        # Embeddings are maintained by contracts.clause_embeddings; never exposed or client-writable.
+        exclude = ['embedding', 'embedding_sha256']
         read_only_fields = ['id', 'tenant_id', 'created_by', 'created_at', 'updated_at']
 
 
@@ -110,10 +113,29 @@ class ContractClauseSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+# to_attr used by `prefetch_latest_version`; a list with zero or one version.
+LATEST_VERSION_ATTR = '_latest_versions'
+
+
+def prefetch_latest_version(queryset):
+    """
+    Prefetch each contract's highest-numbered ContractVersion in one query
+    (ROW_NUMBER() per contract) for ContractDetailSerializer.latest_version.
+    """
+    latest = ContractVersion.objects.annotate(
+        _version_rank=Window(
+            RowNumber(),
+            partition_by=[F('contract_id')],
+            order_by=F('version_number').desc(),
+        )
+    ).filter(_version_rank=1)
+    return queryset.prefetch_related(Prefetch('versions', queryset=latest, to_attr=LATEST_VERSION_ATTR))
+
+
 class ContractDetailSerializer(serializers.ModelSerializer):
     latest_version = serializers.SerializerMethodField()
     metadata = serializers.SerializerMethodField()
-    # rendered_text/rendered_html are stored in `metadata`.
+    # rendered_text/rendered_html live in ContractContent (legacy rows: `metadata`).
     # Avoid duplicating large payloads at the top-level.
     
     class Meta:
@@ -143,6 +165,9 @@ class ContractDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'tenant_id', 'created_by', 'created_at', 'updated_at']
     
     def get_latest_version(self, obj):
+        prefetched = getattr(obj, LATEST_VERSION_ATTR, None)
+        if prefetched is not None:
+            return ContractVersionSerializer(prefetched[0]).data if prefetched else None
         try:
             latest = obj.versions.latest('version_number')
             return ContractVersionSerializer(latest).data
@@ -194,6 +219,28 @@ class GenerationJobSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class BulkGenerationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = BulkGenerationJob
+        fields = [
+            'id',
+            'template',
+            'status',
+            'progress',
+            'total_rows',
+            'succeeded',
+            'failed',
+            'errors',
+            'error_message',
+            'created_at',
+            'updated_at',
+            'completed_at',
+        ]
+        read_only_fields = fields
+
+
 class BusinessRuleSerializer(serializers.ModelSerializer):
     class Meta:
         model = BusinessRule
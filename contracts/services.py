@@ -1,27 +1,27 @@
 import uuid
 import hashlib
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any
 from io import BytesIO
 from django.utils import timezone
 import io
 import os
-import requests
 from pathlib import Path
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.pdfgen import canvas
 import logging
 
+# python-docx, reportlab, PyPDF2 and requests are imported where they are
+# used so that workers which never render or call SignNow don't load them.
+if TYPE_CHECKING:
+    from docx.document import Document as DocxDocument
+    from reportlab.pdfgen.canvas import Canvas
+
 from .models import (
     Contract, ContractVersion, ContractClause, 
-    ContractTemplate, Clause, BusinessRule, WorkflowLog,
+    ContractTemplate, Clause, WorkflowLog,
     GenerationJob
 )
+from .rule_engine import compile_condition, get_rule_set
+from .template_engine import render_template
 
 logger = logging.getLogger(__name__)
 
@@ -32,54 +32,25 @@ SIGNNOW_TOKEN_URL = "https://api.signnow.com/oauth2/token"
 
 
 class RuleEngine:
+    """
+    Business rule evaluation. Rules come from contracts.rule_engine,
+    compiled and cached per (tenant, contract_type).
+    """
+
     @staticmethod
     def evaluate_condition(condition: Dict, context: Dict) -> bool:
-        for key, expected_value in condition.items():
-            if '__' in key:
-                field, operator = key.rsplit('__', 1)
-                actual_value = context.get(field)
-                
-                if actual_value is None:
-                    return False
-                
-                if operator == 'gte' and not (actual_value >= expected_value):
-                    return False
-                elif operator == 'lte' and not (actual_value <= expected_value):
-                    return False
-                elif operator == 'gt' and not (actual_value > expected_value):
-                    return False
-                elif operator == 'lt' and not (actual_value < expected_value):
-                    return False
-                elif operator == 'in' and actual_value not in expected_value:
-                    return False
-                elif operator == 'contains' and expected_value not in actual_value:
-                    return False
-            else:
-                if context.get(key) != expected_value:
-                    return False
-        
-        return True
+        return compile_condition(condition)(context)
     
     @classmethod
     def get_mandatory_clauses(cls, tenant_id: uuid.UUID, contract_type: str, context: Dict) -> List[Dict]:
-        rules = BusinessRule.objects.filter(
-            tenant_id=tenant_id,
-            rule_type='mandatory_clause',
-            is_active=True
-        ).filter(
-            models.Q(contract_types=[]) | models.Q(contract_types__contains=[contract_type])
-        ).order_by('-priority')
-        
-        mandatory_clauses = []
-        for rule in rules:
-            if cls.evaluate_condition(rule.conditions, context):
-                mandatory_clauses.append({
-                    'clause_id': rule.action.get('clause_id'),
-                    'message': rule.action.get('message', ''),
-                    'rule_name': rule.name
-                })
-        
-        return mandatory_clauses
+        return [
+            {
+                'clause_id': rule.action.get('clause_id'),
+                'message': rule.action.get('message', ''),
+                'rule_name': rule.name
+            }
+            for rule in get_rule_set(tenant_id, contract_type).matching('mandatory_clause', context)
+        ]
     
     @classmethod
     def get_clause_suggestions(cls, tenant_id: uuid.UUID, contract_type: str, context: Dict, clause_id: str) -> List[Dict]:
@@ -91,36 +62,55 @@ class RuleEngine:
             )
         except Clause.DoesNotExist:
             return []
-        
-        suggestions = []
-        
-        for alt in clause.alternatives:
-            trigger_rules = alt.get('trigger_rules', {})
-            if not trigger_rules or cls.evaluate_condition(trigger_rules, context):
-                suggestions.append({
-                    'clause_id': alt['clause_id'],
-                    'rationale': alt.get('rationale', 'Alternative clause'),
-                    'confidence': alt.get('confidence', 0.8),
-                    'source': 'predefined'
-                })
-        
-        rules = BusinessRule.objects.filter(
-            tenant_id=tenant_id,
-            rule_type='clause_suggestion',
-            is_active=True,
-            action__target_clause_id=clause_id
-        ).order_by('-priority')
-        
-        for rule in rules:
-            if cls.evaluate_condition(rule.conditions, context):
-                suggestions.append({
-                    'clause_id': rule.action.get('suggest_clause_id'),
-                    'rationale': rule.action.get('rationale', rule.description),
-                    'confidence': rule.action.get('confidence', 0.7),
-                    'source': 'rule_based'
-                })
-        
-        return suggestions
+        return cls.suggestions_for_clauses(tenant_id, contract_type, context, [clause])
+    
+    @classmethod
+    def suggestions_for_clauses(cls, tenant_id: uuid.UUID, contract_type: str, context: Dict, clauses) -> List[Dict]:
+        """Suggestions for already-loaded published clauses (no queries once rules are cached)."""
+        return cls.bulk_clause_suggestions(tenant_id, [(contract_type, context, clauses)])[0]
+    
+    @classmethod
+    def bulk_clause_suggestions(cls, tenant_id: uuid.UUID, items) -> List[List[Dict]]:
+        """
+        Clause suggestions for many contracts in one pass.
+
+        `items` are (contract_type, context, clauses) tuples. Returns one
+        suggestion list per item, concatenated over its clauses in order.
+        Each clause's alternative triggers are compiled once per call.
+        """
+        rule_sets = {}
+        triggers = {}
+        results = []
+        for contract_type, context, clauses in items:
+            rule_set = rule_sets.get(contract_type)
+            if rule_set is None:
+                rule_set = rule_sets[contract_type] = get_rule_set(tenant_id, contract_type)
+
+            suggestions = []
+            for clause in clauses:
+                compiled = triggers.get(clause.pk)
+                if compiled is None:
+                    compiled = triggers[clause.pk] = [
+                        (alt, compile_condition(alt.get('trigger_rules', {})))
+                        for alt in (clause.alternatives or [])
+                    ]
+                for alt, predicate in compiled:
+                    if predicate(context):
+                        suggestions.append({
+                            'clause_id': alt['clause_id'],
+                            'rationale': alt.get('rationale', 'Alternative clause'),
+                            'confidence': alt.get('confidence', 0.8),
+                            'source': 'predefined'
+                        })
+                for rule in rule_set.matching_suggestions(clause.clause_id, context):
+                    suggestions.append({
+                        'clause_id': rule.action.get('suggest_clause_id'),
+                        'rationale': rule.action.get('rationale', rule.description),
+                        'confidence': rule.action.get('confidence', 0.7),
+                        'source': 'rule_based'
+                    })
+            results.append(suggestions)
+        return results
     
     @classmethod
     def validate_contract(cls, tenant_id: uuid.UUID, contract_type: str, context: Dict, selected_clauses: List[str]) -> Tuple[bool, List[str]]:
@@ -135,18 +125,9 @@ class RuleEngine:
             if req['clause_id'] not in selected_clauses:
                 errors.append(f"Mandatory clause missing: {req['clause_id']} - {req['message']}")
         
-        rules = BusinessRule.objects.filter(
-            tenant_id=tenant_id,
-            rule_type='validation',
-            is_active=True
-        ).filter(
-            models.Q(contract_types=[]) | models.Q(contract_types__contains=[contract_type])
-        )
-        
-        for rule in rules:
-            if cls.evaluate_condition(rule.conditions, context):
-                if rule.action.get('type') == 'error':
-                    errors.append(rule.action.get('message', rule.description))
+        for rule in get_rule_set(tenant_id, contract_type).matching('validation', context):
+            if rule.action.get('type') == 'error':
+                errors.append(rule.action.get('message', rule.description))
         
         return len(errors) == 0, errors
 
@@ -203,23 +184,10 @@ class ContractGenerator:
         change_summary: Optional[str] = None
     ) -> ContractVersion:
         template = contract.template
-        context = {
-            'contract_type': contract.contract_type,
-            'contract_value': float(contract.value) if contract.value else 0,
-            'counterparty': contract.counterparty,
-            **contract.form_inputs
-        }
+        context = self.build_context(contract)
         
         if selected_clauses is None:
-            selected_clauses = list(template.mandatory_clauses)
-            mandatory = self.rule_engine.get_mandatory_clauses(
-                self.tenant_id, 
-                contract.contract_type, 
-                context
-            )
-            for req in mandatory:
-                if req['clause_id'] not in selected_clauses:
-                    selected_clauses.append(req['clause_id'])
+            selected_clauses = self.default_clauses(template, contract.contract_type, context)
         
         is_valid, errors = self.rule_engine.validate_contract(
             self.tenant_id,
@@ -231,7 +199,8 @@ class ContractGenerator:
         if not is_valid:
             raise ValidationError({"clauses": errors})
         
-        doc = self._create_document(contract, selected_clauses, context)
+        clauses = self._published_clauses(selected_clauses)
+        doc = self._create_document(contract, selected_clauses, context, clauses=clauses)
         
         doc_bytes = BytesIO()
         doc.save(doc_bytes)
@@ -253,7 +222,7 @@ class ContractGenerator:
             r2_key=f'contracts/{contract.id}/v{version_number}.docx'
         )
         
-        self._store_clause_provenance(version, selected_clauses, context)
+        self._store_clause_provenance(version, selected_clauses, context, clauses=clauses)
         
         contract.current_version = version_number + 1
         contract.save()
@@ -268,7 +237,36 @@ class ContractGenerator:
         
         return version
     
-    def _create_document(self, contract: Contract, clause_ids: List[str], context: Dict) -> Document:
+    @staticmethod
+    def build_context(contract: Contract) -> Dict:
+        """Rule/merge-field context for a contract."""
+        return {
+            'contract_type': contract.contract_type,
+            'contract_value': float(contract.value) if contract.value else 0,
+            'counterparty': contract.counterparty,
+            **(contract.form_inputs or {})
+        }
+    
+    def default_clauses(self, template: ContractTemplate, contract_type: str, context: Dict) -> List[str]:
+        """Template mandatory clauses plus any required by mandatory_clause rules."""
+        selected_clauses = list(template.mandatory_clauses)
+        mandatory = self.rule_engine.get_mandatory_clauses(self.tenant_id, contract_type, context)
+        for req in mandatory:
+            if req['clause_id'] not in selected_clauses:
+                selected_clauses.append(req['clause_id'])
+        return selected_clauses
+    
+    def _create_document(
+        self,
+        contract: Contract,
+        clause_ids: List[str],
+        context: Dict,
+        clauses: Optional[List[Clause]] = None,
+    ) -> 'DocxDocument':
+        """`clauses` (published, ordered by clause_id) may be preloaded by bulk callers."""
+        from docx import Document
+        from docx.shared import Pt, RGBColor
+
         doc = Document()
         doc.add_heading(contract.title, 0)
         p = doc.add_paragraph()
@@ -283,11 +281,8 @@ class ContractGenerator:
         p.add_run(f"{contract.created_at.strftime('%Y-%m-%d')}\n")
         doc.add_paragraph()  
         
-        clauses = Clause.objects.filter(
-            tenant_id=self.tenant_id,
-            clause_id__in=clause_ids,
-            status='published'
-        ).order_by('clause_id')
+        if clauses is None:
+            clauses = self._published_clauses(clause_ids)
         
         for i, clause in enumerate(clauses, 1):
             heading = doc.add_heading(f"{i}. {clause.name}", level=2)
@@ -301,29 +296,26 @@ class ContractGenerator:
         return doc
     
     def _replace_merge_fields(self, text: str, context: Dict) -> str:
-        result = text
-        for key, value in context.items():
-            placeholder = f"{{{{{key}}}}}"
-            if placeholder in result:
-                result = result.replace(placeholder, str(value))
-        return result
+        return render_template(text, context)
     
-    def _store_clause_provenance(self, version: ContractVersion, clause_ids: List[str], context: Dict):
-        clauses = Clause.objects.filter(
-            tenant_id=self.tenant_id,
-            clause_id__in=clause_ids,
-            status='published'
-        ).order_by('clause_id')
-        
-        for position, clause in enumerate(clauses, 1):
-            alternatives = self.rule_engine.get_clause_suggestions(
-                self.tenant_id,
-                version.contract.contract_type,
-                context,
-                clause.clause_id
-            )
-            
-            ContractClause.objects.create(
+    def _published_clauses(self, clause_ids: List[str]) -> List[Clause]:
+        """Published clauses for `clause_ids`, ordered by clause_id (one IN query)."""
+        return list(
+            Clause.objects.filter(
+                tenant_id=self.tenant_id,
+                clause_id__in=clause_ids,
+                status='published'
+            ).order_by('clause_id')
+        )
+    
+    def clause_provenance(self, version: ContractVersion, clauses: List[Clause], context: Dict) -> List[ContractClause]:
+        """Unsaved ContractClause rows for `clauses`, with suggestions from one rule pass."""
+        contract_type = version.contract.contract_type
+        alternatives = self.rule_engine.bulk_clause_suggestions(
+            self.tenant_id, [(contract_type, context, [clause]) for clause in clauses]
+        )
+        return [
+            ContractClause(
                 contract_version=version,
                 clause_id=clause.clause_id,
                 clause_version=clause.version,
@@ -331,12 +323,24 @@ class ContractGenerator:
                 clause_content=clause.content,
                 is_mandatory=clause.is_mandatory,
                 position=position,
-                alternatives_suggested=alternatives
+                alternatives_suggested=suggested
             )
+            for position, (clause, suggested) in enumerate(zip(clauses, alternatives), 1)
+        ]
+    
+    def _store_clause_provenance(
+        self,
+        version: ContractVersion,
+        clause_ids: List[str],
+        context: Dict,
+        clauses: Optional[List[Clause]] = None,
+    ):
+        if clauses is None:
+            clauses = self._published_clauses(clause_ids)
+        ContractClause.objects.bulk_create(self.clause_provenance(version, clauses, context))
 
 
 from rest_framework.exceptions import ValidationError
-from django.db import models
 
 
 
@@ -426,6 +430,10 @@ class ContractGenerationService:
         """
         Generate the actual DOCX document
         """
+        from docx import Document
+        from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+        from docx.shared import Pt, RGBColor
+
         # Create new document (in production, load template from R2)
         doc = Document()
         
@@ -814,6 +822,10 @@ class ContractGeneratorService:
         Fill PDF template with data and return as bytes
         Uses ReportLab to overlay text on PDF
         """
+        from PyPDF2 import PdfReader, PdfWriter
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+
         # Read the template PDF
         with open(template_path, 'rb') as f:
             reader = PdfReader(f)
@@ -945,7 +957,7 @@ class ContractGeneratorService:
     
     def _draw_field_value(
         self,
-        canvas_obj: canvas.Canvas,
+        canvas_obj: 'Canvas',
         field_name: str,
         value: str,
         x: float,
@@ -953,6 +965,8 @@ class ContractGeneratorService:
         contract_type: str
     ) -> None:
         """Draw a field value on the canvas"""
+        from reportlab.lib import colors
+
         try:
             # Format value based on field type
             if 'date' in field_name and not value:
@@ -1048,6 +1062,7 @@ class SignNowAuthService:
         Refresh OAuth token using refresh_token
         Returns: access_token or None
         """
+        import requests
         from .models import SignNowCredential
         
         try:
@@ -1143,6 +1158,8 @@ class SignNowAPIService:
         Make authenticated request to SignNow API
         Handles error responses and logging
         """
+        import requests
+
         url = f"{self.base_url}{endpoint}"
         headers = self._get_headers()
         
@@ -0,0 +1,57 @@
+"""
+Model signal handlers for contracts
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .clause_embeddings import needs_embedding, schedule_clause_embedding
+from .models import BusinessRule, Clause, Contract
+from .rule_engine import invalidate_rules
+from .status_counters import record_status_change
+
+
+@receiver(post_save, sender=Clause)
+def queue_clause_embedding(sender, instance, raw=False, **kwargs):
+    """Re-embed a clause when it is published or its text changes"""
+    if raw:
+        return
+    if needs_embedding(instance):
+        schedule_clause_embedding([instance.id])
+
+
+@receiver(post_init, sender=Contract)
+def remember_contract_status(sender, instance, **kwargs):
+    """Remember the loaded status so saves can move the status counters"""
+    # __dict__ lookup: never trigger a query for a deferred status column.
+    instance._counted_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Contract)
+def count_contract_status_on_save(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Keep per-tenant status counters in step with creates and status changes"""
+    if raw:
+        return
+    new_status = instance.__dict__.get('status')
+    if created:
+        record_status_change(instance.tenant_id, None, new_status)
+    elif update_fields is None or 'status' in update_fields:
+        old_status = getattr(instance, '_counted_status', None)
+        if old_status and new_status:
+            record_status_change(instance.tenant_id, old_status, new_status)
+    instance._counted_status = new_status
+
+
+@receiver(post_delete, sender=Contract)
+def count_contract_status_on_delete(sender, instance, **kwargs):
+    record_status_change(instance.tenant_id, getattr(instance, '_counted_status', None), None)
+
+
+@receiver(post_save, sender=BusinessRule)
+@receiver(post_delete, sender=BusinessRule)
+def invalidate_compiled_rules(sender, instance, raw=False, **kwargs):
+    """Recompile the tenant's rules once the change is committed"""
+    if raw:
+        return
+    tenant_id = instance.tenant_id
+    transaction.on_commit(lambda: invalidate_rules(tenant_id))
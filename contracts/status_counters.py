@@ -0,0 +1,100 @@
+"""
+Per-tenant contract status counters for dashboard statistics.
+
+Contract signals apply +1/-1 deltas after commit (see contracts.signals);
+`reconcile_status_counters` recomputes them from the contracts table to
+correct any drift (bulk updates, crashes between commit and the delta).
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import Contract, ContractStatusCounter
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_DELTA_SQL = (
+    "INSERT INTO contract_status_counters (tenant_id, status, count, updated_at) "
+    "VALUES (%s, %s, %s, NOW()) "
+    "ON CONFLICT (tenant_id, status) DO UPDATE "
+    "SET count = contract_status_counters.count + EXCLUDED.count, updated_at = NOW()"
+)
+
+
+def _apply_deltas(deltas: dict) -> None:
+    rows = [(str(tenant_id), status, delta) for (tenant_id, status), delta in deltas.items() if delta]
+    if not rows:
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(_UPSERT_DELTA_SQL, rows)
+    except Exception as e:
+        # Reconciliation repairs the counters; never fail the contract write.
+        logger.warning(f"Contract status counter update failed: {e}")
+
+
+def record_status_change(tenant_id, old_status: Optional[str], new_status: Optional[str], count: int = 1) -> None:
+    """
+    Queue a counter move of `count` contracts from old_status to new_status
+    (None = created/deleted) for after commit. bulk_create() callers must
+    call this themselves; it sends no signals.
+    """
+    if not tenant_id or old_status == new_status or count <= 0:
+        return
+    deltas = defaultdict(int)
+    if old_status:
+        deltas[(tenant_id, old_status)] -= count
+    if new_status:
+        deltas[(tenant_id, new_status)] += count
+    transaction.on_commit(lambda: _apply_deltas(deltas))
+
+
+def get_status_counts(tenant_id) -> Optional[dict]:
+    """{status: count} from the counters, or None if the tenant has never been counted."""
+    rows = list(ContractStatusCounter.objects.filter(tenant_id=tenant_id).values_list('status', 'count'))
+    if not rows:
+        return None
+    return {status: max(0, count) for status, count in rows}
+
+
+def reconcile_status_counters(tenant_id=None) -> int:
+    """
+    Overwrite counters with actual counts (one tenant, or all). Returns the
+    number of counter rows written.
+    """
+    qs = Contract.objects.all()
+    if tenant_id:
+        qs = qs.filter(tenant_id=tenant_id)
+
+    with transaction.atomic():
+        # Lock first so deltas arriving meanwhile land after the overwrite.
+        existing = ContractStatusCounter.objects.select_for_update()
+        if tenant_id:
+            existing = existing.filter(tenant_id=tenant_id)
+        existing = list(existing)
+        actual = {
+            (row['tenant_id'], row['status']): row['n']
+            for row in qs.order_by().values('tenant_id', 'status').annotate(n=Count('id'))
+        }
+        stale = [c for c in existing if (c.tenant_id, c.status) not in actual]
+        for c in stale:
+            if c.count != 0:
+                c.count = 0
+                c.save(update_fields=['count', 'updated_at'])
+
+        objs = [
+            ContractStatusCounter(tenant_id=t, status=s, count=n)
+            for (t, s), n in actual.items()
+        ]
+        ContractStatusCounter.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['tenant_id', 'status'],
+            update_fields=['count', 'updated_at'],
+        )
+    return len(objs) + len(stale)
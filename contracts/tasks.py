@@ -0,0 +1,161 @@
+"""
+Celery tasks for contracts
+"""
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def embed_clauses(self, clause_ids: list):
+    """Compute and store embeddings for clauses whose text changed"""
+    from .clause_embeddings import refresh_clause_embeddings
+
+    try:
+        return refresh_clause_embeddings(clause_ids)
+    except Exception as e:
+        logger.error(f"Clause embedding failed: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+
+@shared_task(bind=True, max_retries=5)
+def flush_editor_snapshot_task(self, contract_id: str):
+    """Write-behind flush of pending editor content to R2 (see contracts.editor_autosave)"""
+    from .editor_autosave import flush_editor_snapshot
+
+    try:
+        return flush_editor_snapshot(contract_id)
+    except Exception as e:
+        logger.warning(f"Editor snapshot flush failed for {contract_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=min(300, 5 * (2 ** self.request.retries)))
+
+
+@shared_task(bind=True, max_retries=3)
+def migrate_contract_content_task(self, after: str = None, batch_size: int = None):
+    """Move legacy in-row contract content/PDFs out of `contracts`, one batch per run (see contracts.content_store)"""
+    from .content_store import MIGRATION_BATCH_SIZE, migrate_contract_content
+
+    batch_size = batch_size or MIGRATION_BATCH_SIZE
+    try:
+        migrated, next_after = migrate_contract_content(after=after, batch_size=batch_size)
+    except Exception as e:
+        logger.error(f"Contract content migration batch failed: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+    logger.info(f"Migrated content for {migrated} contract(s)")
+    if next_after:
+        migrate_contract_content_task.delay(after=next_after, batch_size=batch_size)
+    return migrated
+
+
+@shared_task
+def reconcile_contract_status_counters(tenant_id: str = None):
+    """Recompute per-tenant contract status counters from the contracts table (scheduled via beat)"""
+    from .status_counters import reconcile_status_counters
+
+    written = reconcile_status_counters(tenant_id)
+    logger.info(f"Reconciled {written} contract status counter(s)")
+    return written
+
+
+@shared_task(bind=True, max_retries=3)
+def bulk_generation_chunk_task(self, job_id: str, index: int = None):
+    """Claim and generate one chunk of a bulk generation job, then hand off to the next chunk (see contracts.bulk_generation)"""
+    from .bulk_generation import ChunkAlreadyRecorded, claim_next_chunk, fail_chunk, process_chunk
+
+    if index is None:
+        index = claim_next_chunk(job_id)
+        if index is None:
+            return None
+
+    try:
+        succeeded, failed = process_chunk(job_id, index)
+    except ChunkAlreadyRecorded:
+        # A re-queued duplicate; the run that recorded it handed off already.
+        return None
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            logger.warning(f"Bulk generation chunk {index} of {job_id} failed, retrying: {str(e)}")
+            raise self.retry(exc=e, countdown=30 * (2 ** self.request.retries), args=[job_id], kwargs={'index': index})
+        logger.error(f"Bulk generation chunk {index} of {job_id} failed: {str(e)}")
+        fail_chunk(job_id, index, f'Chunk failed: {str(e)}')
+        succeeded, failed = 0, None
+
+    # Each finished chunk starts at most one more, which keeps concurrency bounded.
+    bulk_generation_chunk_task.delay(job_id)
+    return {'chunk': index, 'succeeded': succeeded, 'failed': failed}
+
+
+@shared_task
+def recover_stalled_bulk_generation_jobs():
+    """Re-queue or fail lost chunks of bulk generation jobs that stopped progressing (scheduled via beat)"""
+    from .bulk_generation import recover_stalled_jobs
+
+    recovered = recover_stalled_jobs()
+    if recovered:
+        logger.warning(f"Recovered {recovered} stalled bulk generation job(s)")
+    return recovered
+
+
+@shared_task(bind=True, max_retries=3)
+def finalize_bulk_generation_task(self, job_id: str):
+    """Merge a bulk generation job's chunk ZIPs into the downloadable result"""
+    from .bulk_generation import finalize_job
+    from .models import BulkGenerationJob
+
+    try:
+        return finalize_job(job_id)
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=60)
+        logger.error(f"Bulk generation finalize failed for {job_id}: {str(e)}")
+        BulkGenerationJob.objects.filter(id=job_id).update(status='failed', error_message=str(e))
+        return None
+
+
+@shared_task
+def delete_unreferenced_version_blobs(tenant_id: str = None):
+    """Delete version blobs no contract version references any more (scheduled via beat)"""
+    from .version_store import delete_unreferenced_blobs
+
+    deleted = delete_unreferenced_blobs(tenant_id)
+    logger.info(f"Deleted {deleted} unreferenced version blob(s)")
+    return deleted
+
+
+@shared_task
+def delete_unreferenced_content_snapshots():
+    """Delete copy-on-write content snapshots no contract reads any more (scheduled via beat)"""
+    from .content_store import delete_unreferenced_snapshots
+
+    deleted = delete_unreferenced_snapshots()
+    logger.info(f"Deleted {deleted} unreferenced content snapshot(s)")
+    return deleted
+
+
+@shared_task(bind=True, max_retries=3)
+def purge_r2_tombstones_task(self):
+    """Delete one batch of tombstoned R2 keys; chains itself while more are due"""
+    from .r2_cleanup import purge_tombstones
+
+    try:
+        result = purge_tombstones()
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=60)
+        logger.error(f"R2 tombstone purge failed: {str(e)}")
+        return None
+    if result['more']:
+        purge_r2_tombstones_task.delay()
+    return result
+
+
+@shared_task
+def reconcile_r2_tombstones():
+    """Drop or re-queue R2 tombstones that ran out of retries (scheduled via beat)"""
+    from .r2_cleanup import reconcile_tombstones
+
+    result = reconcile_tombstones()
+    logger.info(f"Reconciled R2 tombstones: {result}")
+    return result
@@ -0,0 +1,104 @@
+"""
+Compiled `{{ placeholder }}` templates.
+
+A template is parsed once into alternating literal / placeholder segments
+and cached by the sha256 of its content, so rendering is a single pass and
+a join. It does not run one regex substitution per field over the whole
+text. Placeholders without a value are left exactly as written, and
+substituted values are never re-scanned for placeholders.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, Mapping, Optional
+
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*([^{}]*?)\s*\}\}')
+_IDENTIFIER_RE = re.compile(r'[a-zA-Z0-9_]+')
+
+TEMPLATE_CACHE_SIZE = 256
+
+
+class CompiledTemplate:
+    """
+    `literals` has one more entry than `names`. The output is
+    literals[0] + value(names[0]) + literals[1] + ... + literals[-1].
+    `tokens[i]` is the original `{{ ... }}` text of names[i].
+    """
+
+    __slots__ = ('literals', 'names', 'tokens', 'placeholders')
+
+    def __init__(self, text: str):
+        literals, names, tokens = [], [], []
+        pos = 0
+        for m in _PLACEHOLDER_RE.finditer(text):
+            name = m.group(1)
+            if not name:
+                continue
+            literals.append(text[pos:m.start()])
+            names.append(name)
+            tokens.append(m.group(0))
+            pos = m.end()
+        literals.append(text[pos:])
+        self.literals = tuple(literals)
+        self.names = tuple(names)
+        self.tokens = tuple(tokens)
+        # Unique names in order of first appearance.
+        self.placeholders = tuple(dict.fromkeys(names))
+
+    def render(self, values: Optional[Mapping] = None) -> str:
+        if not self.names:
+            return self.literals[0]
+        lookup = {str(k): ('' if v is None else str(v)) for k, v in (values or {}).items() if k is not None}
+        parts = [self.literals[0]]
+        for i, name in enumerate(self.names):
+            parts.append(lookup.get(name, self.tokens[i]))
+            parts.append(self.literals[i + 1])
+        return ''.join(parts)
+
+
+_cache: OrderedDict[str, CompiledTemplate] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_template(text: str, *, cache: bool = True) -> CompiledTemplate:
+    """Parse `text` (cached by content hash unless cache=False, e.g. one-off rendered output)."""
+    text = text or ''
+    if not cache:
+        return CompiledTemplate(text)
+    key = hashlib.sha256(text.encode('utf-8', errors='surrogatepass')).hexdigest()
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+    compiled = CompiledTemplate(text)
+    with _cache_lock:
+        _cache[key] = compiled
+        while len(_cache) > TEMPLATE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def render_template(text: str, values: Optional[Mapping] = None) -> str:
+    return compile_template(text).render(values)
+
+
+def extract_placeholders(text: str) -> list[str]:
+    """Sorted identifier-style placeholder names (`{{ company_name }}`) in `text`."""
+    return sorted(n for n in compile_template(text).placeholders if _IDENTIFIER_RE.fullmatch(n))
+
+
+def fill_first_slot(text: str, slots: Iterable[str], value: str) -> Optional[str]:
+    """
+    Replace every occurrence of the first of `slots` present in `text` with
+    `value`. Returns None if none of them occur.
+    """
+    compiled = compile_template(text, cache=False)
+    present = set(compiled.placeholders)
+    for slot in slots:
+        if slot in present:
+            return compiled.render({slot: value})
+    return None
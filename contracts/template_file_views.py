@@ -13,6 +13,7 @@ from rest_framework import status
 from rest_framework.views import APIView
 
 from contracts.models import TemplateFile
+from contracts.template_engine import extract_placeholders
 from contracts.utils.template_files_db import get_or_import_template_from_filesystem
 
 
@@ -672,11 +673,6 @@ US_STATES = [
 ]
 
 
-def _extract_placeholders(raw_text: str) -> list[str]:
-    rx = re.compile(r"\{\{\s*([a-zA-Z0-9_]+)\s*\}\}")
-    return sorted({m.group(1).strip() for m in rx.finditer(raw_text) if m.group(1)})
-
-
 def _schema_for_contract_type(contract_type: str) -> list[dict]:
     ct = (contract_type or "").upper()
 
@@ -785,7 +781,7 @@ class TemplateFileSchemaView(APIView):
         raw_text = tmpl.content or ''
 
         template_type = tmpl.contract_type or _infer_template_type(safe)
-        placeholders = _extract_placeholders(raw_text)
+        placeholders = extract_placeholders(raw_text)
         sections = _schema_for_contract_type(template_type)
 
         # Mark which schema fields are actually present in the template as placeholders
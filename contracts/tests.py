@@ -1,11 +1,90 @@
 """
 Tests for contracts app
 """
-from django.test import TestCase
-from rest_framework.test import APIClient
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.generics import GenericAPIView
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
 
 from authentication.models import User
-from contracts.models import Contract
+from clm_backend.conditional import (
+	ConditionalGetMixin,
+	byte_range_response,
+	etag_matches,
+	file_range_chunks,
+	make_etag,
+	r2_file_response,
+	streaming_range_response,
+)
+from clm_backend.pagination import (
+	CreatedAtCursorPagination,
+	EstimatedCountPagination,
+	EstimatedCountPaginator,
+	PaginationModeMixin,
+)
+from contracts.bulk_generation import (
+	MAX_STALL_REQUEUES,
+	BulkInputError,
+	ChunkAlreadyRecorded,
+	parse_rows,
+	process_chunk,
+	recover_stalled_jobs,
+)
+from contracts.clause_embeddings import clause_embedding_sha256, needs_embedding
+from contracts.content_store import (
+	get_stored_content,
+	get_stored_plain_text,
+	plain_text_of,
+	share_content,
+	split_content,
+	store_content,
+)
+from contracts.editor_deltas import DeltaError, apply_ops
+from contracts.pdf_render_cache import pdf_cache_key, pdf_cache_r2_key, pdf_etag, pdf_file_response, render_text_pdf
+from contracts import preview_cache
+from contracts.preview_cache import get_preview, preview_key, put_preview
+from contracts.r2_cleanup import MAX_ATTEMPTS, purge_tombstones, tombstone_keys
+from contracts.rule_engine import CompiledRule, RuleSet, compile_condition, get_rule_set
+from contracts.template_engine import compile_template, extract_placeholders, fill_first_slot, render_template
+from contracts.version_diff import (
+	DEGRADED_DIFF_CACHE_TIMEOUT,
+	DIFF_CACHE_TIMEOUT,
+	PARAGRAPH,
+	cached_diff,
+	diff_sequences,
+	diff_texts,
+)
+from contracts.version_store import VersionStoreError, apply_delta, delete_unreferenced_blobs, make_delta, store_file
+from contracts.status_counters import get_status_counts, reconcile_status_counters
+from contracts.models import (
+	BulkGenerationJob,
+	BusinessRule,
+	Clause,
+	Contract,
+	ContractClause,
+	ContractContentSnapshot,
+	ContractEditingTemplate,
+	ContractEditorOp,
+	ContractVersion,
+	R2Tombstone,
+	VersionBlob,
+)
+from contracts.serializers import ClauseSerializer, ContractDetailSerializer, prefetch_latest_version
+from contracts.services import ContractGenerator, RuleEngine
 
 
 class TemplateBasedDraftingFlowTests(TestCase):
@@ -135,3 +214,835 @@ class ContractOwnershipIsolationTests(TestCase):
 		res = self.client.delete(f'/api/v1/contracts/{self.contract1.id}/')
 		self.assertEqual(res.status_code, 204)
 		self.assertFalse(Contract.objects.filter(id=self.contract1.id).exists())
+
+
+class LatestVersionQueryCountTests(TestCase):
+	def setUp(self):
+		import uuid
+		self.tenant_id = uuid.uuid4()
+		self.user = User.objects.create_user(email='lv@example.com', password='pass1234', tenant_id=self.tenant_id)
+		self.client = APIClient()
+		self.client.force_authenticate(user=self.user)
+
+	def _create_contracts(self, n, versions=2):
+		for i in range(n):
+			contract = Contract.objects.create(
+				tenant_id=self.tenant_id, title=f'C{i}', status='draft', created_by=self.user.user_id,
+			)
+			for v in range(1, versions + 1):
+				ContractVersion.objects.create(
+					contract=contract, version_number=v, r2_key=f'k{i}-{v}',
+					template_id=self.tenant_id, template_version=1, created_by=self.user.user_id,
+				)
+
+	def test_detail_serializer_list_uses_constant_queries(self):
+		self._create_contracts(3)
+		qs = prefetch_latest_version(Contract.objects.filter(tenant_id=self.tenant_id))
+		with self.assertNumQueries(2):
+			data = ContractDetailSerializer(qs, many=True).data
+		self.assertEqual({row['latest_version']['version_number'] for row in data}, {2})
+
+	def test_contract_without_versions_has_no_latest_version(self):
+		self._create_contracts(1, versions=0)
+		contract = prefetch_latest_version(Contract.objects.filter(tenant_id=self.tenant_id)).get()
+		with self.assertNumQueries(0):
+			self.assertIsNone(ContractDetailSerializer(contract).data['latest_version'])
+
+	def test_list_endpoint_queries_do_not_grow_with_rows(self):
+		def list_queries():
+			with CaptureQueriesContext(connection) as ctx:
+				self.assertEqual(self.client.get('/api/v1/contracts/').status_code, 200)
+			return len(ctx.captured_queries)
+
+		self._create_contracts(1)
+		one = list_queries()
+		self._create_contracts(4)
+		self.assertEqual(list_queries(), one)
+
+
+class ContractStatusCounterTests(TestCase):
+	def setUp(self):
+		import uuid
+		self.tenant_id = uuid.uuid4()
+		self.user_id = uuid.uuid4()
+
+	def _create(self, status):
+		with self.captureOnCommitCallbacks(execute=True):
+			return Contract.objects.create(tenant_id=self.tenant_id, title='C', status=status, created_by=self.user_id)
+
+	def test_counters_follow_create_update_delete(self):
+		a = self._create('draft')
+		self._create('draft')
+		with self.captureOnCommitCallbacks(execute=True):
+			a.status = 'approved'
+			a.save(update_fields=['status', 'updated_at'])
+		with self.captureOnCommitCallbacks(execute=True):
+			a.delete()
+
+		self.assertEqual(get_status_counts(self.tenant_id), {'draft': 1, 'approved': 0})
+
+	def test_reconcile_repairs_drift(self):
+		c = self._create('draft')
+		# Queryset updates bypass signals.
+		Contract.objects.filter(id=c.id).update(status='executed')
+		reconcile_status_counters(self.tenant_id)
+		self.assertEqual(get_status_counts(self.tenant_id), {'draft': 0, 'executed': 1})
+
+
+class CopyOnWriteContentTests(TestCase):
+	def setUp(self):
+		import uuid
+		self.tenant_id = uuid.uuid4()
+		self.user_id = uuid.uuid4()
+
+	def _contract(self):
+		return Contract.objects.create(tenant_id=self.tenant_id, title='C', status='draft', created_by=self.user_id)
+
+	def test_clones_share_content_until_first_write(self):
+		source, clone = self._contract(), self._contract()
+		store_content(source.id, self.tenant_id, rendered_text='v1', rendered_html='<p>v1</p>', raw_text='raw')
+		self.assertTrue(share_content(source.id, clone.id, self.tenant_id))
+		self.assertEqual(ContractContentSnapshot.objects.count(), 1)
+		self.assertEqual(get_stored_content(clone.id), get_stored_content(source.id))
+
+		store_content(clone.id, self.tenant_id, rendered_text='v2')
+		self.assertEqual(get_stored_content(clone.id), {'rendered_text': 'v2', 'rendered_html': '<p>v1</p>', 'raw_text': 'raw'})
+		self.assertEqual(get_stored_content(source.id)['rendered_text'], 'v1')
+
+		store_content(source.id, self.tenant_id, rendered_text='v3')
+		self.assertEqual(get_stored_content(source.id)['rendered_html'], '<p>v1</p>')
+		self.assertFalse(ContractContentSnapshot.objects.exists())
+
+	def test_source_without_content(self):
+		self.assertFalse(share_content(self._contract().id, self._contract().id, self.tenant_id))
+
+	def test_plain_text_is_derived_on_write_and_shared(self):
+		source, clone = self._contract(), self._contract()
+		store_content(source.id, self.tenant_id, rendered_text='', rendered_html='<p>Hello</p><p>World</p>')
+		stored = get_stored_plain_text(source.id)
+		self.assertEqual(stored['text'], 'Hello\nWorld')
+		self.assertEqual(stored['sha256'], hashlib.sha256(b'Hello\nWorld').hexdigest())
+
+		share_content(source.id, clone.id, self.tenant_id)
+		self.assertEqual(get_stored_plain_text(clone.id), stored)
+		# A text-only write takes precedence over the stored html.
+		store_content(clone.id, self.tenant_id, rendered_text='Edited')
+		self.assertEqual(get_stored_plain_text(clone.id)['text'], 'Edited')
+		self.assertEqual(get_stored_plain_text(source.id), stored)
+
+
+class R2TombstoneTests(TestCase):
+	def _purge(self, errors=None):
+		with mock.patch('contracts.r2_cleanup.R2StorageService') as service:
+			service.return_value.delete_objects.return_value = errors or {}
+			service.return_value.list_objects_page.return_value = ([], False)
+			result = purge_tombstones()
+		return result, service.return_value
+
+	def test_keys_are_deleted_in_one_batch(self):
+		tombstone_keys(['a', 'b', 'a', ''], prefixes=['t/contracts/1/'])
+		result, r2 = self._purge()
+		self.assertEqual(result['deleted'], 3)
+		r2.delete_objects.assert_called_once_with(['a', 'b'])
+		self.assertFalse(R2Tombstone.objects.exists())
+
+	def test_failed_keys_back_off(self):
+		tombstone_keys(['a', 'b'])
+		result, _ = self._purge(errors={'b': 'InternalError: retry'})
+		self.assertEqual((result['deleted'], result['failed']), (1, 1))
+		row = R2Tombstone.objects.get()
+		self.assertEqual((row.key, row.attempts), ('b', 1))
+		self.assertIn('InternalError', row.last_error)
+		self.assertLess(row.attempts, MAX_ATTEMPTS)
+
+	def test_prefix_listing_pages_past_live_objects(self):
+		tombstone_keys(prefixes=['t/contracts/1/'])
+		with mock.patch('contracts.r2_cleanup.R2StorageService') as service, \
+				mock.patch('contracts.r2_cleanup._live_keys', side_effect=lambda keys: set(keys)):
+			r2 = service.return_value
+			r2.list_objects_page.return_value = ([{'key': 't/contracts/1/a'}, {'key': 't/contracts/1/b'}], True)
+			result = purge_tombstones()
+			# A page of nothing but live objects still moves the listing on.
+			row = R2Tombstone.objects.get()
+			self.assertEqual(row.list_after, 't/contracts/1/b')
+			self.assertTrue(result['more'])
+			r2.delete_objects.assert_not_called()
+
+			r2.list_objects_page.return_value = ([{'key': 't/contracts/1/c'}], False)
+			with mock.patch('contracts.r2_cleanup._live_keys', return_value=set()):
+				purge_tombstones()
+			r2.list_objects_page.assert_called_with('t/contracts/1/', 1000, start_after='t/contracts/1/b')
+			r2.delete_objects.assert_called_once_with(['t/contracts/1/c'])
+		self.assertFalse(R2Tombstone.objects.exists())
+
+
+class CompiledRuleTests(SimpleTestCase):
+	def _rule(self, rule_type, conditions, action, contract_types=()):
+		return CompiledRule(BusinessRule(
+			name='R', description='d', rule_type=rule_type, conditions=conditions,
+			action=action, contract_types=list(contract_types),
+		))
+
+	def test_condition_operators(self):
+		high_msa = compile_condition({'contract_value__gte': 100, 'contract_type': 'MSA'})
+		self.assertTrue(high_msa({'contract_value': 100, 'contract_type': 'MSA'}))
+		self.assertFalse(high_msa({'contract_value': 99, 'contract_type': 'MSA'}))
+		self.assertFalse(high_msa({'contract_type': 'MSA'}))
+		self.assertTrue(compile_condition({'region__in': ['EU', 'UK']})({'region': 'EU'}))
+		self.assertTrue(compile_condition({'counterparty__contains': 'Acme'})({'counterparty': 'Acme Corp'}))
+		self.assertTrue(compile_condition({})({}))
+
+	def test_rule_set_by_contract_type(self):
+		rules = [
+			self._rule('mandatory_clause', {}, {'clause_id': 'CONF-001'}, ['NDA']),
+			self._rule('mandatory_clause', {'contract_value__gt': 10}, {'clause_id': 'LIAB-001'}),
+			self._rule('clause_suggestion', {}, {'target_clause_id': 'LIAB-001', 'suggest_clause_id': 'LIAB-002'}, ['NDA']),
+		]
+		msa = RuleSet(rules, 'MSA')
+		self.assertEqual([r.action['clause_id'] for r in msa.matching('mandatory_clause', {'contract_value': 50})], ['LIAB-001'])
+		# Suggestion rules are not limited by contract type.
+		self.assertEqual(len(msa.matching_suggestions('LIAB-001', {})), 1)
+
+	def test_bulk_clause_suggestions(self):
+		rule_set = RuleSet([
+			self._rule('clause_suggestion', {'contract_value__gte': 100}, {'target_clause_id': 'LIAB-001', 'suggest_clause_id': 'LIAB-002'}),
+		], 'MSA')
+		clause = Clause(clause_id='LIAB-001', alternatives=[
+			{'clause_id': 'LIAB-003', 'trigger_rules': {'counterparty': 'Acme'}},
+		])
+		with mock.patch('contracts.services.get_rule_set', return_value=rule_set):
+			low, high = RuleEngine.bulk_clause_suggestions(None, [
+				('MSA', {'contract_value': 10, 'counterparty': 'Acme'}, [clause]),
+				('MSA', {'contract_value': 500, 'counterparty': 'Globex'}, [clause]),
+			])
+		self.assertEqual([(s['clause_id'], s['source']) for s in low], [('LIAB-003', 'predefined')])
+		self.assertEqual([(s['clause_id'], s['source']) for s in high], [('LIAB-002', 'rule_based')])
+
+
+class RuleCacheTests(TestCase):
+	def test_rules_are_cached_until_changed(self):
+		import uuid
+		tenant_id = uuid.uuid4()
+		get_rule_set(tenant_id, 'MSA')
+		with self.assertNumQueries(0):
+			self.assertEqual(get_rule_set(tenant_id, 'NDA').matching('validation', {}), [])
+
+		with self.captureOnCommitCallbacks(execute=True):
+			BusinessRule.objects.create(
+				tenant_id=tenant_id, name='R', description='d', rule_type='validation',
+				conditions={}, action={'type': 'error', 'message': 'no'}, created_by=tenant_id,
+			)
+		self.assertEqual(len(get_rule_set(tenant_id, 'MSA').matching('validation', {})), 1)
+
+	def test_untyped_contracts_share_the_cache_safely(self):
+		import uuid
+		tenant_id = uuid.uuid4()
+		BusinessRule.objects.create(
+			tenant_id=tenant_id, name='R', description='d', rule_type='validation',
+			conditions={}, action={'type': 'error', 'message': 'no'}, created_by=tenant_id,
+		)
+		# contract_type is nullable; either lookup order must keep working.
+		self.assertEqual(len(get_rule_set(tenant_id, None).matching('validation', {})), 1)
+		self.assertEqual(len(get_rule_set(tenant_id, 'NDA').matching('validation', {})), 1)
+		self.assertEqual(len(get_rule_set(tenant_id, None).matching('validation', {})), 1)
+
+
+class ClauseProvenanceTests(TestCase):
+	def test_provenance_is_written_with_constant_queries(self):
+		import uuid
+		tenant_id, user_id = uuid.uuid4(), uuid.uuid4()
+		contract = Contract.objects.create(tenant_id=tenant_id, title='C', contract_type='MSA', status='draft', created_by=user_id)
+		version = ContractVersion.objects.create(
+			contract=contract, version_number=1, r2_key='k', template_id=tenant_id, template_version=1, created_by=user_id,
+		)
+		Clause.objects.bulk_create([
+			Clause(tenant_id=tenant_id, clause_id=f'C-{i:03d}', name=f'Clause {i}', contract_type='MSA', content='...',
+				created_by=user_id, alternatives=[{'clause_id': f'ALT-{i:03d}'}])
+			for i in range(40)
+		])
+
+		generator = ContractGenerator(user_id, tenant_id)
+		# Clause IN query, the tenant's rules, one bulk INSERT.
+		with self.assertNumQueries(3):
+			generator._store_clause_provenance(version, [f'C-{i:03d}' for i in range(40)], {'contract_type': 'MSA'})
+
+		rows = list(ContractClause.objects.filter(contract_version=version).order_by('position'))
+		self.assertEqual(len(rows), 40)
+		self.assertEqual((rows[0].position, rows[0].clause_id), (1, 'C-000'))
+		self.assertEqual(rows[-1].alternatives_suggested[0]['clause_id'], 'ALT-039')
+
+
+class PreviewCacheTests(SimpleTestCase):
+	def setUp(self):
+		preview_cache.clear_previews()
+		self.addCleanup(preview_cache.clear_previews)
+		self.template = ContractEditingTemplate(id=uuid.uuid4(), name='NDA')
+
+	def _key(self, form_data, clause_ids, constraints=None, **kwargs):
+		kwargs.setdefault('clauses_fingerprint', '2:x')
+		kwargs.setdefault('day', '2026-01-01')
+		return preview_key(self.template, form_data, clause_ids, constraints, 'tenant', **kwargs)
+
+	def test_key_ignores_ordering(self):
+		self.assertEqual(
+			self._key({'a': 1, 'b': 2}, ['C2', 'C1', 'C1'], {'x': 'y'}),
+			self._key({'b': 2, 'a': 1}, ['C1', 'C2'], {'x': 'y'}),
+		)
+
+	def test_key_changes_with_inputs(self):
+		base = self._key({'a': 1}, ['C1'])
+		self.assertNotEqual(base, self._key({'a': 2}, ['C1']))
+		self.assertNotEqual(base, self._key({'a': 1}, ['C1', 'C2']))
+		self.assertNotEqual(base, self._key({'a': 1}, ['C1'], {'x': 'y'}))
+		self.assertNotEqual(base, self._key({'a': 1}, ['C1'], clauses_fingerprint='2:y'))
+		self.assertNotEqual(base, self._key({'a': 1}, ['C1'], day='2026-01-02'))
+
+	def test_lru_eviction(self):
+		with mock.patch.object(preview_cache, 'PREVIEW_CACHE_SIZE', 2):
+			put_preview('a', '<p>a</p>', 'a')
+			put_preview('b', '<p>b</p>', 'b')
+			self.assertIsNotNone(get_preview('a'))
+			put_preview('c', '<p>c</p>', 'c')
+		self.assertEqual(get_preview('a'), ('<p>a</p>', 'a'))
+		self.assertIsNone(get_preview('b'))
+		self.assertIsNotNone(get_preview('c'))
+
+	def test_size_cap(self):
+		with mock.patch.object(preview_cache, 'PREVIEW_CACHE_MAX_CHARS', 10):
+			put_preview('a', 'xxxx', 'x')
+			put_preview('b', 'yyyyy', 'y')
+			self.assertIsNone(get_preview('a'))
+			put_preview('big', 'z' * 20, '')
+			self.assertIsNone(get_preview('big'))
+			self.assertIsNotNone(get_preview('b'))
+
+
+class ClauseEmbeddingStalenessTests(SimpleTestCase):
+	def _clause(self, **kwargs):
+		defaults = {'name': 'Confidentiality', 'content': 'Each party shall keep...', 'status': 'published'}
+		defaults.update(kwargs)
+		return Clause(**defaults)
+
+	def test_published_clause_without_embedding_needs_one(self):
+		self.assertTrue(needs_embedding(self._clause()))
+
+	def test_unchanged_text_is_not_re_embedded(self):
+		clause = self._clause(embedding=[0.1] * 1024)
+		clause.embedding_sha256 = clause_embedding_sha256(clause)
+		self.assertFalse(needs_embedding(clause))
+
+	def test_edited_text_is_re_embedded(self):
+		clause = self._clause(embedding=[0.1] * 1024)
+		clause.embedding_sha256 = clause_embedding_sha256(clause)
+		clause.content = 'Each party shall keep confidential for 5 years...'
+		self.assertTrue(needs_embedding(clause))
+
+	def test_draft_clause_is_skipped(self):
+		self.assertFalse(needs_embedding(self._clause(status='draft')))
+
+	def test_embedding_is_not_exposed_by_the_api(self):
+		fields = ClauseSerializer().fields
+		self.assertNotIn('embedding', fields)
+		self.assertNotIn('embedding_sha256', fields)
+		self.assertIn('content', fields)
+
+
+class EditorFlushTests(SimpleTestCase):
+	def _state(self):
+		contract = Contract(id=uuid.uuid4(), tenant_id=uuid.uuid4(), title='T')
+		return {
+			'contract': contract, 'md': {'editor_revision': 3, 'editor_pending_flush': True},
+			'row_revision': 3, 'revision': 3, 'flushed_revision': 2,
+			'rendered_text': 'x', 'rendered_html': '<p>x</p>',
+			'checkpoint_md': {}, 'checkpoint_content': {'rendered_text': 'x', 'rendered_html': '<p>x</p>'},
+		}
+
+	def _write(self, committed):
+		from contracts import editor_autosave
+		with mock.patch.object(editor_autosave, 'R2StorageService') as r2, \
+				mock.patch.object(editor_autosave, '_commit_checkpoint', return_value=committed) as commit, \
+				mock.patch.object(editor_autosave, '_request_reflush') as reflush, \
+				mock.patch('search.services.SearchIndexingService'):
+			result = editor_autosave._write_flush(self._state())
+		return result, r2, commit, reflush
+
+	def test_checkpoint_applies_when_revision_unchanged(self):
+		result, r2, commit, reflush = self._write(committed=True)
+		self.assertTrue(result)
+		r2.return_value.put_text.assert_called_once()
+		commit.assert_called_once()
+		reflush.assert_not_called()
+
+	def test_superseded_flush_requests_another(self):
+		# Its older snapshot may have landed in R2 after the newer one.
+		result, _, _, reflush = self._write(committed=False)
+		self.assertFalse(result)
+		reflush.assert_called_once()
+
+
+class EditorCheckpointTests(TestCase):
+	def setUp(self):
+		self.tenant_id = uuid.uuid4()
+		self.contract = Contract.objects.create(
+			tenant_id=self.tenant_id, title='C', status='draft', created_by=uuid.uuid4(),
+			metadata={'editor_revision': 1, 'editor_flushed_revision': 1},
+		)
+		store_content(self.contract.id, self.tenant_id, rendered_text='Hello', rendered_html='')
+		self._op(1, 'full', [])
+		self._op(2, 'delta', [{'field': 'text', 'pos': 5, 'insert': ' world'}])
+
+	def _op(self, revision, kind, ops):
+		ContractEditorOp.objects.create(
+			contract_id=self.contract.id, tenant_id=self.tenant_id, revision=revision, kind=kind, ops=ops,
+			result_sha256='',
+		)
+
+	def _flush(self):
+		from contracts import editor_autosave
+		with mock.patch.object(editor_autosave, 'R2StorageService'), \
+				mock.patch('search.services.SearchIndexingService'):
+			return editor_autosave.flush_editor_snapshot(self.contract.id)
+
+	def test_flush_checkpoints_deltas_into_content(self):
+		self.assertTrue(self._flush())
+		md = Contract.objects.get(id=self.contract.id).metadata
+		self.assertEqual((md['editor_revision'], md['editor_flushed_revision']), (2, 2))
+		self.assertEqual(get_stored_content(self.contract.id)['rendered_text'], 'Hello world')
+		self.assertEqual(
+			list(ContractEditorOp.objects.filter(contract_id=self.contract.id).values_list('revision', flat=True)), [2],
+		)
+
+	def test_failed_content_write_leaves_the_row_untouched(self):
+		# The revision bump, content write and op-log trim commit together.
+		from contracts import editor_autosave
+		with mock.patch.object(editor_autosave, 'store_content', side_effect=RuntimeError('boom')):
+			with self.assertRaises(RuntimeError):
+				self._flush()
+		self.assertEqual(Contract.objects.get(id=self.contract.id).metadata['editor_revision'], 1)
+		self.assertEqual(get_stored_content(self.contract.id)['rendered_text'], 'Hello')
+		self.assertEqual(ContractEditorOp.objects.filter(contract_id=self.contract.id).count(), 2)
+
+
+class EditorDeltaOpsTests(SimpleTestCase):
+	def test_ops_apply_in_order(self):
+		text, html = apply_ops('Hello world', '<p>Hello world</p>', [
+			{'field': 'text', 'pos': 6, 'delete': 5, 'insert': 'Buyer'},
+			{'field': 'text', 'pos': 0, 'insert': '> '},
+			{'field': 'html', 'pos': 9, 'delete': 5, 'insert': 'Buyer'},
+		])
+		self.assertEqual(text, '> Hello Buyer')
+		self.assertEqual(html, '<p>Hello Buyer</p>')
+
+	def test_positions_are_utf16_code_units(self):
+		# The emoji is two UTF-16 code units, as in a JavaScript string.
+		text, _ = apply_ops('a\U0001F600b', '', [{'field': 'text', 'pos': 3, 'delete': 1, 'insert': 'c'}])
+		self.assertEqual(text, 'a\U0001F600c')
+
+	def test_html_only_ops_rederive_text(self):
+		text, html = apply_ops('old', '<p>Hi</p>', [{'field': 'html', 'pos': 5, 'insert': ' there'}])
+		self.assertEqual(html, '<p>Hi there</p>')
+		self.assertEqual(text, 'Hi there')
+
+	def test_out_of_range_op_is_rejected(self):
+		with self.assertRaises(DeltaError):
+			apply_ops('abc', '', [{'field': 'text', 'pos': 2, 'delete': 5}])
+
+	def test_splitting_a_surrogate_pair_is_rejected(self):
+		with self.assertRaises(DeltaError):
+			apply_ops('\U0001F600', '', [{'field': 'text', 'pos': 1, 'insert': 'x'}])
+
+
+class ContentStoreSplitTests(SimpleTestCase):
+	def test_content_keys_are_moved_out_of_metadata(self):
+		md = {'rendered_text': 'T', 'rendered_html': '<p>T</p>', 'rendered_text_truncated': True, 'editor_revision': 3}
+		rest, content = split_content(md)
+		self.assertEqual(rest, {'editor_revision': 3})
+		self.assertEqual(content, {'rendered_text': 'T', 'rendered_html': '<p>T</p>'})
+		# The caller's dict is left alone.
+		self.assertIn('rendered_text', md)
+
+	def test_plain_text_prefers_rendered_text(self):
+		self.assertEqual(plain_text_of('Body', '<p>Other</p>'), 'Body')
+		self.assertEqual(plain_text_of('  ', '<h1>Title</h1>A<br>B &amp; C'), 'Title\nA\nB & C')
+		self.assertEqual(plain_text_of(None, None), '')
+
+	def test_non_string_content_is_normalized(self):
+		_, content = split_content({'raw_text': None})
+		self.assertEqual(content, {'raw_text': ''})
+		self.assertEqual(split_content(None), ({}, {}))
+
+
+class _VersionedView(ConditionalGetMixin, APIView):
+	permission_classes = [AllowAny]
+	action = 'retrieve'
+	version = 1
+	handled = 0
+
+	def get_etag_source(self):
+		return (type(self).version,)
+
+	def get(self, request):
+		type(self).handled += 1
+		return Response({'version': type(self).version})
+
+
+class ConditionalGetTests(SimpleTestCase):
+	def setUp(self):
+		self.factory = APIRequestFactory()
+		_VersionedView.version = 1
+		_VersionedView.handled = 0
+
+	def _get(self, **headers):
+		return _VersionedView.as_view()(self.factory.get('/x/', **headers))
+
+	def test_if_none_match_list_and_weak_forms(self):
+		etag = make_etag('a', 1)
+		self.assertTrue(etag_matches(f'"other", {etag}', etag))
+		self.assertTrue(etag_matches(f'W/{etag}', etag))
+		self.assertTrue(etag_matches('*', etag))
+		self.assertFalse(etag_matches('"other"', etag))
+		self.assertFalse(etag_matches(None, etag))
+
+	def test_matching_etag_returns_304_without_running_handler(self):
+		first = self._get()
+		self.assertEqual(first.status_code, 200)
+		etag = first['ETag']
+
+		again = self._get(HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(again.status_code, 304)
+		self.assertEqual(again['ETag'], etag)
+		self.assertEqual(_VersionedView.handled, 1)
+
+	def test_changed_source_returns_new_representation(self):
+		etag = self._get()['ETag']
+		_VersionedView.version = 2
+
+		res = self._get(HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, 200)
+		self.assertNotEqual(res['ETag'], etag)
+
+
+class ByteRangeResponseTests(SimpleTestCase):
+	data = bytes(range(100))
+	etag = '"abc"'
+
+	def _get(self, **headers):
+		request = RequestFactory().get('/x.pdf', **headers)
+		return byte_range_response(request, self.data, etag=self.etag, content_type='application/pdf')
+
+	def test_full_body_advertises_ranges(self):
+		res = self._get()
+		self.assertEqual(res.status_code, 200)
+		self.assertEqual(res['Accept-Ranges'], 'bytes')
+		self.assertEqual(res['ETag'], self.etag)
+		self.assertEqual(res.content, self.data)
+
+	def test_ranges(self):
+		res = self._get(HTTP_RANGE='bytes=10-19')
+		self.assertEqual(res.status_code, 206)
+		self.assertEqual(res['Content-Range'], 'bytes 10-19/100')
+		self.assertEqual(res.content, self.data[10:20])
+
+		self.assertEqual(self._get(HTTP_RANGE='bytes=90-').content, self.data[90:])
+		self.assertEqual(self._get(HTTP_RANGE='bytes=-5').content, self.data[95:])
+		self.assertEqual(self._get(HTTP_RANGE='bytes=95-500')['Content-Range'], 'bytes 95-99/100')
+
+	def test_unsatisfiable_and_ignored_ranges(self):
+		res = self._get(HTTP_RANGE='bytes=200-300')
+		self.assertEqual(res.status_code, 416)
+		self.assertEqual(res['Content-Range'], 'bytes */100')
+		self.assertEqual(self._get(HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+		self.assertEqual(self._get(HTTP_RANGE='bytes=0-10', HTTP_IF_RANGE='"old"').status_code, 200)
+
+	def test_if_none_match_returns_304(self):
+		self.assertEqual(self._get(HTTP_IF_NONE_MATCH=self.etag, HTTP_RANGE='bytes=0-1').status_code, 304)
+
+
+class StreamingDownloadTests(SimpleTestCase):
+	data = bytes(range(256)) * 40
+
+	def setUp(self):
+		tmp = tempfile.NamedTemporaryFile(delete=False)
+		tmp.write(self.data)
+		tmp.close()
+		self.path = tmp.name
+		self.addCleanup(os.remove, self.path)
+
+	def _file(self, **headers):
+		request = RequestFactory().get('/x.pdf', **headers)
+		return streaming_range_response(
+			request, size=len(self.data), chunks=file_range_chunks(self.path, chunk_size=1000),
+			etag='"f"', content_type='application/pdf',
+		)
+
+	def test_file_is_streamed_in_chunks(self):
+		res = self._file()
+		self.assertEqual(res.status_code, 200)
+		self.assertTrue(res.streaming)
+		chunks = list(res.streaming_content)
+		self.assertEqual(len(chunks), 11)
+		self.assertEqual(b''.join(chunks), self.data)
+		self.assertEqual(res['Content-Length'], str(len(self.data)))
+
+	def test_file_ranges(self):
+		res = self._file(HTTP_RANGE='bytes=999-2500')
+		self.assertEqual(res.status_code, 206)
+		self.assertEqual(b''.join(res.streaming_content), self.data[999:2501])
+		self.assertEqual(self._file(HTTP_RANGE='bytes=20000-30000').status_code, 416)
+		self.assertEqual(self._file(HTTP_IF_NONE_MATCH='"f"').status_code, 304)
+
+	def _r2(self, size=10):
+		r2 = mock.Mock()
+		r2.stat_file.return_value = {'size': size, 'etag': 'e1', 'content_type': 'application/pdf'} if size is not None else None
+		r2.iter_file.side_effect = lambda key, start, end: iter([b'0123456789'[start or 0:(9 if end is None else end) + 1]])
+		r2.generate_presigned_url.return_value = 'https://r2.example/signed'
+		return r2
+
+	def test_r2_object_is_streamed_with_range(self):
+		r2 = self._r2()
+		with self.settings(R2_DOWNLOAD_REDIRECT=False):
+			res = r2_file_response(RequestFactory().get('/x', HTTP_RANGE='bytes=2-4'), r2, 'k', filename='a.pdf')
+		self.assertEqual(res.status_code, 206)
+		self.assertEqual(b''.join(res.streaming_content), b'234')
+		r2.iter_file.assert_called_once_with('k', 2, 4)
+		r2.get_file_bytes.assert_not_called()
+
+	def test_r2_missing_object_and_redirect(self):
+		for redirect in (False, True):
+			with self.settings(R2_DOWNLOAD_REDIRECT=redirect):
+				r2 = self._r2(size=None)
+				self.assertIsNone(r2_file_response(RequestFactory().get('/x'), r2, 'k'))
+				r2.generate_presigned_url.assert_not_called()
+
+		r2 = self._r2()
+		with self.settings(R2_DOWNLOAD_REDIRECT=True, R2_DOWNLOAD_REDIRECT_EXPIRY_SECONDS=60):
+			res = r2_file_response(RequestFactory().get('/x'), r2, 'k', filename='a.pdf')
+		self.assertEqual(res.status_code, 302)
+		self.assertEqual(res['Location'], 'https://r2.example/signed')
+		self.assertEqual(r2.generate_presigned_url.call_args.kwargs['expiration'], 60)
+		r2.iter_file.assert_not_called()
+
+
+class PdfRenderCacheTests(SimpleTestCase):
+	def test_rendering_is_deterministic_per_key(self):
+		self.assertEqual(render_text_pdf('Clause 1\nClause 2'), render_text_pdf('Clause 1\nClause 2'))
+		self.assertNotEqual(pdf_cache_key('a'), pdf_cache_key('b'))
+
+	def test_r2_copy_is_deleted_with_its_contract(self):
+		key = pdf_cache_r2_key('t1', 'c1', pdf_cache_key('a'))
+		self.assertTrue(key.startswith('t1/contracts/c1/'))
+
+	def test_download_streams_the_cached_file(self):
+		with tempfile.TemporaryDirectory() as directory, self.settings(PDF_RENDER_CACHE_DIR=directory):
+			res = pdf_file_response(RequestFactory().get('/x.pdf'), 'Clause 1', filename='c.pdf')
+			self.assertTrue(res.streaming)
+			self.assertEqual(res['ETag'], pdf_etag(pdf_cache_key('Clause 1')))
+			self.assertEqual(b''.join(res.streaming_content), render_text_pdf('Clause 1'))
+			self.assertTrue(os.path.exists(os.path.join(directory, f"{pdf_cache_key('Clause 1')}.pdf")))
+
+
+class PaginationModeTests(SimpleTestCase):
+	def _view(self, query=''):
+		view = type('_ListView', (PaginationModeMixin, GenericAPIView), {'pagination_class': PageNumberPagination})()
+		view.request = GenericAPIView().initialize_request(APIRequestFactory().get(f'/x/{query}'))
+		return view
+
+	def test_mode_selects_paginator(self):
+		self.assertIs(type(self._view().paginator), PageNumberPagination)
+		self.assertIs(type(self._view('?pagination=cursor').paginator), CreatedAtCursorPagination)
+		self.assertIs(type(self._view('?pagination=estimated').paginator), EstimatedCountPagination)
+		self.assertIs(type(self._view('?pagination=bogus').paginator), PageNumberPagination)
+
+	def test_opt_in_only_paginates_when_requested(self):
+		self.assertIsNone(self._view().paginate_opt_in([1, 2, 3]))
+
+	def test_cursor_orders_by_created_at_then_id(self):
+		self.assertEqual(CreatedAtCursorPagination.ordering, ('-created_at', '-id'))
+
+	def test_estimated_paginator_counts_plain_sequences_exactly(self):
+		paginator = EstimatedCountPaginator(list(range(7)), 5)
+		self.assertEqual(paginator.count, 7)
+		self.assertFalse(paginator.count_is_estimate)
+
+
+class TemplateEngineTests(SimpleTestCase):
+	def test_single_pass_render(self):
+		text = 'Between {{ party_a }} and {{party_b}}; {{ party_a }} agrees. {{ unknown }}'
+		self.assertEqual(
+			render_template(text, {'party_a': 'Acme', 'party_b': None}),
+			'Between Acme and ; Acme agrees. {{ unknown }}',
+		)
+
+	def test_values_are_not_rescanned(self):
+		self.assertEqual(render_template('{{a}} {{b}}', {'a': '{{b}}', 'b': 'x'}), '{{b}} x')
+
+	def test_compiled_template_is_cached_by_content(self):
+		self.assertIs(compile_template('Hello {{ name }}'), compile_template('Hello {{ name }}'))
+		self.assertEqual(compile_template('Hello {{ name }}').placeholders, ('name',))
+
+	def test_extract_placeholders_and_slots(self):
+		self.assertEqual(extract_placeholders('{{ b }} {{a}} {{ b }} {{ not valid! }}'), ['a', 'b'])
+		self.assertEqual(fill_first_slot('x {{ clauses }} {{constraints}}', ('clauses_section', 'clauses'), 'C'), 'x C {{constraints}}')
+		self.assertIsNone(fill_first_slot('no slots', ('clauses',), 'C'))
+
+
+class BulkGenerationInputTests(SimpleTestCase):
+	def test_csv_rows_are_trimmed_and_blank_lines_dropped(self):
+		rows = parse_rows(csv_text='\ufeffcounterparty, value\n Acme , 1000\n,\nGlobex,2500\n')
+		self.assertEqual(rows, [{'counterparty': 'Acme', 'value': '1000'}, {'counterparty': 'Globex', 'value': '2500'}])
+
+	def test_json_rows_must_be_objects(self):
+		self.assertEqual(parse_rows(rows=[{'counterparty': 'Acme'}]), [{'counterparty': 'Acme'}])
+		with self.assertRaises(BulkInputError):
+			parse_rows(rows=['Acme'])
+		with self.assertRaises(BulkInputError):
+			parse_rows(rows=[])
+
+	def test_row_limit(self):
+		with self.settings(BULK_GENERATION_MAX_ROWS=2):
+			with self.assertRaises(BulkInputError):
+				parse_rows(rows=[{'n': i} for i in range(3)])
+
+
+class BulkGenerationChunkTaskTests(SimpleTestCase):
+	def test_failed_chunk_is_retried_with_its_index(self):
+		from contracts.tasks import bulk_generation_chunk_task
+		job_id = str(uuid.uuid4())
+		with mock.patch('contracts.bulk_generation.claim_next_chunk', return_value=3), \
+				mock.patch('contracts.bulk_generation.process_chunk', side_effect=[RuntimeError('R2 hiccup'), (50, 0)]) as process, \
+				mock.patch('contracts.bulk_generation.fail_chunk') as fail, \
+				mock.patch.object(bulk_generation_chunk_task, 'delay') as successor:
+			bulk_generation_chunk_task.apply(args=[job_id])
+		self.assertEqual(process.call_args_list, [mock.call(job_id, 3), mock.call(job_id, 3)])
+		fail.assert_not_called()
+		successor.assert_called_once_with(job_id)
+
+
+class BulkGenerationWatchdogTests(TestCase):
+	def _stalled_job(self, **fields):
+		from datetime import timedelta
+		from django.utils import timezone
+		job = BulkGenerationJob.objects.create(
+			tenant_id=uuid.uuid4(), created_by=uuid.uuid4(), status='processing', total_rows=150, chunk_size=50,
+			total_chunks=3, next_chunk=2, chunks_done=1, recorded_chunks=[0], **fields,
+		)
+		BulkGenerationJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(hours=2))
+		return job
+
+	def _recover(self):
+		from contracts.tasks import bulk_generation_chunk_task
+		with mock.patch.object(bulk_generation_chunk_task, 'delay') as delay, \
+				self.captureOnCommitCallbacks(execute=True):
+			self.assertEqual(recover_stalled_jobs(), 1)
+		return delay
+
+	def test_lost_chunk_is_requeued(self):
+		job = self._stalled_job()
+		delay = self._recover()
+		delay.assert_called_once_with(str(job.id), index=1)
+		job.refresh_from_db()
+		self.assertEqual(job.stall_requeues, 1)
+		# Progress was just recorded, so the next run leaves it alone.
+		self.assertEqual(recover_stalled_jobs(), 0)
+
+	def test_chunk_lost_again_is_failed(self):
+		job = self._stalled_job(stall_requeues=MAX_STALL_REQUEUES)
+		delay = self._recover()
+		delay.assert_not_called()
+		job.refresh_from_db()
+		self.assertEqual((job.chunks_done, job.failed, job.recorded_chunks), (2, 50, [0, 1]))
+
+		# A late duplicate of the failed chunk is not counted twice.
+		with self.assertRaises(ChunkAlreadyRecorded):
+			process_chunk(job.id, 1)
+
+
+class VersionBlobGcTests(TestCase):
+	def test_reused_blob_is_not_collected(self):
+		from datetime import timedelta
+		from django.utils import timezone
+		tenant_id = uuid.uuid4()
+		with mock.patch('contracts.version_store.R2StorageService'):
+			blob = store_file(tenant_id, b'pdf bytes')
+		old = timezone.now() - timedelta(days=7)
+		VersionBlob.objects.filter(id=blob.id).update(created_at=old, last_used_at=old)
+
+		# An unreferenced but just-reused blob is about to be attached to a version.
+		with mock.patch('contracts.version_store.R2StorageService') as r2:
+			self.assertEqual(store_file(tenant_id, b'pdf bytes').id, blob.id)
+			r2.return_value.put_bytes.assert_not_called()
+		self.assertEqual(delete_unreferenced_blobs(tenant_id), 0)
+
+		VersionBlob.objects.filter(id=blob.id).update(last_used_at=old)
+		with self.captureOnCommitCallbacks():
+			self.assertEqual(delete_unreferenced_blobs(tenant_id), 1)
+
+
+class VersionDeltaTests(SimpleTestCase):
+	def test_delta_round_trip(self):
+		base = 'Parties\nTerm: 12 months\nPayment: net 30\nGoverning law\n'
+		text = 'Parties\nTerm: 24 months\nPayment: net 30\nGoverning law\nNotices\n'
+		ops = make_delta(base, text)
+		self.assertEqual(apply_delta(base, ops), text)
+		self.assertIn(['=', 1], ops)
+
+	def test_delta_without_trailing_newline(self):
+		self.assertEqual(apply_delta('a\nb', make_delta('a\nb', 'a\nc')), 'a\nc')
+		self.assertEqual(apply_delta('', make_delta('', 'new')), 'new')
+
+	def test_delta_against_wrong_base_is_rejected(self):
+		ops = make_delta('a\nb\nc\n', 'a\nc\n')
+		with self.assertRaises(VersionStoreError):
+			apply_delta('a\n', ops)
+		with self.assertRaises(VersionStoreError):
+			apply_delta('a\n', [['?', 1]])
+
+
+class VersionDiffTests(SimpleTestCase):
+	def test_edit_script_is_minimal(self):
+		ops = diff_sequences(list('ABCABBA'), list('CBABAC'))
+		self.assertEqual(sum(c for tag, c in ops if tag == '='), 4)
+
+	def test_hunks_are_labelled_with_clause(self):
+		a = '1. Term\nTwelve months.\n\n2. Payment\nNet 30.\nInvoices monthly.\n'
+		b = '1. Term\nTwelve months.\n\n2. Payment\nNet 45.\nInvoices monthly.\n'
+		diff = diff_texts(a, b)
+		self.assertEqual(diff['granularity'], 'line')
+		self.assertEqual(diff['stats']['deleted'], 1)
+		[hunk] = diff['hunks']
+		self.assertEqual(hunk['clause'], '2. Payment')
+		self.assertIn({'op': 'delete', 'text': 'Net 30.'}, hunk['lines'])
+		self.assertIn({'op': 'insert', 'text': 'Net 45.'}, hunk['lines'])
+
+	def test_identical_texts_have_no_hunks(self):
+		self.assertEqual(diff_texts('same\ntext', 'same\ntext')['hunks'], [])
+
+	def test_falls_back_to_paragraphs_when_over_budget(self):
+		a = '\n'.join(f'a{i}' for i in range(2000))
+		b = '\n'.join(f'b{i}' for i in range(2000))
+		diff = diff_texts(a, b, time_budget=0)
+		self.assertEqual(diff['granularity'], PARAGRAPH)
+		self.assertEqual((diff['stats']['deleted'], diff['stats']['inserted']), (1, 1))
+
+	def test_fallback_results_are_cached_briefly(self):
+		from contracts import version_diff
+		with mock.patch.object(version_diff, 'cache') as cache:
+			cache.get.return_value = None
+			with self.settings(VERSION_DIFF_TIME_BUDGET_SECONDS=0):
+				cached_diff('t', 'a', 'b', lambda: 'x\ny', lambda: 'x\nz')
+			self.assertEqual(cache.set.call_args[0][2], DEGRADED_DIFF_CACHE_TIMEOUT)
+			cached_diff('t', 'a', 'c', lambda: 'x\ny', lambda: 'x\nz')
+			self.assertEqual(cache.set.call_args[0][2], DIFF_CACHE_TIMEOUT)
+
+
+class StartupBenchmarkTests(SimpleTestCase):
+	def test_worker_startup_skips_lazy_dependencies(self):
+		out = StringIO()
+		call_command(
+			'startup_benchmark', app_labels=['contracts'], runs=1, json=True,
+			budget_ms=0, budget_rss_mb=0, worker_budget_ms=0, stdout=out,
+		)
+		result = json.loads(out.getvalue())
+		self.assertIn('contracts.views', result['apps']['contracts']['imported'])
+		self.assertEqual(result['worker']['lazy_loaded'], [])
+		self.assertEqual(result['failures'], [])
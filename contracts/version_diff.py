@@ -0,0 +1,326 @@
+"""
+Server-side diff between two contract version texts.
+
+The diff is computed with Myers' linear-space algorithm (middle snake,
+divide and conquer) over interned units. It starts with lines and falls
+back to paragraphs when the line diff misses the time budget, so a
+500-page agreement still answers promptly. If the paragraph diff also
+misses it, the changed middle section comes back as a single hunk. Every
+hunk is labelled with the clause heading it falls under. Results are
+cached by (text A hash, text B hash), because version texts never change.
+Fallback results depend on load at the time, so they are only cached
+briefly.
+"""
+from __future__ import annotations
+
+import re
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+DIFF_FORMAT_VERSION = 'v1'
+DIFF_CACHE_TIMEOUT = 24 * 60 * 60
+# Paragraph-level or non-minimal results were cut short by the time budget.
+DEGRADED_DIFF_CACHE_TIMEOUT = 5 * 60
+DEFAULT_TIME_BUDGET_SECONDS = 2.0
+# Share of the budget the line-level pass may use before falling back.
+LINE_PASS_SHARE = 0.6
+CONTEXT_UNITS = 3
+
+LINE = 'line'
+PARAGRAPH = 'paragraph'
+
+_PARAGRAPH_SPLIT_RE = re.compile(r'\n[ \t]*\n+')
+_HEADING_RE = re.compile(
+    r'^\s*(?:'
+    r'#{1,6}\s+\S'
+    r'|(?:article|section|clause|schedule|exhibit|annex)\s+[0-9ivxlc]+\b'
+    r'|\d+(?:\.\d+)*[.)]?\s+[A-Z]'
+    r')',
+    re.IGNORECASE,
+)
+
+
+class DiffBudgetExceeded(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Myers' O(ND) diff in linear space
+# ---------------------------------------------------------------------------
+
+def _bisect(a: list, b: list, deadline: float) -> Optional[tuple[int, int]]:
+    """
+    Split point (x, y) on a shortest edit path found by the middle snake,
+    or None when a and b have nothing in common.
+    """
+    n, m = len(a), len(b)
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    size = 2 * max_d + 2
+    vf = [-1] * size
+    vb = [-1] * size
+    vf[offset + 1] = 0
+    vb[offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    kf_start = kf_end = kb_start = kb_end = 0
+
+    for d in range(max_d):
+        if time.monotonic() > deadline:
+            raise DiffBudgetExceeded()
+
+        for k in range(-d + kf_start, d + 1 - kf_end, 2):
+            ko = offset + k
+            if k == -d or (k != d and vf[ko - 1] < vf[ko + 1]):
+                x = vf[ko + 1]
+            else:
+                x = vf[ko - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            vf[ko] = x
+            if x > n:
+                kf_end += 2
+            elif y > m:
+                kf_start += 2
+            elif front:
+                kbo = offset + delta - k
+                if 0 <= kbo < size and vb[kbo] != -1 and x >= n - vb[kbo]:
+                    return x, y
+
+        for k in range(-d + kb_start, d + 1 - kb_end, 2):
+            ko = offset + k
+            if k == -d or (k != d and vb[ko - 1] < vb[ko + 1]):
+                x = vb[ko + 1]
+            else:
+                x = vb[ko - 1] + 1
+            y = x - k
+            while x < n and y < m and a[n - x - 1] == b[m - y - 1]:
+                x += 1
+                y += 1
+            vb[ko] = x
+            if x > n:
+                kb_end += 2
+            elif y > m:
+                kb_start += 2
+            elif not front:
+                kfo = offset + delta - k
+                if 0 <= kfo < size and vf[kfo] != -1:
+                    xf = vf[kfo]
+                    if xf >= n - x:
+                        return xf, offset + xf - kfo
+    return None
+
+
+def _push(ops: list, tag: str, count: int) -> None:
+    if count <= 0:
+        return
+    if ops and ops[-1][0] == tag:
+        ops[-1][1] += count
+    else:
+        ops.append([tag, count])
+
+
+def _diff_into(ops: list, a: list, b: list, deadline: float) -> None:
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-suffix - 1] == b[-suffix - 1]:
+        suffix += 1
+    _push(ops, '=', prefix)
+    a_mid = a[prefix:len(a) - suffix]
+    b_mid = b[prefix:len(b) - suffix]
+
+    if not a_mid or not b_mid:
+        _push(ops, '-', len(a_mid))
+        _push(ops, '+', len(b_mid))
+    else:
+        split = _bisect(a_mid, b_mid, deadline)
+        if split is None:
+            _push(ops, '-', len(a_mid))
+            _push(ops, '+', len(b_mid))
+        else:
+            x, y = split
+            _diff_into(ops, a_mid[:x], b_mid[:y], deadline)
+            _diff_into(ops, a_mid[x:], b_mid[y:], deadline)
+    _push(ops, '=', suffix)
+
+
+def diff_sequences(a: list, b: list, deadline: Optional[float] = None) -> list:
+    """
+    Minimal edit script turning `a` into `b`, as `[tag, count]` runs with
+    tag '=', '-' or '+'. Raises DiffBudgetExceeded once `deadline`
+    (time.monotonic()) passes.
+    """
+    ops: list = []
+    _diff_into(ops, list(a), list(b), float('inf') if deadline is None else deadline)
+    return ops
+
+
+# ---------------------------------------------------------------------------
+# Units, clause headings and hunks
+# ---------------------------------------------------------------------------
+
+def split_units(text: str, granularity: str) -> list[str]:
+    text = (text or '').replace('\r\n', '\n')
+    if granularity == PARAGRAPH:
+        return [p for p in _PARAGRAPH_SPLIT_RE.split(text.strip('\n')) if p.strip()]
+    return text.split('\n') if text else []
+
+
+def _intern(a_units: list[str], b_units: list[str]) -> tuple[list[int], list[int]]:
+    ids: dict[str, int] = {}
+    a = [ids.setdefault(u, len(ids)) for u in a_units]
+    b = [ids.setdefault(u, len(ids)) for u in b_units]
+    return a, b
+
+
+def _headings(units: list[str]) -> list[Optional[str]]:
+    """Clause heading in effect at each unit (a heading unit is its own)."""
+    current = None
+    out = []
+    for unit in units:
+        first_line = unit.lstrip('\n').split('\n', 1)[0]
+        if len(first_line) <= 200 and _HEADING_RE.match(first_line):
+            current = first_line.strip().lstrip('#').strip()
+        out.append(current)
+    return out
+
+
+def build_hunks(a_units: list[str], b_units: list[str], ops: list, context: int = CONTEXT_UNITS) -> list[dict]:
+    """Unified-diff style hunks (1-based unit positions) with `context` units around each change."""
+    entries = []  # (tag, a_index, b_index)
+    ia = ib = 0
+    for tag, count in ops:
+        for _ in range(count):
+            entries.append((tag, ia, ib))
+            if tag != '+':
+                ia += 1
+            if tag != '-':
+                ib += 1
+
+    changed = [i for i, e in enumerate(entries) if e[0] != '=']
+    if not changed:
+        return []
+
+    groups = []
+    start, end = changed[0], changed[0]
+    for i in changed[1:]:
+        if i - end > 2 * context:
+            groups.append((start, end))
+            start = i
+        end = i
+    groups.append((start, end))
+
+    a_headings = _headings(a_units)
+    b_headings = _headings(b_units)
+    hunks = []
+    for first, last in groups:
+        lo = max(0, first - context)
+        hi = min(len(entries), last + context + 1)
+        lines = []
+        a_count = b_count = 0
+        for tag, i, j in entries[lo:hi]:
+            if tag == '=':
+                lines.append({'op': 'equal', 'text': b_units[j]})
+                a_count += 1
+                b_count += 1
+            elif tag == '-':
+                lines.append({'op': 'delete', 'text': a_units[i]})
+                a_count += 1
+            else:
+                lines.append({'op': 'insert', 'text': b_units[j]})
+                b_count += 1
+
+        tag, i, j = entries[first]
+        if tag == '-' or j >= len(b_units):
+            clause = a_headings[i] if i < len(a_headings) else None
+        else:
+            clause = b_headings[j]
+        _, a_lo, b_lo = entries[lo]
+        hunks.append({
+            'a_start': a_lo + 1,
+            'a_count': a_count,
+            'b_start': b_lo + 1,
+            'b_count': b_count,
+            'clause': clause,
+            'lines': lines,
+        })
+    return hunks
+
+
+def _coarse_ops(a: list, b: list) -> list:
+    """Common prefix/suffix around one replaced block; used when no pass fits the budget."""
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-suffix - 1] == b[-suffix - 1]:
+        suffix += 1
+    ops: list = []
+    _push(ops, '=', prefix)
+    _push(ops, '-', len(a) - prefix - suffix)
+    _push(ops, '+', len(b) - prefix - suffix)
+    _push(ops, '=', suffix)
+    return ops
+
+
+def diff_texts(a_text: str, b_text: str, time_budget: Optional[float] = None) -> dict:
+    """
+    Structured diff of two texts: line level if it fits `time_budget`
+    seconds, otherwise paragraph level. `minimal` is False when even that
+    ran out of time and the changed region is reported as one block.
+    """
+    if time_budget is None:
+        time_budget = float(getattr(settings, 'VERSION_DIFF_TIME_BUDGET_SECONDS', DEFAULT_TIME_BUDGET_SECONDS))
+    started = time.monotonic()
+    passes = ((LINE, started + time_budget * LINE_PASS_SHARE), (PARAGRAPH, started + time_budget))
+
+    for granularity, deadline in passes:
+        a_units = split_units(a_text, granularity)
+        b_units = split_units(b_text, granularity)
+        a, b = _intern(a_units, b_units)
+        try:
+            ops = diff_sequences(a, b, deadline)
+            minimal = True
+            break
+        except DiffBudgetExceeded:
+            continue
+    else:
+        ops = _coarse_ops(a, b)
+        minimal = False
+
+    return {
+        'granularity': granularity,
+        'minimal': minimal,
+        'stats': {
+            'deleted': sum(c for t, c in ops if t == '-'),
+            'inserted': sum(c for t, c in ops if t == '+'),
+            'unchanged': sum(c for t, c in ops if t == '='),
+        },
+        'hunks': build_hunks(a_units, b_units, ops),
+    }
+
+
+def cached_diff(tenant_id, a_sha256: str, b_sha256: str, load_a, load_b) -> dict:
+    """
+    diff_texts() cached under the pair of text hashes. `load_a` / `load_b`
+    are only called (to fetch the texts) on a cache miss.
+    """
+    key = f"version-diff:{DIFF_FORMAT_VERSION}:{tenant_id}:{a_sha256}:{b_sha256}"
+    result = cache.get(key)
+    if result is not None:
+        return result
+    result = diff_texts(load_a(), load_b())
+    degraded = result['granularity'] != LINE or not result['minimal']
+    cache.set(key, result, DEGRADED_DIFF_CACHE_TIMEOUT if degraded else DIFF_CACHE_TIMEOUT)
+    return result
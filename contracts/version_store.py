@@ -0,0 +1,283 @@
+"""
+Content-addressed, delta-compressed storage for contract versions.
+
+Version payloads are `VersionBlob` rows keyed by (tenant, sha256), so a
+re-uploaded document or an unchanged text snapshot is stored once however
+many versions or contracts point at it.
+
+- Files go to R2 as-is under `{tenant}/version-blobs/{sha256}`.
+- Text snapshots are either keyframes (gzip in R2) or line deltas against
+  the contract's latest keyframe, stored inline. A new keyframe is written
+  every KEYFRAME_INTERVAL deltas, or when a delta stops being much smaller
+  than the text. Materializing any version therefore costs at most one R2
+  read plus one patch, and hot texts are served from the cache.
+"""
+from __future__ import annotations
+
+import difflib
+import gzip
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from authentication.r2_service import R2StorageService
+
+from .models import ContractVersion, VersionBlob
+from .r2_cleanup import tombstone_keys
+
+logger = logging.getLogger(__name__)
+
+KEYFRAME_INTERVAL = 10
+# Write a keyframe instead when the encoded delta exceeds this share of the text.
+KEYFRAME_MAX_DELTA_RATIO = 0.5
+TEXT_CACHE_TIMEOUT = 60 * 60
+GC_MIN_AGE_HOURS = 24
+
+
+class VersionStoreError(Exception):
+    """A blob could not be stored or materialized."""
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_r2_key(tenant_id, sha256: str, suffix: str = '') -> str:
+    return f"{tenant_id}/version-blobs/{sha256[:2]}/{sha256}{suffix}"
+
+
+def _existing(tenant_id, sha256: str) -> Optional[VersionBlob]:
+    """
+    The stored blob for these contents, marked as just used so that
+    delete_unreferenced_blobs leaves it alone until the caller has attached
+    it to a version. None if there is none (or GC took it meanwhile).
+    """
+    blob = VersionBlob.objects.filter(tenant_id=tenant_id, sha256=sha256).first()
+    if blob is None:
+        return None
+    # Waits for a GC transaction holding the row; 0 rows means it was collected.
+    if not VersionBlob.objects.filter(id=blob.id).update(last_used_at=timezone.now()):
+        return None
+    return blob
+
+
+def _create(**fields) -> VersionBlob:
+    """Insert a blob row; if a concurrent writer won the race, use theirs."""
+    try:
+        with transaction.atomic():
+            return VersionBlob.objects.create(**fields)
+    except IntegrityError:
+        return VersionBlob.objects.get(tenant_id=fields['tenant_id'], sha256=fields['sha256'])
+
+
+def store_file(tenant_id, data: bytes, *, content_type: str = 'application/octet-stream') -> VersionBlob:
+    """Deduplicated document blob; uploads only if this tenant hasn't stored these bytes before."""
+    data = data or b''
+    sha = sha256_bytes(data)
+    blob = _existing(tenant_id, sha)
+    if blob is not None:
+        return blob
+
+    key = blob_r2_key(tenant_id, sha)
+    R2StorageService().put_bytes(
+        key,
+        data,
+        content_type=content_type or 'application/octet-stream',
+        metadata={'tenant_id': str(tenant_id), 'sha256': sha, 'purpose': 'version_blob'},
+    )
+    return _create(tenant_id=tenant_id, sha256=sha, kind='file', size=len(data), content_type=content_type or '', r2_key=key)
+
+
+def adopt_file(version: ContractVersion) -> Optional[VersionBlob]:
+    """
+    The version's file as a shareable blob. Versions written before blobs
+    get one registered for their existing R2 object (no copy), provided
+    their file_hash is a sha256. Returns None if that isn't possible.
+    """
+    if version.blob_id:
+        return version.blob
+    sha = (version.file_hash or '').lower()
+    if not version.r2_key or len(sha) != 64:
+        return None
+    tenant_id = version.contract.tenant_id
+    blob = _existing(tenant_id, sha)
+    if blob is not None:
+        # Same bytes already stored elsewhere; the version keeps its own object.
+        return blob
+    blob = _create(
+        tenant_id=tenant_id, sha256=sha, kind='file', size=version.file_size or 0,
+        content_type='', r2_key=version.r2_key,
+    )
+    if blob.r2_key == version.r2_key:
+        ContractVersion.objects.filter(id=version.id, blob__isnull=True).update(blob=blob)
+    return blob
+
+
+# ---------------------------------------------------------------------------
+# Text deltas: [["=", n], ["-", n], ["+", [lines...]]] over keepends lines
+# ---------------------------------------------------------------------------
+
+def make_delta(base: str, text: str) -> list:
+    a = base.splitlines(keepends=True)
+    b = text.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(['=', i2 - i1])
+            continue
+        if tag in ('delete', 'replace'):
+            ops.append(['-', i2 - i1])
+        if tag in ('insert', 'replace'):
+            ops.append(['+', b[j1:j2]])
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    a = base.splitlines(keepends=True)
+    out = []
+    pos = 0
+    for op in ops:
+        kind, arg = op[0], op[1]
+        if kind == '=':
+            out.extend(a[pos:pos + arg])
+            pos += arg
+        elif kind == '-':
+            pos += arg
+        elif kind == '+':
+            out.extend(arg)
+        else:
+            raise VersionStoreError(f'Unknown delta op {kind!r}')
+    if pos != len(a):
+        raise VersionStoreError('Delta does not match its keyframe')
+    return ''.join(out)
+
+
+def _text_cache_key(blob: VersionBlob) -> str:
+    return f"version-text:{blob.tenant_id}:{blob.sha256}"
+
+
+def _latest_keyframe(contract_id) -> Optional[VersionBlob]:
+    latest = (
+        ContractVersion.objects.filter(contract_id=contract_id, text_blob__isnull=False)
+        .select_related('text_blob__base')
+        .order_by('-version_number')
+        .first()
+    )
+    if latest is None:
+        return None
+    blob = latest.text_blob
+    return blob.base if blob.kind == 'text_delta' else blob
+
+
+def _store_keyframe(tenant_id, sha: str, text: str) -> VersionBlob:
+    raw = text.encode('utf-8')
+    key = blob_r2_key(tenant_id, sha, '.txt.gz')
+    R2StorageService().put_bytes(
+        key,
+        gzip.compress(raw),
+        content_type='application/gzip',
+        metadata={'tenant_id': str(tenant_id), 'sha256': sha, 'purpose': 'version_text'},
+    )
+    blob = _create(tenant_id=tenant_id, sha256=sha, kind='text', size=len(raw), content_type='text/plain; charset=utf-8', r2_key=key)
+    cache.set(_text_cache_key(blob), text, TEXT_CACHE_TIMEOUT)
+    return blob
+
+
+def store_text(tenant_id, contract_id, text: str) -> VersionBlob:
+    """Text snapshot for a new version of `contract_id`, as a delta where worthwhile."""
+    text = text or ''
+    raw = text.encode('utf-8')
+    sha = sha256_bytes(raw)
+    blob = _existing(tenant_id, sha)
+    if blob is not None:
+        return blob
+
+    keyframe = _latest_keyframe(contract_id)
+    if keyframe is not None and keyframe.deltas.count() < KEYFRAME_INTERVAL:
+        try:
+            ops = make_delta(materialize_text(keyframe), text)
+        except VersionStoreError as e:
+            logger.warning(f"Keyframe {keyframe.sha256} unreadable, writing a new one: {e}")
+            ops = None
+        if ops is not None:
+            encoded = len(json.dumps(ops, separators=(',', ':')))
+            if encoded <= KEYFRAME_MAX_DELTA_RATIO * max(len(raw), 1):
+                blob = _create(
+                    tenant_id=tenant_id, sha256=sha, kind='text_delta', size=len(raw),
+                    content_type='text/plain; charset=utf-8', base=keyframe, delta=ops,
+                )
+                cache.set(_text_cache_key(blob), text, TEXT_CACHE_TIMEOUT)
+                return blob
+    return _store_keyframe(tenant_id, sha, text)
+
+
+def materialize_text(blob: VersionBlob) -> str:
+    """Full text of a text blob (cached)."""
+    key = _text_cache_key(blob)
+    text = cache.get(key)
+    if text is not None:
+        return text
+
+    if blob.kind == 'text':
+        try:
+            text = gzip.decompress(R2StorageService().get_file_bytes(blob.r2_key)).decode('utf-8')
+        except Exception as e:
+            raise VersionStoreError(f'Text keyframe {blob.r2_key} could not be read: {e}')
+    elif blob.kind == 'text_delta':
+        text = apply_delta(materialize_text(blob.base), blob.delta or [])
+    else:
+        # Identical bytes were first stored as a file (e.g. an uploaded .txt).
+        try:
+            text = R2StorageService().get_file_bytes(blob.r2_key).decode('utf-8')
+        except Exception as e:
+            raise VersionStoreError(f'Blob {blob.r2_key} is not readable as text: {e}')
+
+    if sha256_bytes(text.encode('utf-8')) != blob.sha256:
+        raise VersionStoreError(f'Materialized text does not match {blob.sha256}')
+    cache.set(key, text, TEXT_CACHE_TIMEOUT)
+    return text
+
+
+def delete_unreferenced_blobs(tenant_id=None, limit: int = 500) -> int:
+    """
+    Remove blobs no version (and no delta) references any more, deltas
+    first so their keyframes become collectable on a later pass. Recently
+    created or reused blobs are skipped: a writer may be about to attach
+    one to a version.
+    """
+    cutoff = timezone.now() - timedelta(hours=GC_MIN_AGE_HOURS)
+    qs = VersionBlob.objects.filter(
+        file_versions__isnull=True, text_versions__isnull=True, deltas__isnull=True,
+        last_used_at__lt=cutoff,
+    )
+    if tenant_id:
+        qs = qs.filter(tenant_id=tenant_id)
+    blobs = list(qs.order_by('-kind')[:limit])
+
+    deleted = 0
+    for blob in blobs:
+        try:
+            with transaction.atomic():
+                # Re-checked under the row lock: a writer reusing the blob touches it first.
+                idle = (
+                    VersionBlob.objects.select_for_update()
+                    .filter(id=blob.id, last_used_at__lt=cutoff)
+                    .values_list('id', flat=True)
+                    .first()
+                )
+                if idle is None:
+                    continue
+                VersionBlob.objects.filter(id=blob.id).delete()
+                if blob.r2_key:
+                    tombstone_keys([blob.r2_key], reason='version_blob_unreferenced')
+        except IntegrityError:
+            # Picked up by a new version meanwhile (PROTECT).
+            continue
+        deleted += 1
+    return deleted
@@ -19,17 +19,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.shortcuts import get_object_or_404
-from django.db import transaction, connection
-from django.db.models import BigIntegerField, Q
+from django.db import IntegrityError, transaction, connection
+from django.db.models import BigIntegerField, Exists, Max, OuterRef, Q, Subquery
 from django.db.models.expressions import RawSQL
 from django.db.models.fields.json import KeyTextTransform
 from django.db.models.functions import Cast, Coalesce, Length
 from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
 from django.utils import timezone
-from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from datetime import datetime, timedelta
 import uuid
+import csv
 import hashlib
 import json
 import logging
@@ -42,7 +43,8 @@ from .models import (
     GenerationJob, BusinessRule, ContractClause, ESignatureContract,
     Signer, SigningAuditLog,
     ContractEditingSession, ContractEditingTemplate, ContractPreview,
-    ContractEditingStep, ContractEdits, ContractFieldValidationRule
+    ContractEditingStep, ContractEdits, ContractFieldValidationRule,
+    ContractContent, ContractEditorOp, BulkGenerationJob,
 )
 from .serializers import (
     ContractSerializer, ContractListSerializer, ContractDetailSerializer, ContractDecisionSerializer,
@@ -56,18 +58,58 @@ from .serializers import (
     ESignatureContractSerializer, SignerSerializer, SigningAuditLogSerializer,
     FormFieldSubmissionSerializer, ClauseSelectionSerializer,
     ConstraintDefinitionSerializer, ContractPreviewRequestSerializer,
-    ContractEditAfterPreviewSerializer, FinalizedContractSerializer
+    ContractEditAfterPreviewSerializer, FinalizedContractSerializer,
+    BulkGenerationJobSerializer, prefetch_latest_version,
 )
 from .services import (
     ContractGenerator, RuleEngine,
     SignNowAPIService, SignNowAuthService
 )
 from .clause_seed import ensure_tenant_clause_library_seeded
+from .template_engine import fill_first_slot, render_template
+from .version_diff import DIFF_FORMAT_VERSION, cached_diff
+from .version_store import (
+    VersionStoreError,
+    adopt_file,
+    materialize_text,
+    sha256_bytes,
+    store_file,
+    store_text,
+)
+from .content_store import migrate_contract_row, share_content, split_content, store_content, strip_html
+from .r2_cleanup import tombstone_keys
+from .editor_autosave import (
+    DELTA_CHECKPOINT_DELAY_SECONDS,
+    DELTA_CHECKPOINT_EVERY_OPS,
+    flush_editor_snapshot,
+    schedule_editor_flush,
+)
+from .editor_deltas import (
+    DeltaError,
+    apply_ops,
+    cache_editor_content,
+    editor_content_sha256,
+    editor_plain_text,
+    load_editor_content,
+)
 from .constraint_library import CONSTRAINT_LIBRARY
+from .pdf_render_cache import pdf_cache_key, pdf_etag, pdf_file_response
+from .preview_cache import get_preview, preview_key, put_preview
+from .status_counters import get_status_counts, reconcile_status_counters
 from authentication.r2_service import R2StorageService
+from clm_backend.conditional import (
+    CONDITIONAL_CACHE_CONTROL,
+    ConditionalGetMixin,
+    make_etag,
+    not_modified_response,
+)
+from clm_backend.pagination import PaginationModeMixin
 
 logger = logging.getLogger(__name__)
 
+# Template placeholders that receive the additional clauses/constraints block, in priority order.
+ADDITIONS_SLOTS = ('clauses_section', 'clauses', 'constraints_section', 'constraints')
+
 
 _signnow_api_service = None
 
@@ -170,7 +212,7 @@ class ContractDetailView(APIView):
             )
         
         contract = get_object_or_404(
-            Contract,
+            prefetch_latest_version(Contract.objects.all()),
             id=contract_id,
             tenant_id=request.user.tenant_id
         )
@@ -398,7 +440,7 @@ class ClauseViewSet(viewsets.ModelViewSet):
         queryset = Clause.objects.filter(
             tenant_id=tenant_id,
             status='published'
-        )
+        ).defer('embedding')
         
         # Filter by contract type if provided
         if contract_type:
@@ -658,12 +700,57 @@ class ClauseViewSet(viewsets.ModelViewSet):
         return Response({'suggestions': suggestions})
 
 
-class ContractViewSet(viewsets.ModelViewSet):
+class ContractViewSet(PaginationModeMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for contracts with generation, approval, and version management
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    etag_actions = ('retrieve', 'update_content')
+
+    # Hash of every column ContractDetailSerializer returns, computed in Postgres
+    # so the ETag check never ships the row (or rendered editor content) to Python.
+    # Some writers use update()/update_fields without bumping updated_at.
+    _DETAIL_ETAG_SQL = (
+        "md5(ROW(title, contract_type, status, value, counterparty, start_date, end_date, "
+        "form_inputs, user_instructions, clauses, "
+        "(metadata - 'rendered_html' - 'rendered_text' - 'raw_text'), "
+        "is_approved, approved_by, approved_at, updated_at)::text)"
+    )
+
+    def get_etag_source(self):
+        # values_list() rows can't carry the latest-version prefetch.
+        qs = self.get_queryset().prefetch_related(None).filter(id=self.kwargs.get('pk'))
+        if self.action == 'update_content':
+            latest_op = ContractEditorOp.objects.filter(contract_id=OuterRef('pk')).order_by('-revision')
+            return (
+                qs.annotate(
+                    _revision=KeyTextTransform('editor_revision', 'metadata'),
+                    _sha256=KeyTextTransform('editor_content_sha256', 'metadata'),
+                    _r2_key=KeyTextTransform('editor_r2_key', 'metadata'),
+                    _pending=KeyTextTransform('editor_pending_flush', 'metadata'),
+                    _server_ms=KeyTextTransform('editor_server_updated_at_ms', 'metadata'),
+                    _op_revision=Subquery(latest_op.values('revision')[:1]),
+                    _op_sha256=Subquery(latest_op.values('result_sha256')[:1]),
+                )
+                .values_list(
+                    'updated_at', '_revision', '_sha256', '_r2_key', '_pending', '_server_ms',
+                    '_op_revision', '_op_sha256',
+                )
+                .first()
+            )
+        return (
+            qs.annotate(
+                _detail_md5=RawSQL(self._DETAIL_ETAG_SQL, []),
+                _latest_version=Subquery(
+                    ContractVersion.objects.filter(contract_id=OuterRef('pk'))
+                    .order_by('-version_number')
+                    .values('id')[:1]
+                ),
+            )
+            .values_list('_detail_md5', '_latest_version')
+            .first()
+        )
 
     def _is_admin_like(self) -> bool:
         user = getattr(self, 'request', None) and getattr(self.request, 'user', None)
@@ -706,18 +793,7 @@ class ContractViewSet(viewsets.ModelViewSet):
         return base
 
     def _render_template_text(self, raw_text: str, values: dict) -> str:
-        if not raw_text:
-            return ''
-        if not values:
-            return raw_text
-
-        rendered = raw_text
-        for key, value in values.items():
-            if key is None:
-                continue
-            placeholder = re.compile(r'\{\{\s*' + re.escape(str(key)) + r'\s*\}\}')
-            rendered = placeholder.sub(str(value) if value is not None else '', rendered)
-        return rendered
+        return render_template(raw_text, values)
 
     def _infer_contract_type_from_filename(self, filename: str) -> str:
         name = (filename or '').lower()
@@ -771,7 +847,10 @@ class ContractViewSet(viewsets.ModelViewSet):
             )
 
         # Even for detail actions, avoid pulling large/binary columns unless explicitly needed.
-        return qs.defer('signed_pdf')
+        qs = qs.defer('signed_pdf')
+        if self.get_serializer_class() is ContractDetailSerializer:
+            qs = prefetch_latest_version(qs)
+        return qs
 
     def destroy(self, request, *args, **kwargs):
         instance: Contract = self.get_object()
@@ -785,6 +864,7 @@ class ContractViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Executed contracts cannot be deleted.'}, status=status.HTTP_400_BAD_REQUEST)
 
         tenant_id = str(getattr(request.user, 'tenant_id', '') or '').strip()
+        contract_id = instance.id
         r2_keys: set[str] = set()
 
         try:
@@ -797,40 +877,29 @@ class ContractViewSet(viewsets.ModelViewSet):
                 if isinstance(editor_r2_key, str) and editor_r2_key.strip():
                     r2_keys.add(editor_r2_key.strip())
 
-            for key in ContractVersion.objects.filter(contract=instance).values_list('r2_key', flat=True):
+            # Deduplicated blobs may be shared with other versions/contracts;
+            # delete_unreferenced_blobs collects them once nothing points at them.
+            for key in ContractVersion.objects.filter(contract=instance, blob__isnull=True).values_list('r2_key', flat=True):
                 if key:
                     r2_keys.add(str(key))
-
-            # Delete any contract-scoped artifacts (editor snapshots, signature field config, etc.)
-            # stored under a deterministic prefix.
-            if tenant_id:
-                prefix = f"{tenant_id}/contracts/{instance.id}/"
-                try:
-                    r2 = R2StorageService()
-                    for obj in r2.list_objects(prefix=prefix, max_keys=200):
-                        k = obj.get('key')
-                        if isinstance(k, str) and k.strip():
-                            r2_keys.add(k.strip())
-                except Exception:
-                    pass
         except Exception:
             # Never block delete on cleanup bookkeeping.
             pass
 
+        # Storage is cleaned up in the background (contracts.r2_cleanup); the
+        # tombstones commit or roll back together with the delete.
         with transaction.atomic():
             instance.delete()
-
-        # Best-effort storage cleanup (do not fail the API call).
-        if r2_keys:
             try:
-                r2 = R2StorageService()
-                for key in r2_keys:
-                    try:
-                        r2.delete_file(key)
-                    except Exception:
-                        continue
-            except Exception:
-                pass
+                with transaction.atomic():
+                    tombstone_keys(
+                        r2_keys,
+                        # Contract-scoped artifacts (editor snapshots, signature field config, etc.)
+                        prefixes=[f"{tenant_id}/contracts/{contract_id}/"] if tenant_id else (),
+                        reason='contract_deleted',
+                    )
+            except Exception as e:
+                logger.warning(f"Could not record R2 cleanup for contract {contract_id}: {e}")
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -851,28 +920,43 @@ class ContractViewSet(viewsets.ModelViewSet):
         except Exception:
             return None
     
+    def _save_with_content(self, serializer, **kwargs):
+        """Save, keeping editor content sent inside `metadata` out of the contract row."""
+        content = {}
+        if isinstance(serializer.validated_data.get('metadata'), dict):
+            serializer.validated_data['metadata'], content = split_content(serializer.validated_data['metadata'])
+        with transaction.atomic():
+            instance = serializer.save(**kwargs)
+            if content:
+                store_content(instance.id, instance.tenant_id, **content)
+        return instance
+
     def perform_create(self, serializer):
         """Set tenant_id and created_by when creating a contract"""
-        serializer.save(
+        self._save_with_content(
+            serializer,
             tenant_id=self.request.user.tenant_id,
             created_by=self.request.user.user_id
         )
 
+    def perform_update(self, serializer):
+        self._save_with_content(serializer)
+
     def _strip_html(self, html: str) -> str:
         """Best-effort HTML -> plain text conversion for exports."""
-        if not html:
-            return ''
-        # Keep line breaks for common tags.
-        text = re.sub(r'(?i)<\s*br\s*/?>', '\n', html)
-        text = re.sub(r'(?i)</\s*(p|div|h\d|li)\s*>', '\n', text)
-        text = re.sub(r'<[^>]+>', '', text)
-        # Unescape a few common entities without pulling in extra deps.
-        text = text.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
-        return re.sub(r'\n{3,}', '\n\n', text).strip()
+        return strip_html(html)
 
     def _contract_export_text(self, contract: Contract) -> str:
         md = contract.metadata or {}
 
+        # Plain text derived at save time (plus pending deltas); R2/metadata are for legacy rows.
+        try:
+            current = editor_plain_text(contract.id, md)
+            if current is not None:
+                return current['text']
+        except Exception:
+            pass
+
         # Prefer the latest editor snapshot in R2 (full content).
         try:
             r2_key = md.get('editor_r2_key')
@@ -906,6 +990,8 @@ class ContractViewSet(viewsets.ModelViewSet):
         """If rendered content is missing in DB, try to rehydrate from R2 snapshot."""
         try:
             md = contract.metadata or {}
+            if ContractContent.objects.filter(contract_id=contract.id).exists():
+                return False
             has_text = isinstance(md.get('rendered_text'), str) and md.get('rendered_text').strip()
             has_html = isinstance(md.get('rendered_html'), str) and md.get('rendered_html').strip()
             if has_text or has_html:
@@ -926,18 +1012,15 @@ class ContractViewSet(viewsets.ModelViewSet):
 
             rendered_text = obj.get('rendered_text')
             rendered_html = obj.get('rendered_html')
-            changed = False
+            content = {}
             if isinstance(rendered_text, str) and rendered_text.strip():
-                md['rendered_text'] = rendered_text
-                changed = True
+                content['rendered_text'] = rendered_text
             if isinstance(rendered_html, str) and rendered_html.strip():
-                md['rendered_html'] = rendered_html
-                changed = True
-            if not changed:
+                content['rendered_html'] = rendered_html
+            if not content:
                 return False
 
-            contract.metadata = md
-            contract.save(update_fields=['metadata', 'updated_at'])
+            store_content(contract.id, contract.tenant_id, **content)
             return True
         except Exception:
             return False
@@ -961,7 +1044,7 @@ class ContractViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get', 'patch'], url_path='content')
     def update_content(self, request, pk=None):
-        """Persist editor changes into Contract.metadata (rendered_text/rendered_html)."""
+        """Read or persist editor content (ContractContent, mirrored to R2)."""
         if request.method == 'GET':
             base_qs = self.get_queryset().filter(id=pk)
             row = (
@@ -969,20 +1052,58 @@ class ContractViewSet(viewsets.ModelViewSet):
                     r2_key=KeyTextTransform('editor_r2_key', 'metadata'),
                     client_ms=Cast(KeyTextTransform('editor_client_updated_at_ms', 'metadata'), BigIntegerField()),
                     server_ms=Cast(KeyTextTransform('editor_server_updated_at_ms', 'metadata'), BigIntegerField()),
+                    revision=Cast(KeyTextTransform('editor_revision', 'metadata'), BigIntegerField()),
+                    pending_flush=KeyTextTransform('editor_pending_flush', 'metadata'),
+                    has_content_store=Exists(ContractContent.objects.filter(contract_id=OuterRef('pk'))),
+                )
+                .values(
+                    'id', 'title', 'r2_key', 'client_ms', 'server_ms', 'revision', 'pending_flush',
+                    'has_content_store',
                 )
-                .values('id', 'title', 'r2_key', 'client_ms', 'server_ms')
                 .first()
             )
             if not row:
                 return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
 
             r2_key = (row.get('r2_key') or '').strip()
+            deltas_pending = ContractEditorOp.objects.filter(
+                contract_id=row['id'], kind='delta', revision__gt=row.get('revision') or 0
+            ).exists()
+            if (
+                row.get('has_content_store')
+                or deltas_pending
+                or str(row.get('pending_flush') or '').lower() == 'true'
+            ):
+                # ContractContent (+ op log) is current; no R2 read needed.
+                md = (base_qs.values_list('metadata', flat=True).first()) or {}
+                try:
+                    current = load_editor_content(row['id'], md)
+                except DeltaError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                return Response(
+                    {
+                        'contract_id': str(row['id']),
+                        'r2_key': r2_key or None,
+                        'revision': current['revision'],
+                        'sha256': current['sha256'],
+                        'client_updated_at_ms': md.get('editor_client_updated_at_ms'),
+                        'server_updated_at_ms': md.get('editor_server_updated_at_ms'),
+                        'rendered_text': current['rendered_text'],
+                        'rendered_html': current['rendered_html'],
+                    },
+                    status=status.HTTP_200_OK,
+                )
+
             snapshot = self._get_editor_snapshot_from_r2(r2_key) if r2_key else None
             if snapshot:
                 return Response(
                     {
                         'contract_id': str(row['id']),
                         'r2_key': r2_key,
+                        'revision': row.get('revision') or 0,
+                        'sha256': editor_content_sha256(
+                            snapshot.get('rendered_text') or '', snapshot.get('rendered_html') or ''
+                        ),
                         'client_updated_at_ms': snapshot.get('client_updated_at_ms') or row.get('client_ms'),
                         'server_updated_at_ms': snapshot.get('server_updated_at_ms') or row.get('server_ms'),
                         'rendered_text': snapshot.get('rendered_text') or '',
@@ -991,7 +1112,7 @@ class ContractViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_200_OK,
                 )
 
-            # Fallback: older rows may still have full content in DB metadata.
+            # Fallback: rows from before ContractContent with content only in metadata.
             contract = base_qs.only('id', 'metadata', 'updated_at', 'title').first()
             if not contract:
                 return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -999,41 +1120,10 @@ class ContractViewSet(viewsets.ModelViewSet):
             rendered_text = md.get('rendered_text') or ''
             rendered_html = md.get('rendered_html') or ''
 
-            # Best-effort: write a snapshot to R2 and compact metadata (remove large keys).
+            # Best-effort: move the content out of the row now rather than
+            # waiting for the background migration.
             try:
-                key = self._editor_content_r2_key_for_contract_id(contract.id)
-                payload = {
-                    'schema': 'clm.editor_snapshot.v1',
-                    'contract_id': str(contract.id),
-                    'tenant_id': str(request.user.tenant_id),
-                    'updated_at': timezone.now().isoformat(),
-                    'client_updated_at_ms': md.get('editor_client_updated_at_ms'),
-                    'server_updated_at_ms': md.get('editor_server_updated_at_ms'),
-                    'rendered_text': rendered_text,
-                    'rendered_html': rendered_html,
-                }
-                r2 = R2StorageService()
-                r2.put_text(
-                    key,
-                    json.dumps(payload, ensure_ascii=False),
-                    content_type='application/json; charset=utf-8',
-                    metadata={
-                        'tenant_id': str(request.user.tenant_id),
-                        'contract_id': str(contract.id),
-                        'purpose': 'editor_snapshot',
-                    },
-                )
-                md['editor_r2_key'] = key
-                md['editor_r2_synced_at'] = timezone.now().isoformat()
-                md['editor_r2_sync_ok'] = True
-                md.pop('rendered_html', None)
-                # Keep only a bounded excerpt of text in DB.
-                if isinstance(rendered_text, str):
-                    md['rendered_text'] = rendered_text[:20000]
-                    md['rendered_text_truncated'] = len(rendered_text) > 20000
-                contract.metadata = md
-                contract.save(update_fields=['metadata', 'updated_at'])
-                r2_key = key
+                migrate_contract_row(contract.id)
             except Exception:
                 pass
 
@@ -1041,6 +1131,11 @@ class ContractViewSet(viewsets.ModelViewSet):
                 {
                     'contract_id': str(contract.id),
                     'r2_key': r2_key or None,
+                    'revision': md.get('editor_revision') or 0,
+                    'sha256': editor_content_sha256(
+                        rendered_text if isinstance(rendered_text, str) else '',
+                        rendered_html if isinstance(rendered_html, str) else '',
+                    ),
                     'client_updated_at_ms': md.get('editor_client_updated_at_ms'),
                     'server_updated_at_ms': md.get('editor_server_updated_at_ms'),
                     'rendered_text': rendered_text if isinstance(rendered_text, str) else '',
@@ -1058,9 +1153,20 @@ class ContractViewSet(viewsets.ModelViewSet):
                     [],
                 ),
                 existing_client_ms=Cast(KeyTextTransform('editor_client_updated_at_ms', 'metadata'), BigIntegerField()),
+                existing_revision=Cast(KeyTextTransform('editor_revision', 'metadata'), BigIntegerField()),
                 existing_r2_key=KeyTextTransform('editor_r2_key', 'metadata'),
-                existing_text_len=Coalesce(Length(KeyTextTransform('rendered_text', 'metadata')), 0),
-                existing_html_len=Coalesce(Length(KeyTextTransform('rendered_html', 'metadata')), 0),
+                existing_text_len=Coalesce(
+                    Length(KeyTextTransform('rendered_text', 'metadata')),
+                    Length('content_store__snapshot__rendered_text'),
+                    Length('content_store__rendered_text'),
+                    0,
+                ),
+                existing_html_len=Coalesce(
+                    Length(KeyTextTransform('rendered_html', 'metadata')),
+                    Length('content_store__snapshot__rendered_html'),
+                    Length('content_store__rendered_html'),
+                    0,
+                ),
             )
             .values(
                 'id',
@@ -1069,6 +1175,7 @@ class ContractViewSet(viewsets.ModelViewSet):
                 'status',
                 '_metadata_stripped',
                 'existing_client_ms',
+                'existing_revision',
                 'existing_r2_key',
                 'existing_text_len',
                 'existing_html_len',
@@ -1163,16 +1270,45 @@ class ContractViewSet(viewsets.ModelViewSet):
 
         if incoming_client_ms is not None and existing_client_ms is not None and incoming_client_ms < existing_client_ms:
             # Stale write; return current state without modifying.
-            return Response(ContractDetailSerializer(contract).data, status=status.HTTP_200_OK)
-        # Track content hash to make it easy to detect and debug overwrites.
-        try:
-            h = hashlib.sha256()
-            h.update((rendered_text or '').encode('utf-8', errors='replace'))
-            h.update(b"\n---\n")
-            h.update((rendered_html or '').encode('utf-8', errors='replace'))
-            md['editor_content_sha256'] = h.hexdigest()
-        except Exception:
-            pass
+            contract_obj = (
+                base_qs.defer('metadata')
+                .annotate(
+                    _metadata_stripped=RawSQL(
+                        "(metadata - 'rendered_html' - 'rendered_text' - 'raw_text')",
+                        [],
+                    )
+                )
+                .first()
+            )
+            if not contract_obj:
+                return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(ContractDetailSerializer(contract_obj).data, status=status.HTTP_200_OK)
+
+        # Optimistic concurrency: clients may send the `revision` they last loaded.
+        # Delta saves advance the revision through the op log only.
+        existing_revision = row.get('existing_revision')
+        existing_revision = int(existing_revision) if isinstance(existing_revision, (int, float)) else None
+        latest_op_revision = ContractEditorOp.objects.filter(contract_id=row['id']).aggregate(
+            r=Max('revision')
+        )['r']
+        if latest_op_revision is not None and latest_op_revision > (existing_revision or 0):
+            existing_revision = latest_op_revision
+        base_revision = request.data.get('base_revision', None)
+        if base_revision is not None:
+            try:
+                base_revision = int(base_revision)
+            except Exception:
+                return Response({'error': 'base_revision must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            if base_revision != (existing_revision or 0):
+                return Response(
+                    {'error': 'Content was modified by another save', 'revision': existing_revision or 0},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+        # Track content hash to make it easy to detect and debug overwrites
+        # (also the base hash for delta saves).
+        content_sha256 = editor_content_sha256(rendered_text or '', rendered_html or '')
+        md['editor_content_sha256'] = content_sha256
 
         server_ms = int(time.time() * 1000)
         if incoming_client_ms is not None:
@@ -1180,79 +1316,76 @@ class ContractViewSet(viewsets.ModelViewSet):
         md['editor_server_updated_at_ms'] = server_ms
         md['editor_updated_at_ms'] = max(server_ms, incoming_client_ms or 0)
 
-        # Keep only bounded DB content; full content lives in R2.
-        md.pop('rendered_html', None)
         md.pop('raw_text', None)
         md['editor_has_content'] = bool(incoming_text) or (not _is_meaningfully_empty_html(incoming_html))
         md['editor_text_len'] = len(rendered_text or '')
         md['editor_html_len'] = len(rendered_html or '')
         md['editor_preview_text'] = (incoming_text[:2000] if incoming_text else '')
-        if rendered_text is not None:
-            md['rendered_text'] = (rendered_text or '')[:20000]
-            md['rendered_text_truncated'] = len(rendered_text or '') > 20000
-
-        now = timezone.now()
-        base_qs.update(
-            metadata=md,
-            last_edited_at=now,
-            last_edited_by=request.user.user_id,
-            updated_at=now,
-        )
-
-        # Best-effort: keep search index in sync for hybrid/semantic search.
-        try:
-            from search.services import SearchIndexingService
-
-            content_for_index = str(rendered_text or '').strip()
-            if content_for_index:
-                SearchIndexingService.create_index(
-                    entity_type='contract',
-                    entity_id=str(row['id']),
-                    title=(row.get('title') or 'Contract'),
-                    content=content_for_index,
-                    tenant_id=str(request.user.tenant_id),
-                    keywords=[x for x in [row.get('contract_type'), row.get('status')] if x],
-                )
-        except Exception:
-            # Do not fail the editor save if search indexing fails.
-            pass
 
-        # Sync the latest editor snapshot to Cloudflare R2 for durable retrieval.
-        # This intentionally overwrites a deterministic key (latest.json) to avoid unbounded growth.
-        # Version history is handled via explicit contract versioning endpoints.
-        try:
-            r2 = R2StorageService()
-            key = self._editor_content_r2_key_for_contract_id(row['id'])
-            payload = {
-                'schema': 'clm.editor_snapshot.v1',
-                'contract_id': str(row['id']),
-                'tenant_id': str(request.user.tenant_id),
-                'updated_at': timezone.now().isoformat(),
-                'client_updated_at_ms': incoming_client_ms,
-                'server_updated_at_ms': server_ms,
-                'rendered_text': rendered_text,
-                'rendered_html': rendered_html,
-            }
-            r2.put_text(
-                key,
-                json.dumps(payload, ensure_ascii=False),
-                content_type='application/json; charset=utf-8',
-                metadata={
-                    'tenant_id': str(request.user.tenant_id),
-                    'contract_id': str(row['id']),
-                    'purpose': 'editor_snapshot',
-                },
+        # Full content goes to ContractContent in the same transaction; the
+        # write-behind flush copies it to R2 (latest.json).
+        md.pop('rendered_text_truncated', None)
+        md['editor_pending_flush'] = True
+
+        # One INSERT into the op log (unique per revision, so concurrent saves
+        # can't both win) plus one UPDATE of the row. Clients that sent
+        # base_revision get a 409 on a lost race; legacy clients (ordering via
+        # client_updated_at_ms only) are retried against the new revision.
+        for _attempt in range(3):
+            new_revision = (existing_revision or 0) + 1
+            md['editor_revision'] = new_revision
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    ContractEditorOp.objects.create(
+                        contract_id=row['id'],
+                        tenant_id=request.user.tenant_id,
+                        revision=new_revision,
+                        kind='full',
+                        result_sha256=content_sha256,
+                        created_by=request.user.user_id,
+                    )
+                    base_qs.update(
+                        metadata=md,
+                        last_edited_at=now,
+                        last_edited_by=request.user.user_id,
+                        updated_at=now,
+                    )
+                    store_content(
+                        row['id'],
+                        request.user.tenant_id,
+                        rendered_text=rendered_text or '',
+                        rendered_html=rendered_html or '',
+                    )
+                break
+            except IntegrityError:
+                current = ContractEditorOp.objects.filter(contract_id=row['id']).aggregate(r=Max('revision'))['r']
+                if base_revision is not None:
+                    return Response(
+                        {'error': 'Content was modified by another save', 'revision': current or 0},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                existing_revision = current
+        else:
+            return Response(
+                {'error': 'Content is being modified concurrently; retry the save'},
+                status=status.HTTP_409_CONFLICT,
             )
-            md['editor_r2_key'] = key
-            md['editor_r2_synced_at'] = timezone.now().isoformat()
-            md['editor_r2_sync_ok'] = True
-            md.pop('editor_r2_sync_error', None)
-            base_qs.update(metadata=md, updated_at=timezone.now())
-        except Exception as e:
-            # DB save succeeded; keep a lightweight marker to surface R2 sync issues.
-            md['editor_r2_sync_ok'] = False
-            md['editor_r2_sync_error'] = str(e)[:400]
-            base_qs.update(metadata=md, updated_at=timezone.now())
+        cache_editor_content(row['id'], new_revision, rendered_text or '', rendered_html or '', content_sha256)
+
+        # Autosaves respond now and let the background writer flush (coalescing
+        # rapid saves). Explicit saves flush inline so R2 is current on return.
+        autosave = str(request.data.get('autosave', '') or request.query_params.get('mode', '')).strip().lower() in (
+            '1', 'true', 'yes', 'autosave',
+        )
+        if autosave:
+            schedule_editor_flush(row['id'])
+        else:
+            try:
+                flush_editor_snapshot(row['id'])
+            except Exception:
+                # DB save succeeded; the flush marks the R2 error and is retried in the background.
+                schedule_editor_flush(row['id'])
 
         # Return a lightweight contract payload.
         contract_obj = (
@@ -1272,6 +1405,98 @@ class ContractViewSet(viewsets.ModelViewSet):
 
         return Response(ContractDetailSerializer(contract).data, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['post'], url_path='content/delta')
+    def content_delta(self, request, pk=None):
+        """Apply an ordered list of splice ops to the editor content.
+
+        POST /api/v1/contracts/{id}/content/delta/
+
+        Body:
+          - base_revision: int (revision the ops were made against)
+          - base_sha256: string (content hash at base_revision)
+          - ops: [{"field": "html"|"text", "pos": int, "delete": int, "insert": str}, ...]
+
+        Only the ops are stored (one op-log INSERT); full checkpoints are
+        written by the background flush. 409 means the base is stale: reload
+        via GET /content/ and rebase.
+        """
+        base_qs = self.get_queryset().filter(id=pk)
+        md = base_qs.values_list('metadata', flat=True).first()
+        if md is None and not base_qs.exists():
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        md = md if isinstance(md, dict) else {}
+
+        ops = request.data.get('ops')
+        base_sha256 = str(request.data.get('base_sha256') or '').strip()
+        try:
+            base_revision = int(request.data.get('base_revision'))
+        except Exception:
+            return Response({'error': 'base_revision must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not base_sha256:
+            return Response({'error': 'base_sha256 is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            current = load_editor_content(pk, md)
+        except DeltaError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        if base_revision != current['revision'] or base_sha256 != current['sha256']:
+            return Response(
+                {
+                    'error': 'Content was modified by another save',
+                    'revision': current['revision'],
+                    'sha256': current['sha256'],
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            new_text, new_html = apply_ops(current['rendered_text'], current['rendered_html'], ops)
+        except DeltaError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        new_revision = current['revision'] + 1
+        new_sha256 = editor_content_sha256(new_text, new_html)
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                ContractEditorOp.objects.create(
+                    contract_id=pk,
+                    tenant_id=request.user.tenant_id,
+                    revision=new_revision,
+                    kind='delta',
+                    base_sha256=current['sha256'],
+                    result_sha256=new_sha256,
+                    ops=ops,
+                    created_by=request.user.user_id,
+                )
+                # Non-JSON columns only: the TOASTed metadata value is not rewritten.
+                base_qs.update(last_edited_at=now, last_edited_by=request.user.user_id, updated_at=now)
+        except IntegrityError:
+            return Response(
+                {'error': 'Content was modified by another save', 'revision': new_revision},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        cache_editor_content(pk, new_revision, new_text, new_html, new_sha256)
+
+        ops_since_checkpoint = new_revision - int(md.get('editor_flushed_revision') or md.get('editor_revision') or 0)
+        schedule_editor_flush(
+            pk,
+            delay=2 if ops_since_checkpoint >= DELTA_CHECKPOINT_EVERY_OPS else DELTA_CHECKPOINT_DELAY_SECONDS,
+        )
+
+        return Response(
+            {
+                'contract_id': str(pk),
+                'revision': new_revision,
+                'sha256': new_sha256,
+                'text_len': len(new_text),
+                'html_len': len(new_html),
+            },
+            status=status.HTTP_200_OK,
+        )
+
     @action(detail=True, methods=['post'], url_path='ai/generate-stream')
     def ai_generate_stream(self, request, pk=None):
         """Stream AI-generated contract edits as Server-Sent Events (SSE).
@@ -1296,11 +1521,14 @@ class ContractViewSet(viewsets.ModelViewSet):
         md = contract.metadata or {}
         current_text = request.data.get('current_text')
         if current_text is None:
-            # Prefer R2 snapshot (full content) if present.
+            # Stored content first; R2 snapshot / metadata for legacy rows.
             snap_text = None
             try:
                 r2_key = md.get('editor_r2_key')
-                if isinstance(r2_key, str) and r2_key.strip():
+                current = editor_plain_text(contract.id, md)
+                if current is not None:
+                    snap_text = current['text']
+                elif isinstance(r2_key, str) and r2_key.strip():
                     snap = self._get_editor_snapshot_from_r2(r2_key.strip())
                     if isinstance(snap, dict):
                         snap_text = snap.get('rendered_text') or self._strip_html(snap.get('rendered_html') or '')
@@ -1311,59 +1539,23 @@ class ContractViewSet(viewsets.ModelViewSet):
         if not isinstance(current_text, str):
             return Response({'error': 'current_text must be a string'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Retrieve a few relevant clauses using Voyage Law-2 embeddings.
+        # Retrieve a few relevant clauses: embed only the prompt, then an ANN
+        # query over the precomputed clause embeddings.
         def _pick_relevant_clauses() -> list[dict]:
             try:
                 from repository.embeddings_service import VoyageEmbeddingsService
-                import numpy as np
+                from .clause_embeddings import find_relevant_clauses
 
                 svc = VoyageEmbeddingsService()
                 query_emb = svc.embed_query(prompt) or svc.embed_text(prompt)
-                if not query_emb:
+                if not query_emb or svc.use_mock:
                     return []
 
-                qs = Clause.objects.filter(
-                    tenant_id=request.user.tenant_id,
-                    status='published',
+                return find_relevant_clauses(
+                    request.user.tenant_id,
+                    query_emb,
+                    contract_type=contract.contract_type or None,
                 )
-                if contract.contract_type:
-                    qs = qs.filter(contract_type=contract.contract_type)
-                # Keep it bounded for latency.
-                items = list(qs.order_by('-updated_at')[:40])
-                if not items:
-                    return []
-
-                texts = [f"{c.name}\n\n{c.content}"[:8000] for c in items]
-                embs = svc.embed_batch(texts)
-
-                q = np.array(query_emb, dtype=np.float32)
-                qn = float(np.linalg.norm(q))
-                if qn <= 0:
-                    return []
-
-                scored: list[tuple[float, Clause]] = []
-                for clause, emb in zip(items, embs):
-                    if not emb:
-                        continue
-                    v = np.array(emb, dtype=np.float32)
-                    vn = float(np.linalg.norm(v))
-                    if vn <= 0:
-                        continue
-                    sim = float(np.dot(q, v) / (qn * vn))
-                    scored.append((sim, clause))
-
-                scored.sort(key=lambda x: x[0], reverse=True)
-                out = []
-                for sim, clause in scored[:5]:
-                    out.append(
-                        {
-                            'clause_id': clause.clause_id,
-                            'name': clause.name,
-                            'similarity': round(sim, 4),
-                            'content': clause.content,
-                        }
-                    )
-                return out
             except Exception:
                 return []
 
@@ -1479,28 +1671,29 @@ Relevant clause library (optional):
         if extra_md is not None and not isinstance(extra_md, dict):
             return Response({'error': 'metadata must be an object'}, status=status.HTTP_400_BAD_REQUEST)
 
-        md = {
-            'rendered_text': rendered_text or '',
-            'rendered_html': rendered_html or '',
-        }
+        md = {}
         if isinstance(extra_md, dict):
             # Shallow-merge is intentional: keep metadata JSON simple and stable.
-            # Do not allow overriding rendered_text/rendered_html.
-            for k, v in extra_md.items():
-                if k in ('rendered_text', 'rendered_html'):
-                    continue
-                md[k] = v
+            # Content keys are not allowed here; content lives in ContractContent.
+            md, _ = split_content(extra_md)
 
-        contract = Contract.objects.create(
-            tenant_id=request.user.tenant_id,
-            title=title,
-            status='draft',
-            created_by=request.user.user_id,
-            contract_type=contract_type,
-            metadata=md,
-            last_edited_at=timezone.now(),
-            last_edited_by=request.user.user_id,
-        )
+        with transaction.atomic():
+            contract = Contract.objects.create(
+                tenant_id=request.user.tenant_id,
+                title=title,
+                status='draft',
+                created_by=request.user.user_id,
+                contract_type=contract_type,
+                metadata=md,
+                last_edited_at=timezone.now(),
+                last_edited_by=request.user.user_id,
+            )
+            store_content(
+                contract.id,
+                contract.tenant_id,
+                rendered_text=rendered_text or '',
+                rendered_html=rendered_html or '',
+            )
 
         return Response(ContractDetailSerializer(contract).data, status=status.HTTP_201_CREATED)
 
@@ -1519,49 +1712,14 @@ Relevant clause library (optional):
         contract = self.get_object()
         text = self._contract_export_text(contract)
 
-        from io import BytesIO
-        import textwrap
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import LETTER
-        from reportlab.lib.units import inch
-
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=LETTER)
-        width, height = LETTER
-        left = 0.75 * inch
-        top = height - 0.75 * inch
-        bottom = 0.75 * inch
-
-        text_obj = c.beginText(left, top)
-        text_obj.setFont('Times-Roman', 11)
-
-        max_chars = 110
-        for line in (text or '').splitlines():
-            wrapped_lines = textwrap.wrap(
-                line,
-                width=max_chars,
-                replace_whitespace=False,
-                drop_whitespace=False,
-            ) or ['']
-            for wl in wrapped_lines:
-                if text_obj.getY() <= bottom:
-                    c.drawText(text_obj)
-                    c.showPage()
-                    text_obj = c.beginText(left, top)
-                    text_obj.setFont('Times-Roman', 11)
-                text_obj.textLine(wl)
-
-        c.drawText(text_obj)
-        c.save()
-        buffer.seek(0)
+        # Rendered PDFs are cached by content hash; that hash is also the ETag.
+        etag = pdf_etag(pdf_cache_key(text))
+        resp = not_modified_response(request, etag)
+        if resp is not None:
+            return resp
 
         filename = f"{(contract.title or 'contract').strip().replace(' ', '_')}.pdf"
-        return FileResponse(
-            buffer,
-            as_attachment=True,
-            filename=filename,
-            content_type='application/pdf',
-        )
+        return pdf_file_response(request, text, contract.tenant_id, contract.id, filename=filename, as_attachment=True)
 
     # ---------------------------------------------------------------------
     # Filesystem-backed template support (no DB templates)
@@ -1601,11 +1759,7 @@ Relevant clause library (optional):
         return 'SERVICE_AGREEMENT'
 
     def _render_template_text(self, raw_text: str, values: dict) -> str:
-        rendered = raw_text or ''
-        for key, value in (values or {}).items():
-            placeholder = re.compile(r'\{\{\s*' + re.escape(str(key)) + r'\s*\}\}')
-            rendered = placeholder.sub(str(value) if value is not None else '', rendered)
-        return rendered
+        return render_template(raw_text, values)
 
     def _assemble_additions_block(self, tenant_id, contract_type: str, selected_clause_ids, custom_clauses, constraints) -> str:
         selected_clause_ids = selected_clause_ids or []
@@ -1662,10 +1816,9 @@ Relevant clause library (optional):
             return rendered_text
 
         out = rendered_text or ''
-        for slot in ('clauses_section', 'clauses', 'constraints_section', 'constraints'):
-            token_rx = re.compile(r'\{\{\s*' + re.escape(slot) + r'\s*\}\}')
-            if token_rx.search(out):
-                return token_rx.sub(additions_block, out)
+        filled = fill_first_slot(out, ADDITIONS_SLOTS, additions_block)
+        if filled is not None:
+            return filled
 
         return out + '\n\n---\n\n' + additions_block + '\n'
 
@@ -1707,11 +1860,7 @@ Relevant clause library (optional):
         return 'SERVICE_AGREEMENT'
 
     def _render_template_text(self, raw_text: str, values: dict) -> str:
-        rendered = raw_text or ''
-        for key, value in (values or {}).items():
-            placeholder = re.compile(r'\{\{\s*' + re.escape(str(key)) + r'\s*\}\}')
-            rendered = placeholder.sub(str(value) if value is not None else '', rendered)
-        return rendered
+        return render_template(raw_text, values)
 
     def _assemble_additions_block(self, tenant_id, contract_type: str, selected_clause_ids, custom_clauses, constraints) -> str:
         selected_clause_ids = selected_clause_ids or []
@@ -1772,10 +1921,9 @@ Relevant clause library (optional):
 
         out = rendered_text or ''
         # Prefer inserting into an explicit placeholder if present
-        for slot in ('clauses_section', 'clauses', 'constraints_section', 'constraints'):
-            token_rx = re.compile(r'\{\{\s*' + re.escape(slot) + r'\s*\}\}')
-            if token_rx.search(out):
-                return token_rx.sub(additions_block, out)
+        filled = fill_first_slot(out, ADDITIONS_SLOTS, additions_block)
+        if filled is not None:
+            return filled
 
         # Otherwise append at the end
         sep = '\n\n' if out.endswith('\n') else '\n\n'
@@ -1816,11 +1964,12 @@ Relevant clause library (optional):
                 except Exception:
                     pass
 
-                file_hash = hashlib.sha256(file_bytes).hexdigest()
-                file_size = getattr(uploaded_file, 'size', None)
-
-                r2_service = R2StorageService()
-                r2_key = r2_service.upload_file(uploaded_file, request.user.tenant_id, uploaded_file.name)
+                # Identical bytes already stored for this tenant are reused, not re-uploaded.
+                blob = store_file(
+                    request.user.tenant_id,
+                    file_bytes,
+                    content_type=getattr(uploaded_file, 'content_type', None) or 'application/octet-stream',
+                )
 
                 template_id = contract.template_id or uuid.uuid4()
                 template_version = getattr(contract.template, 'version', None) or 1
@@ -1828,13 +1977,14 @@ Relevant clause library (optional):
                 ContractVersion.objects.create(
                     contract=contract,
                     version_number=1,
-                    r2_key=r2_key,
+                    r2_key=blob.r2_key,
                     template_id=template_id,
                     template_version=template_version,
                     change_summary='Initial document upload',
                     created_by=request.user.user_id,
-                    file_size=file_size,
-                    file_hash=file_hash,
+                    file_size=blob.size,
+                    file_hash=blob.sha256,
+                    blob=blob,
                 )
 
                 contract.current_version = 1
@@ -1917,40 +2067,52 @@ Relevant clause library (optional):
         }
         """
         from django.db.models import Count, Q
-        from datetime import timedelta
+        from django.db.models.functions import TruncMonth
         from django.utils import timezone
         
         tenant_id = request.user.tenant_id
         queryset = Contract.objects.filter(tenant_id=tenant_id)
         
-        # Get status counts
-        stats = queryset.aggregate(
-            total=Count('id'),
-            draft=Count('id', filter=Q(status='draft')),
-            pending=Count('id', filter=Q(status='pending')),
-            approved=Count('id', filter=Q(status='approved')),
-            rejected=Count('id', filter=Q(status='rejected')),
-            executed=Count('id', filter=Q(status='executed'))
+        # Status totals come from the per-tenant counters; seed them on first use.
+        counts = get_status_counts(tenant_id)
+        if counts is None:
+            reconcile_status_counters(tenant_id)
+            counts = get_status_counts(tenant_id) or {}
+        stats = {'total': sum(counts.values())}
+        for status_value, _label in Contract.STATUS_CHOICES:
+            stats[status_value] = counts.get(status_value, 0)
+        
+        # Monthly trends for the last 6 calendar months: one GROUP BY query.
+        now = timezone.localtime()
+        months = []
+        year, month = now.year, now.month
+        for _ in range(6):
+            months.append((year, month))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        months.reverse()
+        first_month_start = now.replace(
+            year=months[0][0], month=months[0][1], day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        
+        rows = (
+            queryset.filter(created_at__gte=first_month_start, status__in=['approved', 'rejected'])
+            .annotate(month=TruncMonth('created_at'))
+            .values('month')
+            .annotate(
+                approved=Count('id', filter=Q(status='approved')),
+                rejected=Count('id', filter=Q(status='rejected')),
+            )
+            .order_by()
         )
+        by_month = {(r['month'].year, r['month'].month): r for r in rows}
         
-        # Get monthly trends for last 6 months
         monthly_trends = []
-        for i in range(5, -1, -1):
-            month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30 * i)
-            month_end = (month_start + timedelta(days=32)).replace(day=1)
-            
-            month_contracts = queryset.filter(
-                created_at__gte=month_start,
-                created_at__lt=month_end
-            )
-            
-            approved_count = month_contracts.filter(status='approved').count()
-            rejected_count = month_contracts.filter(status='rejected').count()
-            
+        for year, month in months:
+            row = by_month.get((year, month)) or {}
             monthly_trends.append({
-                'month': month_start.strftime('%b'),
-                'approved': approved_count,
-                'rejected': rejected_count
+                'month': datetime(year, month, 1).strftime('%b'),
+                'approved': row.get('approved', 0),
+                'rejected': row.get('rejected', 0)
             })
         
         return Response({
@@ -2096,6 +2258,75 @@ Relevant clause library (optional):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk-generate')
+    def bulk_generate(self, request):
+        """
+        POST /contracts/bulk-generate/
+        Queue generation of one contract per row from a published template.
+
+        JSON: {"template_id": "...", "rows": [{"counterparty": "...", "value": 1000, ...}]}
+        or multipart with `template_id` and a CSV `file` (header row = field names).
+        An optional `title` column sets each contract's title.
+
+        Returns 202 with the job; poll GET /contracts/bulk-generate/{job_id}/.
+        """
+        from .bulk_generation import BulkInputError, create_job, parse_rows
+
+        tenant_id = request.user.tenant_id
+        template_id = request.data.get('template_id')
+        if not template_id:
+            return Response({'error': 'template_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            template = ContractTemplate.objects.get(id=template_id, tenant_id=tenant_id, status='published')
+        except (ContractTemplate.DoesNotExist, ValidationError, ValueError):
+            return Response({'error': 'Template not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                rows = parse_rows(csv_text=upload.read().decode('utf-8', errors='replace'))
+            else:
+                rows = parse_rows(rows=request.data.get('rows'))
+        except BulkInputError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except csv.Error as e:
+            return Response({'error': f'Invalid CSV: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            job = create_job(
+                tenant_id=tenant_id,
+                user_id=request.user.user_id,
+                template=template,
+                rows=rows,
+                user_instructions=request.data.get('user_instructions'),
+            )
+        return Response(BulkGenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    def _bulk_job_or_404(self, job_id):
+        qs = BulkGenerationJob.objects.filter(tenant_id=self.request.user.tenant_id).defer('rows')
+        if not self._is_admin_like():
+            qs = qs.filter(created_by=self._user_id_str() or None)
+        return get_object_or_404(qs, id=job_id)
+
+    @action(detail=False, methods=['get'], url_path=r'bulk-generate/(?P<job_id>[0-9a-fA-F-]{36})')
+    def bulk_generation_status(self, request, job_id=None):
+        """GET /contracts/bulk-generate/{job_id}/ - progress and per-row errors"""
+        job = self._bulk_job_or_404(job_id)
+        return Response(BulkGenerationJobSerializer(job).data)
+
+    @action(detail=False, methods=['get'], url_path=r'bulk-generate/(?P<job_id>[0-9a-fA-F-]{36})/download')
+    def bulk_generation_download(self, request, job_id=None):
+        """GET /contracts/bulk-generate/{job_id}/download/ - presigned URL of the result ZIP"""
+        job = self._bulk_job_or_404(job_id)
+        if job.status != 'completed' or not job.result_r2_key:
+            return Response(
+                {'error': 'Job has not finished', 'status': job.status, 'progress': job.progress},
+                status=status.HTTP_409_CONFLICT,
+            )
+        url = R2StorageService().generate_presigned_url(job.result_r2_key)
+        return Response({'job_id': str(job.id), 'r2_key': job.result_r2_key, 'download_url': url})
+
     @action(detail=False, methods=['post'], url_path='preview-from-file')
     def preview_from_file(self, request):
         tenant_id = request.user.tenant_id
@@ -2248,10 +2479,9 @@ Relevant clause library (optional):
                 metadata={
                     'template_filename': safe,
                     'template_source': 'template_files_db',
-                    'raw_text': raw_text,
-                    'rendered_text': rendered,
                 },
             )
+            store_content(contract.id, contract.tenant_id, raw_text=raw_text, rendered_text=rendered)
 
             WorkflowLog.objects.create(
                 contract=contract,
@@ -2277,6 +2507,9 @@ Relevant clause library (optional):
         """
         contract = self.get_object()
         versions = contract.versions.all()
+        page = self.paginate_opt_in(versions)
+        if page is not None:
+            return self.get_paginated_response(ContractVersionSerializer(page, many=True).data)
         serializer = ContractVersionSerializer(versions, many=True)
         return Response(serializer.data)
     
@@ -2311,6 +2544,14 @@ Relevant clause library (optional):
             latest_version = contract.versions.order_by('-version_number').first()
             version_number = (latest_version.version_number + 1) if latest_version else 1
             
+            # Snapshot the contract text (stored as a delta against a keyframe
+            # where possible). Versioning must not fail because R2 is down.
+            text_blob = None
+            try:
+                text_blob = store_text(tenant_id, contract.id, self._contract_export_text(contract))
+            except Exception as e:
+                logger.warning(f"Version text snapshot failed for contract {contract.id}: {e}")
+
             # Create version without requiring generator
             version = ContractVersion.objects.create(
                 contract=contract,
@@ -2321,7 +2562,8 @@ Relevant clause library (optional):
                 created_by=user_id,
                 file_size=0,
                 file_hash='',
-                r2_key=f'contracts/{contract.id}/v{version_number}.docx'
+                r2_key=f'contracts/{contract.id}/v{version_number}.docx',
+                text_blob=text_blob,
             )
             
             contract.current_version = version_number
@@ -2526,6 +2768,104 @@ Relevant clause library (optional):
         )
         serializer = ContractVersionSerializer(version)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='versions/(?P<version_number>[0-9]+)/text')
+    def version_text(self, request, pk=None, version_number=None):
+        """
+        GET /contracts/{id}/versions/{version_number}/text/
+        Contract text as of this version. Immutable, so the ETag is its hash.
+        """
+        contract = self.get_object()
+        version = get_object_or_404(
+            ContractVersion.objects.select_related('text_blob__base'),
+            contract=contract,
+            version_number=version_number,
+        )
+        if version.text_blob is None:
+            return Response({'error': 'No text snapshot for this version'}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'"{version.text_blob.sha256}"'
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        try:
+            text = materialize_text(version.text_blob)
+        except VersionStoreError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        resp = Response({
+            'contract_id': str(contract.id),
+            'version_number': version.version_number,
+            'sha256': version.text_blob.sha256,
+            'text': text,
+        })
+        resp['ETag'] = etag
+        resp['Cache-Control'] = CONDITIONAL_CACHE_CONTROL
+        return resp
+
+    def _version_text_source(self, version):
+        """
+        (sha256, loader) for a version's text: its text snapshot, or for
+        versions created before snapshots, its clause snapshots with the
+        clause names as headings.
+        """
+        if version.text_blob_id:
+            blob = version.text_blob
+            return blob.sha256, lambda: materialize_text(blob)
+        text = '\n\n'.join(
+            f"## {name}\n\n{content or ''}"
+            for name, content in version.clauses.order_by('position').values_list('clause_name', 'clause_content')
+        )
+        if not text:
+            return None, None
+        return sha256_bytes(text.encode('utf-8')), lambda: text
+
+    @action(detail=True, methods=['get'], url_path='versions/diff')
+    def version_diff(self, request, pk=None):
+        """
+        GET /contracts/{id}/versions/diff/?from=1&to=3
+        Clause-labelled hunks between two versions (line level, or paragraph
+        level for very large changes). Cached per pair of version texts.
+        """
+        contract = self.get_object()
+        numbers = []
+        for param in ('from', 'to'):
+            try:
+                numbers.append(int(request.query_params.get(param)))
+            except (TypeError, ValueError):
+                return Response({'error': '"from" and "to" version numbers are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        versions = {
+            v.version_number: v
+            for v in ContractVersion.objects.select_related('text_blob__base').filter(contract=contract, version_number__in=numbers)
+        }
+        missing = [n for n in numbers if n not in versions]
+        if missing:
+            return Response({'error': f'Version {missing[0]} not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        (a_sha, load_a), (b_sha, load_b) = (self._version_text_source(versions[n]) for n in numbers)
+        if a_sha is None or b_sha is None:
+            return Response({'error': 'Version has no text to compare'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            diff = cached_diff(request.user.tenant_id, a_sha, b_sha, load_a, load_b)
+        except VersionStoreError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        # A fallback diff gets its own ETag, so it is replaced once a full one is computed.
+        etag = make_etag('version-diff', DIFF_FORMAT_VERSION, a_sha, b_sha, diff['granularity'], diff['minimal'])
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        resp = Response({
+            'contract_id': str(contract.id),
+            'from_version': numbers[0],
+            'to_version': numbers[1],
+            **diff,
+        })
+        resp['ETag'] = etag
+        resp['Cache-Control'] = CONDITIONAL_CACHE_CONTROL
+        return resp
     
     @action(detail=True, methods=['post'], url_path='new-version')
     def new_version(self, request, pk=None):
@@ -2564,7 +2904,8 @@ Relevant clause library (optional):
     def clone(self, request, pk=None):
         """
         POST /contracts/{id}/clone/
-        Clone a contract to create a new copy
+        Clone a contract to create a new copy. Editor content and the latest
+        version's file/text are shared copy-on-write, not copied.
         
         Request:
         {
@@ -2578,35 +2919,44 @@ Relevant clause library (optional):
         new_title = request.data.get('title', f"{contract.title} (Copy)")
         
         try:
-            cloned_contract = Contract.objects.create(
-                tenant_id=tenant_id,
-                title=new_title,
-                contract_type=contract.contract_type,
-                status='draft',
-                value=contract.value,
-                counterparty=contract.counterparty,
-                start_date=contract.start_date,
-                end_date=contract.end_date,
-                created_by=user_id,
-                template_id=contract.template_id
-            )
-            
-            # Clone latest version if exists
-            latest_version = contract.versions.order_by('-version_number').first()
-            if latest_version:
-                ContractVersion.objects.create(
-                    contract=cloned_contract,
-                    version_number=1,
-                    r2_key=latest_version.r2_key,
-                    template_id=latest_version.template_id,
-                    template_version=latest_version.template_version,
-                    change_summary=f'Cloned from {contract.title}',
+            with transaction.atomic():
+                cloned_contract = Contract.objects.create(
+                    tenant_id=tenant_id,
+                    title=new_title,
+                    contract_type=contract.contract_type,
+                    status='draft',
+                    value=contract.value,
+                    counterparty=contract.counterparty,
+                    start_date=contract.start_date,
+                    end_date=contract.end_date,
                     created_by=user_id,
-                    file_size=latest_version.file_size,
-                    file_hash=latest_version.file_hash
+                    template_id=contract.template_id
                 )
-                cloned_contract.current_version = 1
-                cloned_contract.save(update_fields=['current_version'])
+                share_content(contract.id, cloned_contract.id, tenant_id)
+
+                # Clone latest version if exists
+                latest_version = (
+                    contract.versions.select_related('contract', 'blob', 'text_blob')
+                    .order_by('-version_number')
+                    .first()
+                )
+                if latest_version:
+                    blob = adopt_file(latest_version)
+                    ContractVersion.objects.create(
+                        contract=cloned_contract,
+                        version_number=1,
+                        r2_key=blob.r2_key if blob else latest_version.r2_key,
+                        template_id=latest_version.template_id,
+                        template_version=latest_version.template_version,
+                        change_summary=f'Cloned from {contract.title}',
+                        created_by=user_id,
+                        file_size=latest_version.file_size,
+                        file_hash=latest_version.file_hash,
+                        blob=blob,
+                        text_blob=latest_version.text_blob,
+                    )
+                    cloned_contract.current_version = 1
+                    cloned_contract.save(update_fields=['current_version'])
             
             return Response(
                 ContractSerializer(cloned_contract).data,
@@ -4326,7 +4676,7 @@ def get_executed_document(request, contract_id):
 
 # ========== GENERATION VIEWS ==========
 
-class ContractTemplateViewSet(viewsets.ModelViewSet):
+class ContractTemplateViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for contract templates
     """
@@ -4353,12 +4703,14 @@ class ContractTemplateViewSet(viewsets.ModelViewSet):
         )
 
 
-class ClauseViewSet(viewsets.ModelViewSet):
+class ClauseViewSet(PaginationModeMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for clauses with alternative suggestions
     """
     permission_classes = [IsAuthenticated]
     serializer_class = ClauseSerializer
+    # Embeddings are refreshed with update(), which doesn't bump updated_at.
+    etag_fields = ('updated_at', 'embedding_sha256')
     
     def get_queryset(self):
         tenant_id = self.request.user.tenant_id
@@ -4374,7 +4726,7 @@ class ClauseViewSet(viewsets.ModelViewSet):
         queryset = Clause.objects.filter(
             tenant_id=tenant_id,
             status='published'
-        )
+        ).defer('embedding')
         
         # Filter by contract type if provided
         if contract_type:
@@ -4498,7 +4850,6 @@ class ClauseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        rule_engine = RuleEngine()
         context = {
             'contract_type': contract.contract_type,
             'contract_value': float(contract.value or 0),
@@ -4510,18 +4861,11 @@ class ClauseViewSet(viewsets.ModelViewSet):
             tenant_id=request.user.tenant_id,
             contract_type=contract.contract_type,
             status='published'
-        )
+        ).only('id', 'clause_id', 'alternatives')
         
-        suggestions = []
-        for clause in clauses:
-            suggestions_for_clause = rule_engine.get_clause_suggestions(
-                request.user.tenant_id,
-                contract.contract_type,
-                context,
-                clause.clause_id
-            )
-            if suggestions_for_clause:
-                suggestions.extend(suggestions_for_clause)
+        suggestions = RuleEngine.suggestions_for_clauses(
+            request.user.tenant_id, contract.contract_type, context, list(clauses)
+        )
         
         return Response({'suggestions': suggestions})
     
@@ -4559,40 +4903,36 @@ class ClauseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_200_OK
             )
         
-        contracts = Contract.objects.filter(
-            id__in=valid_ids,
-            tenant_id=request.user.tenant_id
+        contracts = list(
+            Contract.objects.filter(
+                id__in=valid_ids,
+                tenant_id=request.user.tenant_id
+            ).only('id', 'contract_type', 'value', 'counterparty')
         )
         
-        rule_engine = RuleEngine()
-        suggestions = {}
+        # Published clauses for every contract type involved, in one query.
+        clauses_by_type = {}
+        for clause in Clause.objects.filter(
+            tenant_id=request.user.tenant_id,
+            contract_type__in={c.contract_type for c in contracts},
+            status='published'
+        ).only('id', 'clause_id', 'contract_type', 'alternatives'):
+            clauses_by_type.setdefault(clause.contract_type, []).append(clause)
         
-        for contract in contracts:
-            context = {
-                'contract_type': contract.contract_type,
-                'contract_value': float(contract.value or 0),
-                'counterparty': contract.counterparty
-            }
-            
-            # Get all published clauses for this contract type
-            clauses = Clause.objects.filter(
-                tenant_id=request.user.tenant_id,
-                contract_type=contract.contract_type,
-                status='published'
+        items = [
+            (
+                contract.contract_type,
+                {
+                    'contract_type': contract.contract_type,
+                    'contract_value': float(contract.value or 0),
+                    'counterparty': contract.counterparty
+                },
+                clauses_by_type.get(contract.contract_type, []),
             )
-            
-            contract_suggestions = []
-            for clause in clauses:
-                suggestions_for_clause = rule_engine.get_clause_suggestions(
-                    request.user.tenant_id,
-                    contract.contract_type,
-                    context,
-                    clause.clause_id
-                )
-                if suggestions_for_clause:
-                    contract_suggestions.extend(suggestions_for_clause)
-            
-            suggestions[str(contract.id)] = contract_suggestions
+            for contract in contracts
+        ]
+        results = RuleEngine.bulk_clause_suggestions(request.user.tenant_id, items)
+        suggestions = {str(contract.id): found for contract, found in zip(contracts, results)}
         
         return Response({'suggestions': suggestions})
 
@@ -5950,26 +6290,41 @@ class ContractEditingSessionViewSet(viewsets.ModelViewSet):
         
         # Get template
         template = ContractEditingTemplate.objects.get(id=session.template_id)
+        tenant_id = request.user.tenant_id
         
-        # Build contract content
-        contract_html = self._build_contract_html(
-            template, form_data, clause_ids, constraints, request.user.tenant_id
-        )
-        contract_text = self._build_contract_text(
-            template, form_data, clause_ids, constraints, request.user.tenant_id
-        )
-        
-        # Save preview
-        preview, created = ContractPreview.objects.update_or_create(
-            session=session,
-            defaults={
-                'preview_html': contract_html,
-                'preview_text': contract_text,
-                'form_data_snapshot': form_data,
-                'clauses_snapshot': clause_ids,
-                'constraints_snapshot': constraints
-            }
-        )
+        # Same inputs (template version, form data, clauses, constraints) as the
+        # stored preview or a recent render: serve it without rendering again.
+        render_key = preview_key(template, form_data, clause_ids, constraints, tenant_id)
+        preview = ContractPreview.objects.filter(session=session).first()
+        cached = preview is not None and preview.render_key == render_key
+        
+        if not cached:
+            rendered = get_preview(render_key)
+            cached = rendered is not None
+            if rendered is None:
+                clauses = list(Clause.objects.filter(
+                    clause_id__in=clause_ids,
+                    tenant_id=tenant_id,
+                    status='published'
+                ))
+                rendered = (
+                    self._build_contract_html(template, form_data, clause_ids, constraints, tenant_id, clauses=clauses),
+                    self._build_contract_text(template, form_data, clause_ids, constraints, tenant_id, clauses=clauses),
+                )
+                put_preview(render_key, *rendered)
+            
+            # Save preview
+            preview, created = ContractPreview.objects.update_or_create(
+                session=session,
+                defaults={
+                    'preview_html': rendered[0],
+                    'preview_text': rendered[1],
+                    'form_data_snapshot': form_data,
+                    'clauses_snapshot': clause_ids,
+                    'constraints_snapshot': constraints,
+                    'render_key': render_key,
+                }
+            )
         
         # Log step
         ContractEditingStep.objects.create(
@@ -5978,7 +6333,8 @@ class ContractEditingSessionViewSet(viewsets.ModelViewSet):
             step_data={
                 'preview_id': str(preview.id),
                 'form_fields_count': len(form_data),
-                'clauses_count': len(clause_ids)
+                'clauses_count': len(clause_ids),
+                'cached': cached
             }
         )
         
@@ -5986,6 +6342,7 @@ class ContractEditingSessionViewSet(viewsets.ModelViewSet):
         return Response(
             {
                 'message': 'Preview generated successfully',
+                'cached': cached,
                 'preview': serializer.data
             },
             status=status.HTTP_200_OK
@@ -6187,7 +6544,7 @@ class ContractEditingSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _build_contract_html(self, template, form_data, clause_ids, constraints, tenant_id):
+    def _build_contract_html(self, template, form_data, clause_ids, constraints, tenant_id, clauses=None):
         """
         Build professional HTML preview of contract
         """
@@ -6284,11 +6641,12 @@ class ContractEditingSessionViewSet(viewsets.ModelViewSet):
         # Add clauses
         html_content += '<div class="section-title">Contract Clauses</div>'
         
-        clauses = Clause.objects.filter(
-            clause_id__in=clause_ids,
-            tenant_id=tenant_id,
-            status='published'
-        )
+        if clauses is None:
+            clauses = Clause.objects.filter(
+                clause_id__in=clause_ids,
+                tenant_id=tenant_id,
+                status='published'
+            )
         
         for idx, clause in enumerate(clauses, 1):
             html_content += f"""
@@ -6306,7 +6664,7 @@ class ContractEditingSessionViewSet(viewsets.ModelViewSet):
         
         return html_content
     
-    def _build_contract_text(self, template, form_data, clause_ids, constraints, tenant_id):
+    def _build_contract_text(self, template, form_data, clause_ids, constraints, tenant_id, clauses=None):
         """
         Build plain text preview of contract
         """
@@ -6335,11 +6693,12 @@ CONTRACT INFORMATION
         # Add clauses
         text_content += f"\n{'='*60}\nCONTRACT CLAUSES\n{'='*60}\n\n"
         
-        clauses = Clause.objects.filter(
-            clause_id__in=clause_ids,
-            tenant_id=tenant_id,
-            status='published'
-        )
+        if clauses is None:
+            clauses = Clause.objects.filter(
+                clause_id__in=clause_ids,
+                tenant_id=tenant_id,
+                status='published'
+            )
         
         for idx, clause in enumerate(clauses, 1):
             text_content += f"\nClause {idx}: {clause.name}\n"
@@ -4,6 +4,7 @@ Handles text extraction, chunking, embedding generation, and metadata extraction
 """
 import re
 import json
+import hashlib
 from typing import List, Dict, Optional, Tuple
 from django.conf import settings
 from authentication.r2_service import R2StorageService
@@ -106,6 +107,53 @@ class DocumentChunkingService:
         return [s.strip() for s in sentences if s.strip()]
 
 
+class DocumentFingerprintService:
+    """Content fingerprinting used to deduplicate uploads within a tenant"""
+    
+    @staticmethod
+    def compute_sha256(file_obj) -> str:
+        """
+        Hash an uploaded file without loading it into memory at once
+        
+        Args:
+            file_obj: Django UploadedFile object
+        
+        Returns:
+            Hex-encoded SHA-256 digest (file pointer is rewound afterwards)
+        """
+        digest = hashlib.sha256()
+        if hasattr(file_obj, 'chunks'):
+            for block in file_obj.chunks():
+                digest.update(block)
+        else:
+            for block in iter(lambda: file_obj.read(1024 * 1024), b''):
+                digest.update(block)
+        file_obj.seek(0)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def find_existing(tenant, content_sha256: str):
+        """
+        Return the tenant's document with the same content, if any
+        
+        Args:
+            tenant: TenantModel instance
+            content_sha256: Hex digest from compute_sha256()
+        
+        Returns:
+            Document instance or None
+        """
+        from repository.models import Document
+        
+        if not content_sha256:
+            return None
+        return (
+            Document.objects.filter(tenant=tenant, content_sha256=content_sha256)
+            .select_related('metadata')
+            .first()
+        )
+
+
 class TextExtractionService:
     """Service for extracting text from various file formats"""
     
@@ -405,6 +453,52 @@ class DocumentProcessingService:
                 'error': str(e)
             }
     
+    def ingest(self, file_obj, document_model, r2_service: R2StorageService) -> Dict:
+        """
+        Process a document and persist its chunks and metadata
+        
+        Shared by the synchronous ingest endpoint and the upload-session
+        ingestion task. Chunks from any previous run are replaced.
+        
+        Returns:
+            Processing result plus `chunks_created`
+        """
+        from repository.models import DocumentChunk, DocumentMetadata
+        
+        result = self.process_document(file_obj, document_model, r2_service)
+        if not result['success']:
+            return result
+        
+        DocumentChunk.objects.filter(document=document_model).delete()
+        chunks = DocumentChunk.objects.bulk_create([
+            DocumentChunk(
+                document=document_model,
+                tenant_id=document_model.tenant_id,
+                chunk_number=chunk_num,
+                text=chunk['text'],
+                start_char_index=chunk['start_char_index'],
+                end_char_index=chunk['end_char_index'],
+                is_processed=False  # Will be processed with embeddings in next step
+            )
+            for chunk_num, chunk in enumerate(result['chunks'], 1)
+        ])
+        
+        DocumentMetadata.objects.update_or_create(
+            document=document_model,
+            defaults={
+                'tenant_id': document_model.tenant_id,
+                'parties': result['metadata'].get('parties', []),
+                'contract_value': result['metadata'].get('contract_value'),
+                'currency': result['metadata'].get('currency'),
+                'summary': result['metadata'].get('summary'),
+                'identified_clauses': result['metadata'].get('identified_clauses', []),
+                'risk_score': result['metadata'].get('risk_score'),
+            }
+        )
+        
+        result['chunks_created'] = len(chunks)
+        return result
+    
     def _generate_chunk_embeddings(self, chunks: List[Dict]) -> List[Optional[List[float]]]:
         """
         Generate embeddings for document chunks using Voyage AI
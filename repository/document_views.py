@@ -8,10 +8,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils import timezone
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from authentication.r2_service import R2StorageService
-from repository.models import Document, DocumentChunk, DocumentMetadata
+from repository.models import Document, DocumentMetadata
 from repository.document_service import (
+    DocumentFingerprintService,
     DocumentProcessingService,
     DocumentChunkingService,
     TextExtractionService,
@@ -19,6 +21,7 @@ from repository.document_service import (
     PIIRedactionService
 )
 from tenants.models import TenantModel
+from contracts.r2_cleanup import tombstone_keys
 import logging
 import uuid
 
@@ -52,6 +55,11 @@ class DocumentViewSet(viewsets.ModelViewSet):
         """
         POST /api/documents/ingest/
         Upload and process document: extract text, chunk, extract metadata
+        
+        Uploads are fingerprinted with SHA-256. If the tenant already has a
+        processed (or in-flight) document with identical bytes, it is returned
+        instead of storing and processing a second copy. Send `force=true`
+        to re-run processing on the existing document anyway.
         """
         file_obj = request.FILES.get('file')
         if not file_obj:
@@ -62,6 +70,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
         
         # Get document type if provided
         doc_type = request.data.get('document_type', 'other')
+        force = str(request.data.get('force', '')).strip().lower() in ('1', 'true', 'yes', 'y', 'on')
         
         try:
             user = request.user
@@ -80,31 +89,68 @@ class DocumentViewSet(viewsets.ModelViewSet):
                     'error': f'Tenant {tenant} not found'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Step 1: Store file in R2
-            logger.info(f"Uploading file to R2: {file_obj.name}")
-            r2_service = R2StorageService()
-            r2_key = r2_service.upload_file(file_obj, tenant_id=str(tenant), filename=file_obj.name)
+            # Step 0: Fingerprint content and short-circuit duplicates
+            content_sha256 = DocumentFingerprintService.compute_sha256(file_obj)
+            existing = DocumentFingerprintService.find_existing(tenant_obj, content_sha256)
             
-            # Step 2: Create Document record
-            file_type = file_obj.name.split('.')[-1].lower() if '.' in file_obj.name else 'unknown'
+            if existing and existing.status in ('processed', 'processing') and not force:
+                logger.info(f"Duplicate upload of {file_obj.name}; reusing document {existing.id}")
+                return Response(
+                    self._ingest_response(existing, deduplicated=True),
+                    status=status.HTTP_200_OK
+                )
             
-            document = Document.objects.create(
-                tenant=tenant_obj,
-                uploaded_by=user,
-                filename=file_obj.name,
-                file_type=file_type,
-                file_size=file_obj.size,
-                r2_key=r2_key,
-                document_type=doc_type,
-                status='processing'
-            )
+            r2_service = R2StorageService()
             
-            logger.info(f"Created document record: {document.id}")
+            if existing:
+                # Same bytes are already in R2; reprocess the existing document in place.
+                document = existing
+                document.status = 'processing'
+                document.processing_error = None
+                document.save(update_fields=['status', 'processing_error', 'updated_at'])
+                logger.info(f"Reprocessing document {document.id} (force={force})")
+            else:
+                # Step 1: Store file in R2
+                logger.info(f"Uploading file to R2: {file_obj.name}")
+                r2_key = r2_service.upload_file(file_obj, tenant_id=str(tenant), filename=file_obj.name)
+                
+                # Step 2: Create Document record
+                file_type = file_obj.name.split('.')[-1].lower() if '.' in file_obj.name else 'unknown'
+                
+                try:
+                    with transaction.atomic():
+                        document = Document.objects.create(
+                            tenant=tenant_obj,
+                            uploaded_by=user,
+                            filename=file_obj.name,
+                            file_type=file_type,
+                            file_size=file_obj.size,
+                            r2_key=r2_key,
+                            content_sha256=content_sha256,
+                            document_type=doc_type,
+                            status='processing'
+                        )
+                except IntegrityError:
+                    # A concurrent upload of the same bytes won the race.
+                    try:
+                        r2_service.delete_file(r2_key)
+                    except Exception as e:
+                        logger.warning(f"Failed to delete duplicate R2 object {r2_key}: {str(e)}")
+                    winner = DocumentFingerprintService.find_existing(tenant_obj, content_sha256)
+                    if winner is None:
+                        raise
+                    return Response(
+                        self._ingest_response(winner, deduplicated=True),
+                        status=status.HTTP_200_OK
+                    )
+                
+                logger.info(f"Created document record: {document.id}")
             
-            # Step 3: Process document (text extraction, chunking, metadata)
+            # Step 3: Process document (text extraction, chunking, metadata) and
+            # persist chunks/metadata, replacing any from a previous run
             file_obj.seek(0)  # Reset file pointer
             processing_service = DocumentProcessingService()
-            result = processing_service.process_document(file_obj, document, r2_service)
+            result = processing_service.ingest(file_obj, document, r2_service)
             
             if not result['success']:
                 return Response({
@@ -112,42 +158,13 @@ class DocumentViewSet(viewsets.ModelViewSet):
                     'error': result.get('error', 'Processing failed')
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Step 4: Create document chunks
-            chunks_created = 0
-            for chunk_num, chunk in enumerate(result['chunks'], 1):
-                DocumentChunk.objects.create(
-                    document=document,
-                    tenant=tenant_obj,
-                    chunk_number=chunk_num,
-                    text=chunk['text'],
-                    start_char_index=chunk['start_char_index'],
-                    end_char_index=chunk['end_char_index'],
-                    is_processed=False  # Will be processed with embeddings in next step
-                )
-                chunks_created += 1
-            
-            # Step 5: Create metadata record
-            DocumentMetadata.objects.create(
-                document=document,
-                tenant=tenant_obj,
-                parties=result['metadata'].get('parties', []),
-                contract_value=result['metadata'].get('contract_value'),
-                currency=result['metadata'].get('currency'),
-                summary=result['metadata'].get('summary'),
-                identified_clauses=result['metadata'].get('identified_clauses', []),
-                risk_score=result['metadata'].get('risk_score')
-            )
+            chunks_created = result['chunks_created']
             
             logger.info(f"Document processed successfully: {document.id} ({chunks_created} chunks)")
             
             return Response({
-                'success': True,
-                'document_id': str(document.id),
-                'filename': document.filename,
-                'status': document.status,
-                'r2_key': r2_key,
+                **self._ingest_response(document, deduplicated=False),
                 'chunks_created': chunks_created,
-                'extracted_metadata': document.extracted_metadata,
                 'message': 'Document uploaded and processed successfully'
             }, status=status.HTTP_201_CREATED)
         
@@ -158,6 +175,24 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _ingest_response(self, document, deduplicated: bool) -> dict:
+        """Common response body for ingest, including duplicate hits"""
+        payload = {
+            'success': True,
+            'document_id': str(document.id),
+            'filename': document.filename,
+            'status': document.status,
+            'r2_key': document.r2_key,
+            'content_sha256': document.content_sha256,
+            'deduplicated': deduplicated,
+            'extracted_metadata': document.extracted_metadata,
+        }
+        if deduplicated:
+            payload['chunks_created'] = 0
+            payload['chunk_count'] = document.chunks.count()
+            payload['message'] = 'Identical document already uploaded; existing processed results reused'
+        return payload
+    
     # ==================== RETRIEVE & DOWNLOAD ====================
     
     @action(detail=False, methods=['get'], url_path='download')
@@ -363,16 +398,13 @@ class DocumentViewSet(viewsets.ModelViewSet):
                     'error': 'Access denied'
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            # Delete from R2
-            r2_service = R2StorageService()
-            try:
-                r2_service.delete_file(document.r2_key)
-            except Exception as e:
-                logger.warning(f"Failed to delete R2 file {document.r2_key}: {str(e)}")
-            
-            # Delete document and related records
+            # Delete document and related records; the R2 object is removed
+            # in the background once the delete commits.
             filename = document.filename
-            document.delete()
+            with transaction.atomic():
+                r2_key = document.r2_key
+                document.delete()
+                tombstone_keys([r2_key], reason='document_deleted')
             
             logger.info(f"Document deleted: {filename}")
             
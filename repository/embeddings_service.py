@@ -9,14 +9,18 @@ from typing import List, Optional, Dict
 from django.conf import settings
 import numpy as np
 
-try:
-    import voyageai  # type: ignore
-except Exception:  # pragma: no cover
-    voyageai = None
-
 logger = logging.getLogger(__name__)
 
 
+def _import_voyageai():
+    """The voyageai package, or None. Imported on first use: it takes ~1s to load."""
+    try:
+        import voyageai  # type: ignore
+    except Exception:  # pragma: no cover
+        return None
+    return voyageai
+
+
 class SemanticMockEmbeddings:
     """Generate mock embeddings that are semantically correlated
     
@@ -91,6 +95,7 @@ class VoyageEmbeddingsService:
         self.api_key = settings.VOYAGE_API_KEY
         self.client = None
         self.use_mock = False
+        voyageai = _import_voyageai() if self.api_key else None
         
         if self.api_key and voyageai is not None:
             try:
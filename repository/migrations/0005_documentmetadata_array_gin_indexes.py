@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-19 08:16
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0004_documentchunk_search_indexes'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentmetadata',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['parties'], name='doc_meta_parties_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='documentmetadata',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['identified_clauses'], name='doc_meta_clauses_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='documentmetadata',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['high_risk_items'], name='doc_meta_risk_items_gin'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0 on 2026-10-19 08:18
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0005_documentmetadata_array_gin_indexes'),
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentUploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=500)),
+                ('file_size', models.BigIntegerField()),
+                ('content_type', models.CharField(default='application/octet-stream', max_length=255)),
+                ('document_type', models.CharField(default='other', max_length=20)),
+                ('r2_key', models.CharField(max_length=500, unique=True)),
+                ('upload_id', models.CharField(max_length=1024)),
+                ('part_size', models.BigIntegerField()),
+                ('part_count', models.IntegerField()),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('completing', 'Completing'), ('completed', 'Completed'), ('aborted', 'Aborted'), ('failed', 'Failed')], default='uploading', max_length=20)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='repository.document')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='tenants.tenantmodel')),
+            ],
+            options={
+                'db_table': 'document_upload_sessions',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['tenant', 'status'], name='document_up_tenant__55f97a_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from tenants.models import TenantModel
 from authentication.models import User
 import uuid
@@ -64,6 +66,8 @@ class Document(models.Model):
     file_type = models.CharField(max_length=50)  # pdf, docx, txt, etc.
     file_size = models.BigIntegerField()  # in bytes
     r2_key = models.CharField(max_length=500, unique=True) 
+    # SHA-256 of the uploaded bytes; used to deduplicate re-uploads per tenant.
+    content_sha256 = models.CharField(max_length=64, null=True, blank=True)
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPE_CHOICES, default='other')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploaded')
     processing_error = models.TextField(null=True, blank=True)
@@ -84,6 +88,13 @@ class Document(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['r2_key']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'content_sha256'],
+                condition=models.Q(content_sha256__isnull=False),
+                name='documents_tenant_sha256_uniq',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.filename} ({self.status})"
@@ -103,6 +114,13 @@ class DocumentChunk(models.Model):
     is_processed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Full-text search vector maintained by Postgres (STORED generated column).
+    search_vector = models.GeneratedField(
+        expression=SearchVector('text', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    
     class Meta:
         db_table = 'document_chunks'
         app_label = 'repository'
@@ -110,6 +128,12 @@ class DocumentChunk(models.Model):
         indexes = [
             models.Index(fields=['document', 'chunk_number']),
             models.Index(fields=['tenant']),
+            GinIndex(fields=['search_vector'], name='doc_chunk_fts_gin'),
+            GinIndex(
+                fields=['text'],
+                name='doc_chunk_text_trgm_gin',
+                opclasses=['gin_trgm_ops'],
+            ),
         ]
     
     def __str__(self):
@@ -147,6 +171,59 @@ class DocumentMetadata(models.Model):
     class Meta:
         db_table = 'document_metadata'
         app_label = 'repository'
+        indexes = [
+            # Containment/overlap lookups (@>, &&) used by clause and party filters
+            GinIndex(fields=['parties'], name='doc_meta_parties_gin'),
+            GinIndex(fields=['identified_clauses'], name='doc_meta_clauses_gin'),
+            GinIndex(fields=['high_risk_items'], name='doc_meta_risk_items_gin'),
+        ]
     
     def __str__(self):
         return f"Metadata for {self.document.filename}"
+
+
+class DocumentUploadSession(models.Model):
+    """
+    Resumable direct-to-R2 multipart upload.
+    
+    The client PUTs parts straight to R2 using presigned URLs; R2's part
+    listing is the source of truth for which parts have arrived, so a
+    session can be resumed from any client after a disconnect.
+    """
+    
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('completing', 'Completing'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey(TenantModel, on_delete=models.CASCADE, related_name='upload_sessions')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    filename = models.CharField(max_length=500)
+    file_size = models.BigIntegerField()
+    content_type = models.CharField(max_length=255, default='application/octet-stream')
+    document_type = models.CharField(max_length=20, default='other')
+    r2_key = models.CharField(max_length=500, unique=True)
+    upload_id = models.CharField(max_length=1024)
+    part_size = models.BigIntegerField()
+    part_count = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    error = models.TextField(null=True, blank=True)
+    document = models.ForeignKey(Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'document_upload_sessions'
+        app_label = 'repository'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Upload {self.filename} ({self.status})"
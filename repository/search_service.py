@@ -3,15 +3,20 @@ Semantic Search Service
 Performs vector similarity search across document chunks
 """
 import logging
+import re
 from typing import List, Dict, Optional
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank, TrigramWordSimilarity
 from django.db.models import F, Q
+from django.utils.dateparse import parse_date
 from repository.models import DocumentChunk, Document
 from repository.embeddings_service import VoyageEmbeddingsService
 from tenants.models import TenantModel
 
 logger = logging.getLogger(__name__)
 
+# Must match the config used by DocumentChunk.search_vector.
+SEARCH_CONFIG = 'english'
+
 
 class SemanticSearchService:
     """Service for semantic search using pgvector"""
@@ -25,7 +30,8 @@ class SemanticSearchService:
         query: str,
         tenant_id: str,
         top_k: int = 10,
-        threshold: float = 0.5
+        threshold: float = 0.5,
+        filters: dict = None
     ) -> List[Dict]:
         """
         Perform semantic search across document chunks
@@ -35,6 +41,7 @@ class SemanticSearchService:
             tenant_id: Tenant UUID for isolation
             top_k: Number of results to return
             threshold: Similarity threshold (0-1)
+            filters: Optional document/metadata filters (see _apply_filters)
         
         Returns:
             List of top matching chunks with scores
@@ -45,7 +52,7 @@ class SemanticSearchService:
             
             if query_embedding is None:
                 logger.warning("Failed to generate query embedding, falling back to keyword search")
-                return self.keyword_search(query, tenant_id, top_k)
+                return self.keyword_search(query, tenant_id, top_k, filters=filters)
             
             # Perform vector similarity search using cosine similarity
             logger.info(f"Performing semantic search for query: '{query}' with threshold={threshold}")
@@ -57,9 +64,12 @@ class SemanticSearchService:
                 # Since embeddings are stored as arrays, not pgvector type
                 
                 # Get all chunks with embeddings for this tenant
-                chunks = DocumentChunk.objects.filter(
-                    document__tenant_id=tenant_id,
-                    embedding__isnull=False
+                chunks = self._apply_filters(
+                    DocumentChunk.objects.filter(
+                        document__tenant_id=tenant_id,
+                        embedding__isnull=False
+                    ),
+                    filters
                 ).select_related('document')
                 
                 chunk_count = chunks.count()
@@ -125,7 +135,7 @@ class SemanticSearchService:
             
             except Exception as e:
                 logger.error(f"Vector search error: {str(e)}, falling back to keyword search")
-                return self.keyword_search(query, tenant_id, top_k)
+                return self.keyword_search(query, tenant_id, top_k, filters=filters)
         
         except Exception as e:
             logger.error(f"Semantic search failed: {str(e)}")
@@ -135,15 +145,22 @@ class SemanticSearchService:
         self,
         query: str,
         tenant_id: str,
-        top_k: int = 10
+        top_k: int = 10,
+        filters: dict = None
     ) -> List[Dict]:
         """
-        Perform traditional keyword search
+        Perform ranked full-text keyword search
+        
+        Uses the indexed `search_vector` column. Quoted phrases, OR and
+        -exclusions follow websearch syntax; a trailing `*` on a term
+        (e.g. `indemnif*`) makes it a prefix match. When nothing matches,
+        falls back to trigram word similarity for misspelled terms.
         
         Args:
             query: Search query text
             tenant_id: Tenant UUID
             top_k: Number of results to return
+            filters: Optional document/metadata filters (see _apply_filters)
         
         Returns:
             List of matching chunks
@@ -151,11 +168,27 @@ class SemanticSearchService:
         try:
             logger.info(f"Performing keyword search for query: {query}")
             
-            # Use Django ORM with icontains for keyword matching
-            chunks = DocumentChunk.objects.filter(
-                tenant_id=tenant_id,
-                text__icontains=query
-            ).select_related('document').order_by('document_id', 'chunk_number')[:top_k]
+            ts_query = self._build_ts_query(query)
+            if ts_query is None:
+                return []
+            
+            chunks = list(
+                self._apply_filters(
+                    DocumentChunk.objects.filter(
+                        tenant_id=tenant_id,
+                        search_vector=ts_query
+                    ),
+                    filters
+                )
+                .annotate(rank=SearchRank(F('search_vector'), ts_query))
+                .select_related('document')
+                .order_by('-rank', 'document_id', 'chunk_number')[:top_k]
+            )
+            source = 'keyword'
+            
+            if not chunks:
+                chunks = self._fuzzy_chunks(query, tenant_id, top_k, filters)
+                source = 'fuzzy'
             
             results = []
             for chunk in chunks:
@@ -166,17 +199,121 @@ class SemanticSearchService:
                     'document_id': str(chunk.document_id),
                     'filename': chunk.document.filename,
                     'document_type': chunk.document.document_type,
-                    'similarity_score': None,  # No score for keyword search
-                    'source': 'keyword'
+                    'similarity_score': float(chunk.rank) if chunk.rank is not None else None,
+                    'source': source
                 })
             
-            logger.info(f"Found {len(results)} keyword search results")
+            logger.info(f"Found {len(results)} keyword search results ({source})")
             return results
         
+        except ValueError:
+            # Invalid filter values surface to the caller as a 400
+            raise
         except Exception as e:
             logger.error(f"Keyword search failed: {str(e)}")
             return []
     
+    @staticmethod
+    def _build_ts_query(query: str) -> Optional[SearchQuery]:
+        """
+        Translate user input into a SearchQuery
+        
+        Terms ending in `*` are compiled into a raw tsquery with `:*` prefix
+        matching (ANDed together); anything else uses websearch syntax.
+        """
+        query = (query or '').strip()
+        if not query:
+            return None
+        
+        if re.search(r'\w\*', query):
+            terms = []
+            for token in query.split():
+                is_prefix = token.endswith('*')
+                word = re.sub(r'[^\w]+', '', token)
+                if not word:
+                    continue
+                terms.append(f"{word}:*" if is_prefix else word)
+            if not terms:
+                return None
+            return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
+        
+        return SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    
+    @staticmethod
+    def _fuzzy_chunks(query: str, tenant_id: str, top_k: int, filters: dict = None) -> List[DocumentChunk]:
+        """Trigram word-similarity fallback (served by the gin_trgm_ops index)"""
+        term = re.sub(r'[*"]+', ' ', query or '').strip()
+        if not term:
+            return []
+        return list(
+            SemanticSearchService._apply_filters(
+                DocumentChunk.objects.filter(
+                    tenant_id=tenant_id,
+                    text__trigram_word_similar=term
+                ),
+                filters
+            )
+            .annotate(rank=TrigramWordSimilarity(term, 'text'))
+            .select_related('document')
+            .order_by('-rank', 'document_id', 'chunk_number')[:top_k]
+        )
+    
+    @staticmethod
+    def _apply_filters(queryset, filters: dict = None):
+        """
+        Apply advanced-search filters to a DocumentChunk queryset in SQL
+        
+        Supported keys:
+            document_type: substring match on the document type
+            filename: substring match on the filename
+            date_from / date_to: ISO dates bounding the upload date
+            effective_from / effective_to: ISO dates bounding the contract effective date
+            parties: party name or list; matches documents naming any of them
+            clauses: clause type or list; matches documents containing all of them
+            high_risk_items: risk item or list; matches documents flagging any of them
+        
+        Array filters use containment/overlap lookups served by the GIN
+        indexes on DocumentMetadata.
+        """
+        if not filters:
+            return queryset
+        
+        def as_list(value):
+            if isinstance(value, str):
+                value = [value]
+            return [str(v) for v in value if v]
+        
+        def as_date(key):
+            parsed = parse_date(str(filters[key]))
+            if parsed is None:
+                raise ValueError(f"{key} must be an ISO date (YYYY-MM-DD)")
+            return parsed
+        
+        if filters.get('document_type'):
+            queryset = queryset.filter(document__document_type__icontains=filters['document_type'])
+        if filters.get('filename'):
+            queryset = queryset.filter(document__filename__icontains=filters['filename'])
+        if filters.get('date_from'):
+            queryset = queryset.filter(document__uploaded_at__date__gte=as_date('date_from'))
+        if filters.get('date_to'):
+            queryset = queryset.filter(document__uploaded_at__date__lte=as_date('date_to'))
+        if filters.get('effective_from'):
+            queryset = queryset.filter(document__metadata__effective_date__gte=as_date('effective_from'))
+        if filters.get('effective_to'):
+            queryset = queryset.filter(document__metadata__effective_date__lte=as_date('effective_to'))
+        
+        parties = as_list(filters.get('parties') or [])
+        if parties:
+            queryset = queryset.filter(document__metadata__parties__overlap=parties)
+        clauses = as_list(filters.get('clauses') or [])
+        if clauses:
+            queryset = queryset.filter(document__metadata__identified_clauses__contains=clauses)
+        risk_items = as_list(filters.get('high_risk_items') or [])
+        if risk_items:
+            queryset = queryset.filter(document__metadata__high_risk_items__overlap=risk_items)
+        
+        return queryset
+    
     def hybrid_search(
         self,
         query: str,
@@ -263,20 +400,12 @@ class SemanticSearchService:
         try:
             logger.info(f"Searching for {clause_type} clauses")
             
-            # Search chunks and document metadata for clause type
-            from repository.models import DocumentMetadata
-            
-            # Find documents with this clause type
-            documents_with_clause = DocumentMetadata.objects.filter(
-                tenant_id=tenant_id,
-                identified_clauses__contains=[clause_type]
-            ).values_list('document_id', flat=True)
-            
-            # Get chunks from those documents
+            # Array containment (GIN) on the metadata narrows documents; the
+            # trigram index serves the icontains match on chunk text.
             chunks = DocumentChunk.objects.filter(
-                document_id__in=documents_with_clause,
                 tenant_id=tenant_id,
-                text__icontains=clause_type.lower()
+                document__metadata__identified_clauses__contains=[clause_type],
+                text__icontains=clause_type
             ).select_related('document').order_by('document_id', 'chunk_number')[:top_k]
             
             results = []
@@ -311,7 +440,7 @@ class SemanticSearchService:
         Args:
             query: Search query text
             tenant_id: Tenant UUID for isolation
-            filters: Dictionary of filters (document_type, etc.)
+            filters: Dictionary of filters (see _apply_filters)
             top_k: Number of results to return
         
         Returns:
@@ -320,40 +449,19 @@ class SemanticSearchService:
         try:
             filters = filters or {}
             
-            # Start with keyword search
-            results = self.keyword_search(
+            # Filters are applied inside the ranked query so top_k is exact
+            filtered_results = self.keyword_search(
                 query=query,
                 tenant_id=tenant_id,
-                top_k=top_k * 2  # Get more results to apply filters
+                top_k=top_k,
+                filters=filters
             )
             
-            # Apply filters
-            filtered_results = []
-            for result in results:
-                match = True
-                
-                # Check document_type filter
-                if 'document_type' in filters:
-                    doc_type = filters['document_type'].lower()
-                    result_type = result.get('document_type', '').lower()
-                    if doc_type not in result_type:
-                        match = False
-                
-                # Check filename filter
-                if match and 'filename' in filters:
-                    filename = filters['filename'].lower()
-                    result_filename = result.get('filename', '').lower()
-                    if filename not in result_filename:
-                        match = False
-                
-                if match:
-                    filtered_results.append(result)
-                    if len(filtered_results) >= top_k:
-                        break
-            
             logger.info(f"Advanced search: query='{query}', found {len(filtered_results)} results with filters {filters}")
             return filtered_results
         
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Advanced search failed: {str(e)}")
             return []
@@ -253,6 +253,8 @@ class SearchViewSet(viewsets.ViewSet):
         Advanced search with filters
         POST /api/search/advanced/
         Body: {"query": "confidential", "filters": {"document_type": "contract"}, "top_k": 10}
+        Filters: document_type, filename, date_from/date_to, effective_from/effective_to,
+                 parties, clauses, high_risk_items (applied in SQL)
         """
         try:
             query = request.data.get('query', '')
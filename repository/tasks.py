@@ -0,0 +1,117 @@
+"""
+Celery tasks for repository document ingestion
+"""
+import logging
+import tempfile
+from celery import shared_task
+from django.core.files.base import File
+from django.db import IntegrityError, transaction
+from authentication.r2_service import R2StorageService
+from repository.models import Document, DocumentUploadSession
+from repository.document_service import DocumentFingerprintService, DocumentProcessingService
+
+logger = logging.getLogger(__name__)
+
+
+def _download_to_tempfile(r2_service: R2StorageService, r2_key: str):
+    """Stream an R2 object into an anonymous temp file, so worker memory stays flat however large the upload"""
+    spool = tempfile.TemporaryFile()
+    try:
+        for chunk in r2_service.iter_file(r2_key):
+            spool.write(chunk)
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+    return spool
+
+
+@shared_task(bind=True, max_retries=3)
+def ingest_upload_session(self, session_id: str):
+    """
+    Ingest a file that finished uploading through an upload session
+
+    Fingerprints the object, reuses an existing document with identical
+    bytes (dropping the duplicate object), otherwise creates the Document
+    and runs the normal processing pipeline.
+    """
+    try:
+        session = DocumentUploadSession.objects.select_related('tenant', 'created_by').get(id=session_id)
+    except DocumentUploadSession.DoesNotExist:
+        logger.warning(f"Upload session {session_id} no longer exists")
+        return
+
+    if session.document_id:
+        return
+
+    r2_service = R2StorageService()
+    try:
+        spool = _download_to_tempfile(r2_service, session.r2_key)
+    except Exception as e:
+        logger.warning(f"Fetching upload {session.r2_key} failed, retrying: {str(e)}")
+        raise self.retry(exc=e, countdown=30)
+
+    try:
+        file_obj = File(spool, name=session.filename)
+        content_sha256 = DocumentFingerprintService.compute_sha256(file_obj)
+        existing = DocumentFingerprintService.find_existing(session.tenant, content_sha256)
+
+        if existing:
+            # Identical bytes already stored; keep the canonical object only.
+            try:
+                r2_service.delete_file(session.r2_key)
+            except Exception as e:
+                logger.warning(f"Failed to delete duplicate R2 object {session.r2_key}: {str(e)}")
+            session.document = existing
+            session.save(update_fields=['document', 'updated_at'])
+            if existing.status != 'failed':
+                logger.info(f"Upload session {session.id} deduplicated to document {existing.id}")
+                return
+            document = existing
+            document.status = 'processing'
+            document.processing_error = None
+            document.save(update_fields=['status', 'processing_error', 'updated_at'])
+        else:
+            file_type = session.filename.rsplit('.', 1)[-1].lower() if '.' in session.filename else 'unknown'
+            try:
+                with transaction.atomic():
+                    document = Document.objects.create(
+                        tenant=session.tenant,
+                        uploaded_by=session.created_by,
+                        filename=session.filename,
+                        file_type=file_type,
+                        file_size=session.file_size,
+                        r2_key=session.r2_key,
+                        content_sha256=content_sha256,
+                        document_type=session.document_type,
+                        status='processing'
+                    )
+            except IntegrityError:
+                winner = DocumentFingerprintService.find_existing(session.tenant, content_sha256)
+                if winner is None:
+                    raise
+                try:
+                    r2_service.delete_file(session.r2_key)
+                except Exception as e:
+                    logger.warning(f"Failed to delete duplicate R2 object {session.r2_key}: {str(e)}")
+                session.document = winner
+                session.save(update_fields=['document', 'updated_at'])
+                return
+            session.document = document
+            session.save(update_fields=['document', 'updated_at'])
+
+        result = DocumentProcessingService().ingest(file_obj, document, r2_service)
+        if not result['success']:
+            session.error = result.get('error', 'Processing failed')
+            session.save(update_fields=['error', 'updated_at'])
+            return
+
+        logger.info(f"Upload session {session.id} ingested as {document.id} ({result['chunks_created']} chunks)")
+
+    except Exception as e:
+        logger.error(f"Upload session ingestion failed for {session_id}: {str(e)}", exc_info=True)
+        session.status = 'failed'
+        session.error = str(e)
+        session.save(update_fields=['status', 'error', 'updated_at'])
+    finally:
+        spool.close()
@@ -0,0 +1,212 @@
+"""
+Tests for repository app
+"""
+import hashlib
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+from repository.document_service import DocumentFingerprintService
+from repository.models import Document, DocumentUploadSession
+from repository.search_service import SemanticSearchService
+from repository.search_views import SearchViewSet
+from repository.tasks import ingest_upload_session
+from repository.upload_service import UploadSessionError, UploadSessionService
+from tenants.models import TenantModel
+
+
+class FingerprintTests(SimpleTestCase):
+	def test_uploaded_and_plain_files_hash_alike_and_are_rewound(self):
+		data = b'%PDF-1.4 contract' * 1000
+		expected = hashlib.sha256(data).hexdigest()
+		for file_obj in (ContentFile(data, name='a.pdf'), BytesIO(data)):
+			self.assertEqual(DocumentFingerprintService.compute_sha256(file_obj), expected)
+			self.assertEqual(file_obj.read(4), b'%PDF')
+
+
+class SearchFilterTests(SimpleTestCase):
+	def test_prefix_terms_compile_to_a_raw_tsquery(self):
+		query = SemanticSearchService._build_ts_query('indemnif* clause')
+		self.assertEqual(query.function, 'to_tsquery')
+		self.assertEqual(query.source_expressions[-1].value, 'indemnif:* & clause')
+		self.assertEqual(SemanticSearchService._build_ts_query('"net 30" -late').function, 'websearch_to_tsquery')
+		self.assertIsNone(SemanticSearchService._build_ts_query('  '))
+
+	def test_filters_are_sql_predicates(self):
+		from repository.models import DocumentChunk
+		qs = SemanticSearchService._apply_filters(DocumentChunk.objects.all(), {
+			'document_type': 'contract',
+			'parties': 'Acme',
+			'clauses': ['Indemnity', 'Termination'],
+			'effective_from': '2024-01-01',
+		})
+		sql = str(qs.query)
+		self.assertIn('"document_metadata"."parties" &&', sql)
+		self.assertIn('"document_metadata"."identified_clauses" @>', sql)
+		self.assertIn('"document_metadata"."effective_date" >=', sql)
+		self.assertIn('"documents"."document_type"', sql)
+
+	def test_invalid_date_filter_is_a_400(self):
+		with self.assertRaises(ValueError):
+			from repository.models import DocumentChunk
+			SemanticSearchService._apply_filters(DocumentChunk.objects.all(), {'date_from': 'last week'})
+
+		request = APIRequestFactory().post(
+			'/api/search/advanced/', {'query': 'termination', 'filters': {'date_to': '31/12/2024'}}, format='json',
+		)
+		force_authenticate(request, user=User(email='a@example.com', tenant_id='550e8400-e29b-41d4-a716-446655440000'))
+		res = SearchViewSet.as_view({'post': 'advanced_search'})(request)
+		self.assertEqual(res.status_code, 400)
+		self.assertIn('date_to', res.data['error'])
+
+
+class UploadSessionServiceTests(SimpleTestCase):
+	def setUp(self):
+		self.r2 = mock.Mock()
+		self.r2.generate_presigned_part_url.side_effect = lambda key, upload_id, n, expiration: f'https://r2/{n}'
+		self.service = UploadSessionService(self.r2)
+
+	def _session(self, **kwargs):
+		defaults = {
+			'filename': 'big.pdf', 'file_size': 20, 'part_size': 8, 'part_count': 3,
+			'r2_key': 't/contracts/x.pdf', 'upload_id': 'u1', 'status': 'uploading',
+		}
+		defaults.update(kwargs)
+		return DocumentUploadSession(**defaults)
+
+	def test_create_rejects_bad_requests_before_touching_r2(self):
+		for filename, size in (('notes.exe', 10), ('a.pdf', 0), ('a.pdf', 'ten'), ('', 10)):
+			with self.assertRaises(UploadSessionError):
+				self.service.create(tenant=None, user=None, filename=filename, file_size=size)
+		with self.settings(REPOSITORY_MAX_UPLOAD_BYTES=100):
+			with self.assertRaises(UploadSessionError):
+				self.service.create(tenant=None, user=None, filename='a.pdf', file_size=101)
+		self.r2.create_multipart_upload.assert_not_called()
+
+	def test_part_size_keeps_within_the_part_limit(self):
+		self.assertEqual(UploadSessionService.part_size_for(1), UploadSessionService.MIN_PART_SIZE)
+		huge = 200 * 1024 ** 3
+		self.assertLessEqual(-(-huge // UploadSessionService.part_size_for(huge)), UploadSessionService.MAX_PARTS)
+
+	def test_resume_signs_only_the_parts_r2_is_missing(self):
+		self.r2.list_multipart_parts.return_value = [
+			{'part_number': 1, 'size': 8, 'etag': 'a'},
+			{'part_number': 3, 'size': 4, 'etag': 'c'},
+		]
+		payload = self.service.describe(self._session())
+		self.assertEqual(payload['missing_parts'], [2])
+		self.assertEqual(payload['part_urls'], [{'part_number': 2, 'url': 'https://r2/2'}])
+
+	def test_complete_requires_every_part_and_the_declared_size(self):
+		self.r2.list_multipart_parts.return_value = [{'part_number': 1, 'size': 8, 'etag': 'a'}]
+		with self.assertRaisesMessage(UploadSessionError, 'not uploaded yet'):
+			self.service.complete(self._session())
+
+		self.r2.list_multipart_parts.return_value = [
+			{'part_number': n, 'size': 8, 'etag': str(n)} for n in (1, 2, 3)
+		]
+		with self.assertRaisesMessage(UploadSessionError, 'declared 20'):
+			self.service.complete(self._session())
+		self.r2.complete_multipart_upload.assert_not_called()
+
+	def test_aborting_a_completed_upload_is_refused(self):
+		with self.assertRaises(UploadSessionError):
+			self.service.abort(self._session(status='completed'))
+		self.r2.abort_multipart_upload.assert_not_called()
+
+
+class UploadSessionLifecycleTests(TestCase):
+	def setUp(self):
+		self.tenant = TenantModel.objects.create(name='Acme', domain='acme.example')
+		self.user = User.objects.create_user(email='u@acme.example', password='pass1234', tenant_id=self.tenant.id)
+		self.r2 = mock.Mock()
+		self.r2.list_multipart_parts.return_value = [
+			{'part_number': 1, 'size': 8, 'etag': 'a'},
+			{'part_number': 2, 'size': 4, 'etag': 'b'},
+		]
+		self.service = UploadSessionService(self.r2)
+
+	def _session(self, **kwargs):
+		defaults = {
+			'tenant': self.tenant, 'created_by': self.user, 'filename': 'big.pdf', 'file_size': 12,
+			'r2_key': f'{self.tenant.id}/contracts/big.pdf', 'upload_id': 'u1', 'part_size': 8, 'part_count': 2,
+		}
+		defaults.update(kwargs)
+		return DocumentUploadSession.objects.create(**defaults)
+
+	def test_complete_finalizes_once_and_enqueues_ingestion(self):
+		session = self._session()
+		with mock.patch.object(ingest_upload_session, 'delay') as delay:
+			self.service.complete(session)
+			# A retried complete is a no-op.
+			self.service.complete(DocumentUploadSession.objects.get(id=session.id))
+		session.refresh_from_db()
+		self.assertEqual(session.status, 'completed')
+		self.r2.complete_multipart_upload.assert_called_once()
+		delay.assert_called_once_with(str(session.id))
+
+	def test_concurrent_complete_loses_the_claim(self):
+		session = self._session()
+		# Another request claimed the session after this one loaded it.
+		DocumentUploadSession.objects.filter(id=session.id).update(status='completing')
+		with mock.patch.object(ingest_upload_session, 'delay') as delay:
+			result = self.service.complete(session)
+		self.assertEqual(result.status, 'completing')
+		self.r2.complete_multipart_upload.assert_not_called()
+		delay.assert_not_called()
+
+	def test_failed_finalize_releases_the_claim(self):
+		session = self._session()
+		self.r2.complete_multipart_upload.side_effect = Exception('InternalError')
+		with self.assertRaises(Exception):
+			self.service.complete(session)
+		session.refresh_from_db()
+		self.assertEqual(session.status, 'uploading')
+		self.assertIn('InternalError', session.error)
+
+
+class UploadSessionIngestTests(TestCase):
+	data = b'identical contract bytes'
+
+	def setUp(self):
+		self.tenant = TenantModel.objects.create(name='Acme', domain='acme.example')
+		self.sha = hashlib.sha256(self.data).hexdigest()
+		self.session = DocumentUploadSession.objects.create(
+			tenant=self.tenant, filename='dup.txt', file_size=len(self.data), status='completed',
+			r2_key=f'{self.tenant.id}/contracts/dup.txt', upload_id='u1', part_size=8, part_count=3,
+		)
+
+	def _document(self, **kwargs):
+		defaults = {
+			'tenant': self.tenant, 'filename': 'orig.txt', 'file_type': 'txt', 'file_size': len(self.data),
+			'r2_key': f'{self.tenant.id}/contracts/orig.txt', 'content_sha256': self.sha, 'status': 'processed',
+		}
+		defaults.update(kwargs)
+		return Document.objects.create(**defaults)
+
+	def _ingest(self):
+		with mock.patch('repository.tasks.R2StorageService') as service:
+			service.return_value.iter_file.return_value = iter([self.data[:10], self.data[10:]])
+			ingest_upload_session(str(self.session.id))
+		self.session.refresh_from_db()
+		return service.return_value
+
+	def test_duplicate_upload_reuses_the_document_and_drops_its_object(self):
+		existing = self._document()
+		r2 = self._ingest()
+		self.assertEqual(self.session.document_id, existing.id)
+		r2.delete_file.assert_called_once_with(self.session.r2_key)
+		self.assertEqual(Document.objects.filter(tenant=self.tenant).count(), 1)
+
+	def test_losing_the_insert_race_adopts_the_winner(self):
+		winner = self._document()
+		# The first lookup misses: the winner committed between lookup and insert.
+		with mock.patch.object(DocumentFingerprintService, 'find_existing', side_effect=[None, winner]):
+			r2 = self._ingest()
+		self.assertEqual(self.session.document_id, winner.id)
+		r2.delete_file.assert_called_once_with(self.session.r2_key)
+		self.assertEqual(Document.objects.filter(tenant=self.tenant).count(), 1)
@@ -0,0 +1,208 @@
+"""
+Resumable direct-to-R2 upload sessions
+Clients upload parts straight to R2 with presigned URLs; the app tier only
+signs requests and finalizes the multipart upload.
+"""
+import math
+import mimetypes
+import uuid
+import logging
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from django.utils import timezone
+from authentication.r2_service import R2StorageService
+from repository.models import DocumentUploadSession
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionError(Exception):
+    """Invalid upload-session request (maps to HTTP 400)"""
+
+
+class UploadSessionService:
+    """Create, resume, complete and abort multipart upload sessions"""
+
+    # R2/S3 require >= 5 MiB for every part except the last, and <= 10,000 parts.
+    MIN_PART_SIZE = 8 * 1024 * 1024
+    MAX_PARTS = 10000
+    PRESIGN_EXPIRATION = 3600
+    # Cap on URLs signed per response; clients page through with `parts`.
+    MAX_URLS_PER_RESPONSE = 100
+    ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc', 'txt'}
+
+    def __init__(self, r2_service: Optional[R2StorageService] = None):
+        self.r2 = r2_service or R2StorageService()
+
+    @classmethod
+    def max_file_size(cls) -> int:
+        return int(getattr(settings, 'REPOSITORY_MAX_UPLOAD_BYTES', 5 * 1024 ** 3))
+
+    @classmethod
+    def part_size_for(cls, file_size: int) -> int:
+        """Smallest part size >= MIN_PART_SIZE that fits the file in MAX_PARTS parts"""
+        return max(cls.MIN_PART_SIZE, math.ceil(file_size / cls.MAX_PARTS))
+
+    def create(self, tenant, user, filename: str, file_size: int,
+               content_type: str = None, document_type: str = 'other') -> DocumentUploadSession:
+        """Start a multipart upload in R2 and record the session"""
+        filename = (filename or '').strip()
+        if not filename:
+            raise UploadSessionError('filename is required')
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if extension not in self.ALLOWED_EXTENSIONS:
+            raise UploadSessionError(
+                f"Unsupported file type '{extension or 'unknown'}'. Allowed: {', '.join(sorted(self.ALLOWED_EXTENSIONS))}"
+            )
+        try:
+            file_size = int(file_size)
+        except (TypeError, ValueError):
+            raise UploadSessionError('file_size must be an integer number of bytes')
+        if file_size <= 0:
+            raise UploadSessionError('file_size must be positive')
+        if file_size > self.max_file_size():
+            raise UploadSessionError(f'file_size exceeds the {self.max_file_size()} byte limit')
+
+        content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        part_size = self.part_size_for(file_size)
+        part_count = max(1, math.ceil(file_size / part_size))
+        r2_key = f"{tenant.id}/contracts/{uuid.uuid4()}.{extension}"
+
+        upload_id = self.r2.create_multipart_upload(
+            r2_key,
+            content_type=content_type,
+            metadata={
+                'tenant_id': str(tenant.id),
+                'original_filename': filename,
+            },
+        )
+
+        session = DocumentUploadSession.objects.create(
+            tenant=tenant,
+            created_by=user if getattr(user, 'pk', None) else None,
+            filename=filename,
+            file_size=file_size,
+            content_type=content_type,
+            document_type=document_type or 'other',
+            r2_key=r2_key,
+            upload_id=upload_id,
+            part_size=part_size,
+            part_count=part_count,
+        )
+        logger.info(f"Created upload session {session.id}: {filename} ({file_size} bytes, {part_count} parts)")
+        return session
+
+    def part_urls(self, session: DocumentUploadSession, part_numbers: Iterable[int]) -> List[Dict]:
+        """Presigned PUT URLs for the requested part numbers"""
+        urls = []
+        for part_number in part_numbers:
+            part_number = int(part_number)
+            if not 1 <= part_number <= session.part_count:
+                raise UploadSessionError(f'part_number must be between 1 and {session.part_count}')
+            urls.append({
+                'part_number': part_number,
+                'url': self.r2.generate_presigned_part_url(
+                    session.r2_key, session.upload_id, part_number, expiration=self.PRESIGN_EXPIRATION
+                ),
+            })
+        return urls
+
+    def describe(self, session: DocumentUploadSession, part_numbers: Iterable[int] = None) -> Dict:
+        """
+        Session state for resuming
+
+        Lists the parts R2 has already received and signs URLs for the
+        requested parts (default: the first missing ones).
+        """
+        payload = {
+            'upload_session_id': str(session.id),
+            'filename': session.filename,
+            'file_size': session.file_size,
+            'part_size': session.part_size,
+            'part_count': session.part_count,
+            'status': session.status,
+            'error': session.error,
+            'document_id': str(session.document_id) if session.document_id else None,
+            'document_status': session.document.status if session.document_id else None,
+            'expires_in': self.PRESIGN_EXPIRATION,
+        }
+        if session.status != 'uploading':
+            return payload
+
+        uploaded = self.r2.list_multipart_parts(session.r2_key, session.upload_id)
+        received = {p['part_number'] for p in uploaded}
+        missing = [n for n in range(1, session.part_count + 1) if n not in received]
+        if part_numbers is None:
+            part_numbers = missing[:self.MAX_URLS_PER_RESPONSE]
+        else:
+            part_numbers = list(part_numbers)[:self.MAX_URLS_PER_RESPONSE]
+
+        payload.update({
+            'uploaded_parts': uploaded,
+            'missing_parts': missing,
+            'part_urls': self.part_urls(session, part_numbers),
+        })
+        return payload
+
+    def complete(self, session: DocumentUploadSession) -> DocumentUploadSession:
+        """
+        Finalize the multipart upload and enqueue ingestion
+
+        Part ETags are taken from R2's own part listing so clients don't have
+        to track them across resumptions.
+        """
+        if session.status in ('completing', 'completed'):
+            return session
+        if session.status != 'uploading':
+            raise UploadSessionError(f'Upload session is {session.status}')
+
+        uploaded = self.r2.list_multipart_parts(session.r2_key, session.upload_id)
+        received = {p['part_number'] for p in uploaded}
+        missing = [n for n in range(1, session.part_count + 1) if n not in received]
+        if missing:
+            raise UploadSessionError(f'{len(missing)} part(s) not uploaded yet: {missing[:20]}')
+        uploaded_size = sum(p['size'] for p in uploaded if p['part_number'] <= session.part_count)
+        if uploaded_size != session.file_size:
+            raise UploadSessionError(
+                f'Uploaded {uploaded_size} bytes but session declared {session.file_size}'
+            )
+
+        # Claim the session so concurrent completes don't both finalize.
+        claimed = DocumentUploadSession.objects.filter(
+            id=session.id, status='uploading'
+        ).update(status='completing', updated_at=timezone.now())
+        if not claimed:
+            session.refresh_from_db()
+            return session
+
+        try:
+            self.r2.complete_multipart_upload(
+                session.r2_key,
+                session.upload_id,
+                [p for p in uploaded if p['part_number'] <= session.part_count],
+            )
+        except Exception as e:
+            DocumentUploadSession.objects.filter(id=session.id).update(
+                status='uploading', error=str(e), updated_at=timezone.now()
+            )
+            raise
+
+        session.status = 'completed'
+        session.error = None
+        session.completed_at = timezone.now()
+        session.save(update_fields=['status', 'error', 'completed_at', 'updated_at'])
+
+        from repository.tasks import ingest_upload_session
+        ingest_upload_session.delay(str(session.id))
+        logger.info(f"Upload session {session.id} completed; ingestion enqueued")
+        return session
+
+    def abort(self, session: DocumentUploadSession) -> DocumentUploadSession:
+        """Abort the multipart upload and discard stored parts"""
+        if session.status in ('completing', 'completed'):
+            raise UploadSessionError('Completed uploads cannot be aborted; delete the document instead')
+        if session.status != 'aborted':
+            self.r2.abort_multipart_upload(session.r2_key, session.upload_id)
+            session.status = 'aborted'
+            session.save(update_fields=['status', 'updated_at'])
+        return session
@@ -0,0 +1,129 @@
+"""
+Upload Session API Endpoints
+Resumable direct-to-R2 multipart uploads for large documents
+"""
+import logging
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from repository.models import DocumentUploadSession
+from repository.upload_service import UploadSessionService, UploadSessionError
+from tenants.models import TenantModel
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionViewSet(viewsets.ViewSet):
+    """
+    POST   /api/upload-sessions/                  -> start a session, returns part size + first part URLs
+    GET    /api/upload-sessions/{id}/?parts=3,4   -> uploaded/missing parts and fresh part URLs (resume)
+    POST   /api/upload-sessions/{id}/complete/    -> CompleteMultipartUpload, then async ingestion
+    DELETE /api/upload-sessions/{id}/             -> abort and discard uploaded parts
+
+    Clients PUT each part's bytes to its URL; file bytes never pass through
+    the app servers.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def _get_session(self, request, pk):
+        tenant_id = getattr(request.user, 'tenant_id', None)
+        if not tenant_id:
+            return None
+        return DocumentUploadSession.objects.select_related('document').filter(
+            id=pk, tenant_id=tenant_id
+        ).first()
+
+    @staticmethod
+    def _parse_parts(raw):
+        if not raw:
+            return None
+        return [int(p) for p in str(raw).split(',') if p.strip()]
+
+    def create(self, request):
+        tenant_id = getattr(request.user, 'tenant_id', None)
+        if not tenant_id:
+            return Response({
+                'success': False,
+                'error': 'User has no associated tenant'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            tenant_obj = TenantModel.objects.get(id=tenant_id)
+        except TenantModel.DoesNotExist:
+            return Response({
+                'success': False,
+                'error': f'Tenant {tenant_id} not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            service = UploadSessionService()
+            session = service.create(
+                tenant=tenant_obj,
+                user=request.user,
+                filename=request.data.get('filename'),
+                file_size=request.data.get('file_size'),
+                content_type=request.data.get('content_type'),
+                document_type=request.data.get('document_type', 'other'),
+            )
+            return Response({
+                'success': True,
+                **service.describe(session),
+            }, status=status.HTTP_201_CREATED)
+        except UploadSessionError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Upload session create error: {str(e)}")
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def retrieve(self, request, pk=None):
+        session = self._get_session(request, pk)
+        if session is None:
+            return Response({'success': False, 'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            parts = self._parse_parts(request.query_params.get('parts'))
+            return Response({
+                'success': True,
+                **UploadSessionService().describe(session, parts),
+            }, status=status.HTTP_200_OK)
+        except (UploadSessionError, ValueError) as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Upload session status error: {str(e)}")
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['post'], url_path='complete')
+    def complete(self, request, pk=None):
+        session = self._get_session(request, pk)
+        if session is None:
+            return Response({'success': False, 'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            service = UploadSessionService()
+            session = service.complete(session)
+            return Response({
+                'success': True,
+                **service.describe(session),
+                'message': 'Upload complete; document ingestion queued'
+            }, status=status.HTTP_202_ACCEPTED)
+        except UploadSessionError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Upload session complete error: {str(e)}")
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def destroy(self, request, pk=None):
+        session = self._get_session(request, pk)
+        if session is None:
+            return Response({'success': False, 'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            UploadSessionService().abort(session)
+            return Response({'success': True, 'status': session.status}, status=status.HTTP_200_OK)
+        except UploadSessionError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Upload session abort error: {str(e)}")
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -3,12 +3,14 @@ from rest_framework.routers import DefaultRouter
 from .views import RepositoryViewSet, RepositoryFolderViewSet
 from .document_views import DocumentViewSet
 from .search_views import SearchViewSet
+from .upload_views import UploadSessionViewSet
 
 router = DefaultRouter()
 router.register(r'repository', RepositoryViewSet, basename='repository')
 router.register(r'repository-folders', RepositoryFolderViewSet, basename='repository-folder')
 router.register(r'documents', DocumentViewSet, basename='documents')
 router.register(r'search', SearchViewSet, basename='search')
+router.register(r'upload-sessions', UploadSessionViewSet, basename='upload-sessions')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -8,7 +8,6 @@ import re
 import importlib
 from typing import Optional, Tuple
 
-import requests
 from django.conf import settings
 
 from .clause_library_data import CLAUSE_LIBRARY
@@ -177,6 +176,8 @@ def generate_voyage_embedding(text: str) -> Optional[list]:
     if not api_key:
         return None
 
+    import requests
+
     try:
         payload = {
             'model': 'voyage-law-2',
@@ -16,6 +16,7 @@ class Command(BaseCommand):
         parser.add_argument("--dry-run", action="store_true", help="Print what would be indexed")
 
     def handle(self, *args, **options):
+        from contracts.editor_deltas import current_editor_content
         from contracts.models import Clause, Contract
         from search.services import SearchIndexingService
 
@@ -44,7 +45,8 @@ class Command(BaseCommand):
             indexed = 0
             for c in qs:
                 md = c.metadata or {}
-                text = (md.get("rendered_text") or "").strip()
+                current = current_editor_content(c.id, md)
+                text = ((current or md).get("rendered_text") or "").strip()
                 if not text:
                     continue
 